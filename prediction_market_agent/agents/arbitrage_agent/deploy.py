@@ -19,9 +19,6 @@ from prediction_market_agent_tooling.markets.data_models import (
 )
 from prediction_market_agent_tooling.markets.markets import MarketType
 from prediction_market_agent_tooling.markets.omen.omen import OmenAgentMarket
-from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
-    OmenSubgraphHandler,
-)
 from prediction_market_agent_tooling.tools.langfuse_ import (
     get_langfuse_langchain_config,
     observe,
@@ -34,6 +31,9 @@ from prediction_market_agent.agents.arbitrage_agent.data_models import (
 )
 from prediction_market_agent.agents.arbitrage_agent.prompt import PROMPT_TEMPLATE
 from prediction_market_agent.db.pinecone_handler import PineconeHandler
+from prediction_market_agent.tools.cached_subgraph_handler import (
+    CachedOmenSubgraphHandler,
+)
 from prediction_market_agent.utils import APIKeys
 
 
@@ -52,7 +52,7 @@ class DeployableArbitrageAgent(DeployableTraderAgent):
             raise RuntimeError(
                 "Can arbitrage only on Omen since related markets embeddings available only for Omen markets."
             )
-        self.subgraph_handler = OmenSubgraphHandler()
+        self.subgraph_handler = CachedOmenSubgraphHandler()
         self.pinecone_handler = PineconeHandler()
         self.pinecone_handler.insert_all_omen_markets_if_not_exists()
         self.chain = self._build_chain()
@@ -1,3 +1,5 @@
+import typing as t
+
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
@@ -8,6 +10,9 @@ from prediction_market_agent_tooling.tools.langfuse_ import (
 from prediction_market_agent_tooling.tools.utils import utcnow
 from pydantic import BaseModel, Field
 
+from prediction_market_agent.agents.microchain_agent.history_compaction import (
+    TiktokenCounter,
+)
 from prediction_market_agent.agents.microchain_agent.memory import ChatHistory
 from prediction_market_agent.db.evaluated_goal_table_handler import (
     EvaluatedGoalTableHandler,
@@ -43,7 +48,7 @@ If applicable, use the agent's previous evaluated goals when considering its new
 
 EVALUATE_GOAL_PROGRESS_PROMPT_TEMPLATE = """
 An agent and user are working together to achieve a well defined goal.
-Given their chat history, and the goal definition, evaluate whether the goal has been completed.
+Given their chat history (the agent's function calls and their results), and the goal definition, evaluate whether the goal has been completed.
 
 [GOAL]
 {goal_prompt}
@@ -55,6 +60,104 @@ Given their chat history, and the goal definition, evaluate whether the goal has
 """
 
 
+# If the goal evaluation's input is over its token budget, the results of
+# function calls are shortened to this many characters first, starting with the
+# longest ones (e.g. raw lists of markets).
+TRUNCATED_RESULT_CHARS = 300
+
+
+class TraceStep(BaseModel):
+    """
+    A function call of the agent and its result, or any other unpaired
+    message, in the trace of a session that is evaluated against its goal.
+    """
+
+    call: str | None
+    result: str | None
+
+    def shorten_result(self, max_chars: int) -> "TraceStep":
+        if self.result is None or len(self.result) <= max_chars:
+            return self
+        return TraceStep(
+            call=self.call,
+            result=f"{self.result[:max_chars]}... ({len(self.result) - max_chars} characters omitted)",
+        )
+
+    def __str__(self) -> str:
+        lines = []
+        if self.call is not None:
+            lines.append(f"Call: {self.call}")
+        if self.result is not None:
+            lines.append(f"Result: {self.result}")
+        return "\n".join(lines)
+
+
+def build_trace_steps(chat_history: ChatHistory) -> list[TraceStep]:
+    """
+    Pair each of the agent's function calls with its result.
+    """
+    steps: list[TraceStep] = []
+    messages = chat_history.chat_messages
+    i = 0
+    while i < len(messages):
+        message = messages[i]
+        if (
+            message.role == "assistant"
+            and i + 1 < len(messages)
+            and messages[i + 1].role == "user"
+        ):
+            steps.append(
+                TraceStep(call=message.content, result=messages[i + 1].content)
+            )
+            i += 2
+        elif message.role == "assistant":
+            steps.append(TraceStep(call=message.content, result=None))
+            i += 1
+        else:
+            steps.append(TraceStep(call=None, result=message.content))
+            i += 1
+    return steps
+
+
+def build_evaluation_trace(
+    chat_history: ChatHistory,
+    count_tokens: t.Callable[[str], int],
+    max_tokens: int,
+) -> str:
+    """
+    Compress the chat history into a numbered trace of function calls and
+    their results, that fits into `max_tokens`. If it doesn't fit, the longest
+    results are shortened first, and then the oldest steps are omitted, as the
+    latest ones tell the most about the goal's completion.
+    """
+    steps = build_trace_steps(chat_history)
+    formatted = [f"## Step {i + 1}\n{step}" for i, step in enumerate(steps)]
+    tokens = [count_tokens(f) for f in formatted]
+
+    for i in sorted(
+        range(len(steps)), key=lambda i: len(steps[i].result or ""), reverse=True
+    ):
+        if sum(tokens) <= max_tokens:
+            break
+        shortened = steps[i].shorten_result(TRUNCATED_RESULT_CHARS)
+        if shortened is steps[i]:
+            # All the other results are even shorter.
+            break
+        steps[i] = shortened
+        formatted[i] = f"## Step {i + 1}\n{shortened}"
+        tokens[i] = count_tokens(formatted[i])
+
+    n_omitted, total_tokens = 0, sum(tokens)
+    while total_tokens > max_tokens and n_omitted < len(steps) - 1:
+        total_tokens -= tokens[n_omitted]
+        n_omitted += 1
+
+    omitted_note = (
+        [f"({n_omitted} earlier steps omitted for brevity)"] if n_omitted else []
+    )
+    return "\n\n".join(omitted_note + formatted[n_omitted:])
+
+
 class Goal(BaseModel):
     goal: str = Field(..., description="A clear description of the goal")
     motivation: str = Field(..., description="The reason for the goal")
@@ -110,7 +213,8 @@ class EvaluatedGoal(Goal):
 
     @classmethod
     def from_model(cls, model: EvaluatedGoalModel) -> "EvaluatedGoal":
-        return EvaluatedGoal(
+        # Loaded from our own DB, so the validation is skipped.
+        return EvaluatedGoal.model_construct(
             goal=model.goal,
             motivation=model.motivation,
             completion_criteria=model.completion_criteria,
@@ -149,6 +253,7 @@ class GoalManager:
         goal_history_limit: int = 10,  # How many unique goal histories to pass to the LLM when generating a new goal
         model: str = DEFAULT_OPENAI_MODEL,
         sqlalchemy_db_url: str | None = None,
+        max_evaluation_trace_tokens: int = 8000,
     ):
         self.agent_id = agent_id
         self.high_level_description = high_level_description
@@ -156,6 +261,7 @@ class GoalManager:
         self.retry_limit = retry_limit
         self.goal_history_limit = goal_history_limit
         self.model = model
+        self.max_evaluation_trace_tokens = max_evaluation_trace_tokens
         self.table_handler = EvaluatedGoalTableHandler(
             agent_id=agent_id,
             sqlalchemy_db_url=sqlalchemy_db_url,
@@ -207,17 +313,23 @@ class GoalManager:
     def have_reached_retry_limit(
         self, latest_evaluated_goals: list[EvaluatedGoal]
     ) -> bool:
-        if self.retry_limit == 0:
-            return True
-
-        if len(latest_evaluated_goals) < self.retry_limit + 1:
-            return False
+        if not latest_evaluated_goals:
+            return self.retry_limit == 0
 
         latest_goal = latest_evaluated_goals[0].to_goal()
-        return all(
-            g.to_goal() == latest_goal
-            for g in latest_evaluated_goals[: self.retry_limit + 1]
-        )
+        n_evaluations = 0
+        for g in latest_evaluated_goals[: self.retry_limit + 1]:
+            if g.to_goal() != latest_goal:
+                break
+            n_evaluations += 1
+        return self.have_reached_retry_limit_after(n_evaluations=n_evaluations)
+
+    def have_reached_retry_limit_after(self, n_evaluations: int) -> bool:
+        """
+        Whether a goal evaluated `n_evaluations` times in a row (its first
+        attempt and the retries) shouldn't be retried anymore.
+        """
+        return n_evaluations >= self.retry_limit + 1
 
     @observe()
     def get_goal(self) -> Goal:
@@ -228,27 +340,28 @@ class GoalManager:
         TODO add the ability to continue from a previous session if the goal
         is not complete.
         """
-        # In the worst case, when every goal is retried the maximum number of
-        # times, we need to retrieve (retry_limit + 1) * goal_history_limit
-        # evaluated goals to ensure we get `goal_history_limit` unique goals
-        latest_evaluated_goals = self.get_latest_evaluated_goals_from_memory(
-            limit=(self.retry_limit + 1) * self.goal_history_limit
-        )
-        unique_latest_evaluated_goals = self.get_unique_evaluated_goals(
-            evaluated_goals=latest_evaluated_goals
+        latest_unique_models = self.table_handler.get_latest_unique_evaluated_goals(
+            limit=self.goal_history_limit
         )
+        unique_latest_evaluated_goals = [
+            EvaluatedGoal.from_model(model) for model in latest_unique_models
+        ]
 
-        if latest_evaluated_goals:
+        if unique_latest_evaluated_goals:
             # Previous goals have been retrieved from memory. Generate a new
             # goal based on these, or retry the last on if it did not complete.
-            latest_evaluated_goal = latest_evaluated_goals[0]
+            # The most recent evaluation is always the first of the unique ones.
+            latest_evaluated_goal = unique_latest_evaluated_goals[0]
 
             if latest_evaluated_goal.is_complete:
                 # Generate a new goal
                 return self.generate_goal(unique_latest_evaluated_goals)
             else:
                 # Try again, unless we've reached the retry limit
-                if self.have_reached_retry_limit(latest_evaluated_goals):
+                n_evaluations = self.table_handler.count_latest_goal_evaluations(
+                    goal=latest_unique_models[0]
+                )
+                if self.have_reached_retry_limit_after(n_evaluations=n_evaluations):
                     return self.generate_goal(unique_latest_evaluated_goals)
                 else:
                     return latest_evaluated_goal.to_goal()
@@ -258,12 +371,27 @@ class GoalManager:
 
     @classmethod
     def get_chat_history_after_goal_prompt(
-        cls, goal: Goal, chat_history: ChatHistory
+        cls,
+        goal: Goal,
+        chat_history: ChatHistory,
+        goal_prompt_index: int | None = None,
     ) -> ChatHistory:
         """
         Return the chat history after the goal prompt, or None if the goal
         prompt is not found.
+
+        If the index of the goal prompt in the chat history is known (i.e.
+        where it was put by the agent), that message is checked first, instead
+        of searching the whole history.
         """
+        messages = chat_history.chat_messages
+        if (
+            goal_prompt_index is not None
+            and goal_prompt_index < len(messages)
+            and messages[goal_prompt_index].content == goal.to_prompt()
+        ):
+            return ChatHistory(chat_messages=messages[goal_prompt_index + 1 :])
+
         for i, chat_message in enumerate(chat_history.chat_messages):
             if chat_message.content == goal.to_prompt():
                 return ChatHistory(chat_messages=chat_history.chat_messages[i + 1 :])
@@ -274,10 +402,18 @@ class GoalManager:
         self,
         goal: Goal,
         chat_history: ChatHistory,
+        goal_prompt_index: int | None = None,
     ) -> GoalEvaluation:
         relevant_chat_history = self.get_chat_history_after_goal_prompt(
             goal=goal,
             chat_history=chat_history,
+            goal_prompt_index=goal_prompt_index,
+        )
+        encoding = TiktokenCounter(self.model).encoding
+        evaluation_trace = build_evaluation_trace(
+            chat_history=relevant_chat_history,
+            count_tokens=lambda text: len(encoding.encode(text)),
+            max_tokens=self.max_evaluation_trace_tokens,
         )
         parser = PydanticOutputParser(pydantic_object=GoalEvaluation)
         prompt = PromptTemplate(
@@ -295,7 +431,7 @@ class GoalManager:
         goal_evaluation: GoalEvaluation = chain.invoke(
             {
                 "goal_prompt": goal.to_prompt(),
-                "chat_history": str(relevant_chat_history),
+                "chat_history": evaluation_trace,
             },
             config=get_langfuse_langchain_config(),
         )
@@ -6,6 +6,9 @@ from prediction_market_agent.agents.microchain_agent.prompts import (
     build_full_unformatted_system_prompt,
     extract_updatable_system_prompt,
 )
+from prediction_market_agent.agents.microchain_agent.tool_selection import (
+    SelectiveHelpEngine,
+)
 
 
 class AgentAction(Function):
@@ -15,6 +18,8 @@ class AgentAction(Function):
 
 
 class GetMyCurrentSystemPrompt(AgentAction):
+    is_read_only = True
+
     @property
     def description(self) -> str:
         return "Use this function to get your current system prompt."
@@ -37,6 +42,9 @@ class UpdateMySystemPrompt(AgentAction):
         return ["This will be my new prompt."]
 
     def __call__(self, new_prompt: str) -> str:
+        if isinstance(self.agent.engine, SelectiveHelpEngine):
+            # Describe the functions relevant to the new instructions.
+            self.agent.engine.help_query = new_prompt
         self.agent.system_prompt = build_full_unformatted_system_prompt(
             new_prompt
         ).format(engine_help=self.agent.engine.help)
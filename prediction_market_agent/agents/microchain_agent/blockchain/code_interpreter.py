@@ -1,9 +1,12 @@
+import hashlib
+import re
 from typing import Any
 
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnableSerializable
 from langchain_openai import ChatOpenAI
+from prediction_market_agent_tooling.tools.caches.db_cache import db_cache
 from prediction_market_agent_tooling.tools.langfuse_ import (
     get_langfuse_langchain_config,
     observe,
@@ -28,10 +31,14 @@ class CodeInterpreter:
     prompt_and_model: RunnableSerializable[dict[Any, Any], Any]
 
     def __init__(
-        self, source_code: str, summarization_model: str = "gpt-4-turbo"
+        self,
+        source_code: str,
+        summarization_model: str = "gpt-4-turbo",
+        max_functions_per_chunk: int = 10,
     ) -> None:
         self.summarization_model = summarization_model
         self.source_code = source_code
+        self.max_functions_per_chunk = max_functions_per_chunk
         self.keys = APIKeys()
         self.build_chain()
 
@@ -61,13 +68,91 @@ class CodeInterpreter:
 
         self.prompt_and_model = prompt | llm | parser
 
+    @property
+    def source_code_hash(self) -> str:
+        return hashlib.sha256(self.source_code.encode()).hexdigest()
+
     @observe()
     def generate_summary(self, function_names: list[str]) -> Summaries:
-        summaries: Summaries = self.prompt_and_model.invoke(
-            {
-                "function_names": function_names,
-                "source_code": self.source_code,
-            },
+        return self._generate_summary(
+            source_code_hash=self.source_code_hash,
+            summarization_model=self.summarization_model,
+            function_names=function_names,
+        )
+
+    @db_cache
+    def _generate_summary(
+        self,
+        source_code_hash: str,
+        summarization_model: str,
+        function_names: list[str],
+    ) -> Summaries:
+        # `source_code_hash` and `summarization_model` identify the summaries in the cache.
+        # Functions are summarized in chunks, concurrently, each with only the
+        # relevant part of the source code.
+        chunks = [
+            function_names[i : i + self.max_functions_per_chunk]
+            for i in range(0, len(function_names), self.max_functions_per_chunk)
+        ]
+        chunk_summaries: list[Summaries] = self.prompt_and_model.batch(
+            [
+                {
+                    "function_names": chunk,
+                    "source_code": self.get_source_code_for_functions(chunk),
+                }
+                for chunk in chunks
+            ],
             config=get_langfuse_langchain_config(),
         )
-        return summaries
+        return Summaries(
+            summaries=[s for summaries in chunk_summaries for s in summaries.summaries]
+        )
+
+    def get_source_code_for_functions(self, function_names: list[str]) -> str:
+        sources = [
+            extract_function_source(self.source_code, name) for name in function_names
+        ]
+        if not all(sources):
+            # Some definitions are missing (e.g. inherited from a contract that
+            # isn't part of the source code), so give the model the whole code.
+            return self.source_code
+        return "\n\n".join(sources)
+
+
+def find_definition_end(source_code: str, position: int) -> int:
+    """
+    Position right after the end of the definition starting before `position`,
+    which is either its closing brace, or a semicolon if it has no body.
+    """
+    depth = 0
+    for i in range(position, len(source_code)):
+        if source_code[i] == ";" and depth == 0:
+            return i + 1
+        elif source_code[i] == "{":
+            depth += 1
+        elif source_code[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return len(source_code)
+
+
+def extract_function_source(source_code: str, function_name: str) -> str:
+    """
+    Slice the definitions of the function (including its overloads), or of the
+    public state variable with its getter, out of the Solidity source code.
+    """
+    name = re.escape(function_name)
+    sources = []
+    for match in re.finditer(rf"\bfunction\s+{name}\s*\(", source_code):
+        start = source_code.rfind("\n", 0, match.start()) + 1
+        sources.append(
+            source_code[start : find_definition_end(source_code, match.end())]
+        )
+    for match in re.finditer(
+        rf"^(?!\s*function\b)[^\n;{{}}]*\bpublic\b[^\n;{{}}]*\b{name}\b[^\n]*;",
+        source_code,
+        flags=re.MULTILINE,
+    ):
+        sources.append(match.group(0))
+    return "\n".join(sources)
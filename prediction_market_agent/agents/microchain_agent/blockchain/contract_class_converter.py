@@ -7,6 +7,7 @@ from eth_typing import ChecksumAddress
 from loguru import logger
 from microchain import Function
 from prediction_market_agent_tooling.gtypes import ABI
+from prediction_market_agent_tooling.tools.caches.db_cache import db_cache
 from prediction_market_agent_tooling.tools.contract import ContractOnGnosisChain
 
 from prediction_market_agent.agents.microchain_agent.blockchain.code_interpreter import (
@@ -24,9 +25,26 @@ from prediction_market_agent.agents.microchain_agent.blockchain.type_mapping imp
     get_example_args_from_solidity_type,
     get_python_type_from_solidity_type,
 )
+from prediction_market_agent.tools.multicall import get_multicall_micro_batcher
 from prediction_market_agent.utils import APIKeys
 
 
+@db_cache
+def fetch_smart_contract_from_blockscout(
+    contract_address: ChecksumAddress,
+) -> dict[str, Any]:
+    """
+    Verified contract's ABI and source code can not change, so they are cached
+    without expiration.
+    """
+    r = requests.get(
+        f"https://gnosis.blockscout.com/api/v2/smart-contracts/{contract_address}"
+    )
+    r.raise_for_status()
+    data: dict[str, Any] = r.json()
+    return data
+
+
 class FunctionWithKeys(Function):
     def __init__(self, keys: APIKeys) -> None:
         self.keys = keys
@@ -54,14 +72,14 @@ class ContractClassConverter:
     def __init__(self, contract_address: ChecksumAddress, contract_name: str):
         self.contract_address = contract_address
         self.contract_name = contract_name
+        self._blockscout_data: dict[str, Any] | None = None
 
     def fetch_from_blockscout(self) -> dict[str, Any]:
-        r = requests.get(
-            f"https://gnosis.blockscout.com/api/v2/smart-contracts/{self.contract_address}"
-        )
-        r.raise_for_status()
-        data: dict[str, Any] = r.json()
-        return data
+        if self._blockscout_data is None:
+            self._blockscout_data = fetch_smart_contract_from_blockscout(
+                self.contract_address
+            )
+        return self._blockscout_data
 
     def get_abi(self) -> list[ABIMetadata]:
         data = self.fetch_from_blockscout()
@@ -121,11 +139,14 @@ class ContractClassConverter:
         if not output_args:
             output_args = "None"
 
-        namespace = {"contract": contract}
+        namespace = {
+            "contract": contract,
+            "multicall_batcher": get_multicall_micro_batcher(),
+        }
 
         base = Function
         if abi_item.stateMutability == AbiItemStateMutabilityEnum.VIEW:
-            function_code = f"def {abi_item.name}(self, {input_args}) -> {output_args}: return contract.call('{abi_item.name}', [{input_as_list}])"
+            function_code = f"def {abi_item.name}(self, {input_args}) -> {output_args}: return multicall_batcher.call(contract, '{abi_item.name}', [{input_as_list}])"
 
         elif abi_item.stateMutability in [
             AbiItemStateMutabilityEnum.PAYABLE,
@@ -156,6 +177,8 @@ class ContractClassConverter:
             "__call__": dynamic_function,
             "description": summary.summary,
             "example_args": example_args,
+            # View calls can run in parallel, and get batched into a single multicall.
+            "is_read_only": abi_item.stateMutability == AbiItemStateMutabilityEnum.VIEW,
         }
 
         dynamic_class = ClassFactory().create_class(class_name, (base,), attributes)
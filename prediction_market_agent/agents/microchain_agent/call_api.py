@@ -1,13 +1,65 @@
 import json
+from functools import cache
 from typing import Optional
 
 import requests
 from microchain import Function
+from requests.adapters import HTTPAdapter
 
 from prediction_market_agent.utils import APIKeys
 
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+# Responses are cut at this size, so that they don't flood the agent's history.
+DEFAULT_MAX_RESPONSE_BYTES = 100_000
+
+
+@cache
+def get_http_session() -> requests.Session:
+    """
+    Session shared by the functions, so the connections are kept alive and
+    reused between the calls.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def read_response_text(response: requests.Response, max_bytes: int) -> str:
+    """
+    Stream the (decompressed) response body, and stop reading after `max_bytes`.
+    """
+    content = bytearray()
+    truncated = False
+    for chunk in response.iter_content(chunk_size=8192):
+        content.extend(chunk)
+        if len(content) > max_bytes:
+            del content[max_bytes:]
+            truncated = True
+            break
+    response.close()
+
+    text = content.decode(response.encoding or "utf-8", errors="replace")
+    if truncated:
+        text += f"\n\n[Response truncated after {max_bytes} bytes.]"
+    return text
+
 
 class CallAPI(Function):
+    def __init__(
+        self,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        max_response_bytes: int = DEFAULT_MAX_RESPONSE_BYTES,
+    ) -> None:
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_response_bytes = max_response_bytes
+        # Responses to GET requests, cached for the lifetime of this function (i.e. the agent's run).
+        self.get_cache: dict[tuple[str, str | None, str | None], str] = {}
+        super().__init__()
+
     @property
     def description(self) -> str:
         return (
@@ -42,15 +94,26 @@ class CallAPI(Function):
         Returns:
             str: The response string if the request was successful.
         """
-        response = requests.request(
+        is_get = method.upper() == "GET" and not data
+        cache_key = (url, params, headers)
+        if is_get and cache_key in self.get_cache:
+            return self.get_cache[cache_key]
+
+        response = get_http_session().request(
             method,
             url,
             params=json.loads(params) if params else None,
             data=json.loads(data) if data else None,
             headers=json.loads(headers) if headers else None,
+            timeout=self.timeout,
+            stream=True,
         )
         response.raise_for_status()
-        return response.text
+        text = read_response_text(response, max_bytes=self.max_response_bytes)
+
+        if is_get:
+            self.get_cache[cache_key] = text
+        return text
 
 
 class SendTelegramMessage(Function):
@@ -67,8 +130,12 @@ class SendTelegramMessage(Function):
         chat_id: str,
         message: str,
     ) -> str:
-        url = f"https://api.telegram.org/bot{APIKeys().telegram_bot_key.get_secret_value()}/sendMessage?chat_id={chat_id}&text={message}"
-        response = requests.get(url)
+        url = f"https://api.telegram.org/bot{APIKeys().telegram_bot_key.get_secret_value()}/sendMessage"
+        response = get_http_session().get(
+            url,
+            params={"chat_id": chat_id, "text": message},
+            timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+        )
         response.raise_for_status()
         return "Message sent"
 
@@ -0,0 +1,106 @@
+import typing as t
+
+from microchain import Agent
+from prediction_market_agent_tooling.tools.utils import utcnow
+
+from prediction_market_agent.agents.goal_manager import Goal
+from prediction_market_agent.agents.microchain_agent.microchain_agent import (
+    AgentHistorySaver,
+)
+from prediction_market_agent.db.agent_checkpoint_table_handler import (
+    AgentCheckpointTableHandler,
+)
+from prediction_market_agent.db.models import AgentCheckpointModel
+
+
+class AgentCheckpointer:
+    """
+    Callback for `agent.on_iteration_end`, that checkpoints the agent's state
+    after each completed iteration: its history, the current system prompt,
+    goal, the iteration counter and the token usage.
+
+    A session that didn't finish can be continued from its checkpoint with
+    `restore_agent` and `agent.run(..., resume=True)`, instead of repeating
+    the completed iterations.
+    """
+
+    def __init__(
+        self,
+        table_handler: AgentCheckpointTableHandler,
+        initial_system_prompt: str,
+        history_saver: AgentHistorySaver,
+        goal: Goal | None,
+        resumed_from: AgentCheckpointModel | None = None,
+    ) -> None:
+        self.table_handler = table_handler
+        self.initial_system_prompt = initial_system_prompt
+        self.history_saver = history_saver
+        self.goal = goal
+        self.iteration = resumed_from.iteration if resumed_from else 0
+        # Each session keeps a single checkpoint, that is overwritten.
+        self.checkpoint_id = resumed_from.id if resumed_from else None
+        # Only the messages after these are added with the next checkpoint.
+        self.n_history_messages = resumed_from.n_history_messages if resumed_from else 0
+
+    def register(self, agent: Agent) -> None:
+        previous_callback = agent.on_iteration_end
+
+        def on_iteration_end(agent: Agent) -> None:
+            self(agent)
+            if previous_callback is not None:
+                previous_callback(agent)
+
+        agent.on_iteration_end = on_iteration_end
+
+    def __call__(self, agent: Agent) -> None:
+        self.iteration += 1
+        self.save(agent, is_finished=False)
+
+    def save(self, agent: Agent, is_finished: bool) -> None:
+        # Agents with dummy LLMs (e.g. in tests) don't track the token usage.
+        token_tracker = getattr(agent.llm.generator, "token_tracker", None)
+        checkpoint = self.table_handler.save_checkpoint(
+            AgentCheckpointModel(
+                id=self.checkpoint_id,
+                agent_id=self.table_handler.agent_id,
+                n_history_messages=len(agent.history),
+                initial_system_prompt=self.initial_system_prompt,
+                system_prompt=str(agent.system_prompt),
+                goal=self.goal.model_dump_json() if self.goal else None,
+                iteration=self.iteration,
+                n_saved_history_messages=self.history_saver.n_saved_messages,
+                prompt_tokens=token_tracker.prompt_tokens if token_tracker else 0,
+                completion_tokens=(
+                    token_tracker.completion_tokens if token_tracker else 0
+                ),
+                is_finished=is_finished,
+                datetime_=utcnow(),
+            ),
+            new_messages=agent.history[self.n_history_messages :],
+            n_previous_messages=self.n_history_messages,
+        )
+        self.checkpoint_id = checkpoint.id
+        self.n_history_messages = len(agent.history)
+
+
+def restore_agent(
+    agent: Agent, checkpoint: AgentCheckpointModel, history: list[dict[str, t.Any]]
+) -> Goal | None:
+    """
+    Restore the agent's state from the checkpoint and its history, and return
+    its goal, if any.
+    """
+    goal = Goal.model_validate_json(checkpoint.goal) if checkpoint.goal else None
+    agent.history = history
+    agent.system_prompt = checkpoint.system_prompt
+    # The system message is saved with the first checkpoint, but the agent can modify its prompt later.
+    if agent.history and agent.history[0]["role"] == "system":
+        agent.history[0] = dict(role="system", content=checkpoint.system_prompt)
+    if goal:
+        agent.prompt = goal.to_prompt()
+
+    if token_tracker := getattr(agent.llm.generator, "token_tracker", None):
+        token_tracker.prompt_tokens = checkpoint.prompt_tokens
+        token_tracker.completion_tokens = checkpoint.completion_tokens
+
+    return goal
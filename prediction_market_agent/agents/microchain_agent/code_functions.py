@@ -1,11 +1,21 @@
 import json
-import tempfile
 
 from autogen.coding import CodeBlock, LocalCommandLineCodeExecutor
 from microchain import Function
 
+from prediction_market_agent.agents.microchain_agent.code_sandbox import (
+    PREINSTALLED_PACKAGES,
+    SandboxPool,
+    get_sandbox_pool,
+)
+
 
 class ExecuteCodeFunction(Function):
+    def __init__(self, sandbox_pool: SandboxPool | None = None) -> None:
+        # The shared pool starts warming up its sandboxes as soon as the agent is built.
+        self.sandbox_pool = sandbox_pool or get_sandbox_pool()
+        super().__init__()
+
     @property
     def description(self) -> str:
         return (
@@ -14,12 +24,13 @@ class ExecuteCodeFunction(Function):
             " To get any output, simply print the variables you want to see."
             " To install non existing libraries, use `bash` language and use the language's package tool to install the library."
             " Prepend the code block with library installation command before the actual code block and then try again."
+            f" Installed libraries are kept for the next executions, these are installed already: {PREINSTALLED_PACKAGES}."
         )
 
     @property
     def example_args(self) -> list[str]:
         return [
-            '[{"language":"bash","code":"pip install prediction-market-agent-tooling"},{"language":"python","code":"print(\'Hello, World!\')"}]'
+            '[{"language":"bash","code":"pip install tabulate"},{"language":"python","code":"print(\'Hello, World!\')"}]'
         ]
 
     def __call__(self, code_blocks: str) -> str:
@@ -33,10 +44,11 @@ class ExecuteCodeFunction(Function):
                 code_block.language, code_block.code
             )
 
-        with tempfile.TemporaryDirectory() as temp_dir:
+        with self.sandbox_pool.acquire() as sandbox:
             executor = LocalCommandLineCodeExecutor(
                 timeout=60,
-                work_dir=temp_dir,
+                work_dir=sandbox.work_dir,
+                virtual_env_context=sandbox.venv_context,
             )
             result = executor.execute_code_blocks(code_blocks_parsed)
 
@@ -0,0 +1,173 @@
+import atexit
+import fcntl
+import hashlib
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import typing as t
+import venv
+from contextlib import contextmanager
+from functools import cache
+from pathlib import Path
+from types import SimpleNamespace
+
+from autogen.code_utils import create_virtual_env
+from prediction_market_agent_tooling.loggers import logger
+
+DEFAULT_SANDBOXES_DIR = Path(tempfile.gettempdir()) / "code-sandboxes"
+PREINSTALLED_PACKAGES = ["prediction-market-agent-tooling"]
+# Written into the virtualenv once it's fully created, so it can be reused by the next processes.
+VENV_READY_MARKER = ".ready"
+
+
+class Sandbox:
+    """
+    Working directory for code execution, backed by a persistent virtualenv.
+
+    The virtualenv sees the agent's own packages (so the preinstalled ones are
+    usually there already), and packages installed into it are kept for the
+    next uses, also by the next processes. Pip downloads are cached in a
+    directory shared by all the sandboxes.
+    """
+
+    def __init__(
+        self,
+        work_dir: Path,
+        venv_dir: Path,
+        pip_cache_dir: Path,
+        preinstalled_packages: list[str],
+    ) -> None:
+        self.work_dir = work_dir
+        self.venv_dir = venv_dir
+        self.pip_cache_dir = pip_cache_dir
+        self.preinstalled_packages = preinstalled_packages
+        self._venv_context: SimpleNamespace | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def venv_context(self) -> SimpleNamespace:
+        with self._lock:
+            if self._venv_context is None:
+                self._venv_context = self._get_or_create_venv()
+            return self._venv_context
+
+    def _get_or_create_venv(self) -> SimpleNamespace:
+        self.venv_dir.parent.mkdir(parents=True, exist_ok=True)
+        # Other processes on the same host use the same virtualenvs.
+        with open(self.venv_dir.with_suffix(".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if (self.venv_dir / VENV_READY_MARKER).exists():
+                return venv.EnvBuilder(
+                    system_site_packages=True, with_pip=True
+                ).ensure_directories(self.venv_dir)
+            context = self._create_venv()
+            (self.venv_dir / VENV_READY_MARKER).touch()
+            return context
+
+    def _create_venv(self) -> SimpleNamespace:
+        logger.info(f"Creating code sandbox's virtualenv in {self.venv_dir}.")
+        # Start from scratch, in case the previous attempt failed halfway.
+        shutil.rmtree(self.venv_dir, ignore_errors=True)
+        context = create_virtual_env(str(self.venv_dir), system_site_packages=True)
+        # Pip reads the configuration from the virtualenv's root directory.
+        (self.venv_dir / "pip.conf").write_text(
+            f"[global]\ncache-dir = {self.pip_cache_dir}\n"
+        )
+        if self.preinstalled_packages:
+            result = subprocess.run(
+                [context.env_exe, "-m", "pip", "install", *self.preinstalled_packages],
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode != 0:
+                raise RuntimeError(
+                    f"Installing {self.preinstalled_packages} into {self.venv_dir} failed: {result.stderr}"
+                )
+        return context
+
+    def reset(self) -> None:
+        """
+        Remove the files left by the previous use, the virtualenv is kept.
+        """
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        self.work_dir.mkdir(parents=True)
+
+
+class SandboxPool:
+    """
+    The working directories live in a directory of their own for each pool,
+    so that agents running on the same host don't remove each other's files.
+    The virtualenvs are kept under `root_dir`, one set per the preinstalled
+    packages and Python version, and reused by the next pools.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        root_dir: Path = DEFAULT_SANDBOXES_DIR,
+        preinstalled_packages: list[str] = PREINSTALLED_PACKAGES,
+    ) -> None:
+        root_dir.mkdir(parents=True, exist_ok=True)
+        self.pool_dir = Path(tempfile.mkdtemp(prefix="pool-", dir=root_dir))
+        venvs_dir = root_dir / f"venvs-{get_venvs_key(preinstalled_packages)}"
+        self.sandboxes = [
+            Sandbox(
+                work_dir=self.pool_dir / f"sandbox-{i}",
+                venv_dir=venvs_dir / f"venv-{i}",
+                pip_cache_dir=root_dir / "pip-cache",
+                preinstalled_packages=preinstalled_packages,
+            )
+            for i in range(size)
+        ]
+        self._free_sandboxes: queue.Queue[Sandbox] = queue.Queue()
+        for sandbox in self.sandboxes:
+            self._free_sandboxes.put(sandbox)
+
+    def warm_up(self) -> threading.Thread:
+        """
+        Get the sandboxes' virtualenvs ready in the background, so they are
+        ready by the time the code is executed. If it fails, it's tried again,
+        and the error raised, when the sandbox is acquired.
+        """
+
+        def create_venvs() -> None:
+            for sandbox in self.sandboxes:
+                try:
+                    sandbox.venv_context
+                except Exception as e:
+                    logger.error(f"Warming up the code sandbox failed: {e}")
+
+        thread = threading.Thread(target=create_venvs, daemon=True)
+        thread.start()
+        return thread
+
+    @contextmanager
+    def acquire(self) -> t.Generator[Sandbox, None, None]:
+        sandbox = self._free_sandboxes.get()
+        try:
+            # Waits for the warm-up, or creates the virtualenv if it failed.
+            sandbox.venv_context
+            sandbox.reset()
+            yield sandbox
+        finally:
+            self._free_sandboxes.put(sandbox)
+
+    def close(self) -> None:
+        # Only the working directories, the virtualenvs are kept for the next pools.
+        shutil.rmtree(self.pool_dir, ignore_errors=True)
+
+
+def get_venvs_key(preinstalled_packages: list[str]) -> str:
+    packages = ",".join(sorted(preinstalled_packages))
+    return hashlib.sha256(f"{sys.version}|{packages}".encode()).hexdigest()[:16]
+
+
+@cache
+def get_sandbox_pool() -> SandboxPool:
+    pool = SandboxPool()
+    pool.warm_up()
+    atexit.register(pool.close)
+    return pool
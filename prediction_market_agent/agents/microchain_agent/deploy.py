@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from microchain import Agent
 from prediction_market_agent_tooling.deploy.agent import DeployableAgent
 from prediction_market_agent_tooling.loggers import logger
@@ -5,27 +7,40 @@ from prediction_market_agent_tooling.markets.markets import MarketType
 from prediction_market_agent_tooling.tools.langfuse_ import observe
 from prediction_market_agent_tooling.tools.utils import check_not_none
 
-from prediction_market_agent.agents.goal_manager import GoalManager
+from prediction_market_agent.agents.goal_manager import Goal, GoalManager
+from prediction_market_agent.agents.microchain_agent.checkpoint import (
+    AgentCheckpointer,
+    restore_agent,
+)
 from prediction_market_agent.agents.microchain_agent.memory import (
     ChatHistory,
     ChatMessage,
 )
 from prediction_market_agent.agents.microchain_agent.microchain_agent import (
+    AgentHistorySaver,
     SupportedModel,
     build_agent,
     get_editable_prompt_from_agent,
     get_functions_summary_list,
     get_unformatted_system_prompt,
-    save_agent_history,
+    get_user_prompt_index,
 )
 from prediction_market_agent.agents.microchain_agent.prompts import (
     SYSTEM_PROMPTS,
     FunctionsConfig,
     SystemPromptChoice,
 )
+from prediction_market_agent.agents.microchain_agent.tool_selection import (
+    FunctionSelector,
+    SelectiveHelpEngine,
+)
 from prediction_market_agent.agents.utils import AgentIdentifier
+from prediction_market_agent.db.agent_checkpoint_table_handler import (
+    AgentCheckpointTableHandler,
+)
 from prediction_market_agent.db.long_term_memory_table_handler import (
     LongTermMemoryTableHandler,
+    build_memory_embeddings,
 )
 from prediction_market_agent.db.prompt_table_handler import PromptTableHandler
 from prediction_market_agent.utils import APIKeys
@@ -36,6 +51,22 @@ GENERAL_AGENT_TAG = "general_agent"
 class DeployableMicrochainAgent(DeployableAgent):
     model = SupportedModel.gpt_4o
     n_iterations = 50
+    # If set, the history sent to the model is compacted to this many tokens.
+    max_history_tokens: int | None = None
+    # Model writing the summary of the compacted history, if not the agent's own.
+    history_summarization_model: SupportedModel | None = None
+    # How often are the completed steps written to the long-term memory.
+    history_flush_every_n_steps: int = 5
+    # Continue the last session from its checkpoint, if it didn't finish.
+    resume_unfinished_session: bool = True
+    # Older checkpoints are ignored, as their market state and history would be
+    # stale, e.g. set it to the interval between the agent's scheduled runs.
+    resume_max_checkpoint_age: timedelta = timedelta(hours=1)
+    # Let the agent call several read-only functions at once, executed concurrently.
+    allow_parallel_read_only_calls: bool = False
+    # If set, only this many functions most relevant to the agent's instructions
+    # (or goal) are described in the system prompt, the agent can list the rest.
+    max_functions_in_help: int | None = None
     load_historical_prompt: bool = False
     system_prompt_choice: SystemPromptChoice = SystemPromptChoice.TRADING_AGENT
     task_description = AgentIdentifier.MICROCHAIN_AGENT_OMEN
@@ -55,21 +86,47 @@ class DeployableMicrochainAgent(DeployableAgent):
         Override main 'run' method, as the all logic from the helper methods
         is handed over to the agent.
         """
-        self.run_general_agent(market_type=market_type)
+        self.run_general_agent(
+            market_type=market_type, resume=self.resume_unfinished_session
+        )
 
     @observe()
     def run_general_agent(
         self,
         market_type: MarketType,
+        resume: bool = False,
     ) -> None:
+        """
+        If `resume` is set and the agent's last session didn't finish (e.g. the
+        pod was preempted), continue it from its checkpoint instead of starting
+        a new one.
+        """
         self.langfuse_update_current_trace(
             tags=[GENERAL_AGENT_TAG, self.system_prompt_choice, self.task_description]
         )
 
+        embeddings = build_memory_embeddings()
         long_term_memory = LongTermMemoryTableHandler(
-            task_description=self.task_description
+            task_description=self.task_description,
+            embeddings=embeddings,
         )
         prompt_handler = PromptTableHandler(session_identifier=self.task_description)
+        checkpoint_handler = AgentCheckpointTableHandler(agent_id=self.task_description)
+        checkpoint = (
+            checkpoint_handler.get_unfinished_checkpoint(
+                max_age=self.resume_max_checkpoint_age
+            )
+            if resume
+            else None
+        )
+        checkpoint_history = (
+            checkpoint_handler.get_history(checkpoint) if checkpoint else None
+        )
+        if checkpoint and checkpoint_history is None:
+            logger.warning(
+                "Not resuming the unfinished session, its checkpoint's history is incomplete."
+            )
+            checkpoint = None
         unformatted_system_prompt = get_unformatted_system_prompt(
             unformatted_prompt=SYSTEM_PROMPTS[self.system_prompt_choice],
             prompt_table_handler=(
@@ -88,26 +145,78 @@ class DeployableMicrochainAgent(DeployableAgent):
                 self.system_prompt_choice
             ),
             enable_langfuse=self.enable_langfuse,
+            max_history_tokens=self.max_history_tokens,
+            history_summarization_model=self.history_summarization_model,
+            allow_parallel_read_only_calls=self.allow_parallel_read_only_calls,
+            function_selector=(
+                FunctionSelector(embeddings=embeddings, k=self.max_functions_in_help)
+                if self.max_functions_in_help is not None
+                else None
+            ),
         )
 
-        if goal_manager := self.build_goal_manager(agent=agent):
-            goal = goal_manager.get_goal()
-            agent.prompt = goal.to_prompt()
+        goal_manager = self.build_goal_manager(agent=agent)
+        goal: Goal | None = None
+        if checkpoint:
+            logger.info(
+                f"Resuming unfinished session from iteration {checkpoint.iteration}."
+            )
+            goal = restore_agent(
+                agent=agent,
+                checkpoint=checkpoint,
+                history=check_not_none(checkpoint_history),
+            )
+            initial_formatted_system_prompt = checkpoint.initial_system_prompt
+        else:
+            if goal_manager:
+                goal = goal_manager.get_goal()
+                agent.prompt = goal.to_prompt()
+                if isinstance(agent.engine, SelectiveHelpEngine):
+                    # Describe the functions relevant to the goal instead.
+                    agent.engine.help_query = agent.prompt
+                    agent.system_prompt = unformatted_system_prompt.format(
+                        engine_help=agent.engine.help
+                    )
 
-        # Save formatted system prompt
-        initial_formatted_system_prompt = agent.system_prompt
+            # Save formatted system prompt
+            initial_formatted_system_prompt = agent.system_prompt
+
+        # Persist the history as the session goes, so it isn't lost if the run crashes.
+        history_saver = AgentHistorySaver(
+            long_term_memory=long_term_memory,
+            initial_system_prompt=initial_formatted_system_prompt,
+            flush_every_n_steps=self.history_flush_every_n_steps,
+            n_saved_messages=checkpoint.n_saved_history_messages if checkpoint else 0,
+        )
+        history_saver.register(agent)
+        checkpointer = AgentCheckpointer(
+            table_handler=checkpoint_handler,
+            initial_system_prompt=initial_formatted_system_prompt,
+            history_saver=history_saver,
+            goal=goal,
+            resumed_from=checkpoint,
+        )
+        checkpointer.register(agent)
 
         try:
-            agent.run(self.n_iterations)
+            agent.run(
+                max(self.n_iterations - checkpointer.iteration, 0),
+                resume=checkpoint is not None,
+            )
         except Exception as e:
             logger.error(e)
+            # Keep the session unfinished, so the next run resumes it, and
+            # evaluate its goal only once it's finished.
+            history_saver.flush(agent)
+            checkpointer.save(agent, is_finished=False)
             raise e
-        finally:
+        else:
             if goal_manager:
                 goal = check_not_none(goal)
                 goal_evaluation = goal_manager.evaluate_goal_progress(
                     goal=goal,
                     chat_history=ChatHistory.from_list_of_dicts(agent.history),
+                    goal_prompt_index=get_user_prompt_index(agent),
                 )
                 goal_manager.save_evaluated_goal(
                     goal=goal,
@@ -120,11 +229,9 @@ class DeployableMicrochainAgent(DeployableAgent):
                     ).model_dump()
                 )
 
-            save_agent_history(
-                agent=agent,
-                long_term_memory=long_term_memory,
-                initial_system_prompt=initial_formatted_system_prompt,
-            )
+            history_saver.flush(agent)
+            checkpointer.save(agent, is_finished=True)
+        finally:
             if agent.system_prompt != initial_formatted_system_prompt:
                 prompt_handler.save_prompt(get_editable_prompt_from_agent(agent))
 
@@ -165,6 +272,8 @@ class DeployableMicrochainModifiableSystemPromptAgent3(
     model = SupportedModel.llama_31_instruct
     # Force less iterations, because Replicate's API allows at max 4096 input tokens.
     n_iterations = 10
+    # And compact the history to fit, leaving a margin for the summary message.
+    max_history_tokens = 3500
     description = "Microchain agent with 'just born' system prompt, and ability to adjust its own system prompt, version 3. Uses Llama 3.1 model."
 
 
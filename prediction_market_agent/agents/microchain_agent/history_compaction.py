@@ -0,0 +1,184 @@
+import typing as t
+
+import tiktoken
+from prediction_market_agent_tooling.loggers import logger
+from prediction_market_agent_tooling.tools.langfuse_ import observe
+from transformers import AutoTokenizer
+
+Messages = list[dict[str, t.Any]]
+
+SUMMARY_MESSAGE_HEADER = "# Summary of the earlier part of this session"
+
+SUMMARIZE_HISTORY_PROMPT_TEMPLATE = """
+You are summarizing the earlier part of a session of an autonomous agent, that
+interacts with the world by calling functions. The summary replaces the
+messages below in the agent's context, so keep every fact the agent may need
+later: market ids, probabilities, balances, bought or sold amounts, errors and
+the agent's reasoning and plans. Be concise.
+
+[PREVIOUS SUMMARY]
+{previous_summary}
+
+[NEW MESSAGES]
+{messages}
+"""
+
+
+class TiktokenCounter:
+    """
+    Counts the tokens of chat messages sent to OpenAI models.
+    """
+
+    # Overhead of the chat format, see https://github.com/openai/openai-cookbook/blob/main/examples/How_to_count_tokens_with_tiktoken.ipynb
+    TOKENS_PER_MESSAGE = 4
+    TOKENS_PER_REPLY = 3
+
+    def __init__(self, model: str) -> None:
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            # Newer models might be missing in tiktoken's registry.
+            self.encoding = tiktoken.get_encoding("o200k_base")
+
+    def __call__(self, messages: Messages) -> int:
+        return self.TOKENS_PER_REPLY + sum(
+            self.TOKENS_PER_MESSAGE + len(self.encoding.encode(str(m["content"])))
+            for m in messages
+        )
+
+
+class HFTokenizerCounter:
+    """
+    Counts the tokens of chat messages using a Hugging Face tokenizer's chat
+    template, the same way as the prompt is built for Replicate's models.
+    """
+
+    def __init__(self, pretrained_model_name_or_path: str) -> None:
+        self.tokenizer = AutoTokenizer.from_pretrained(pretrained_model_name_or_path)
+
+    def __call__(self, messages: Messages) -> int:
+        return len(self.tokenizer.apply_chat_template(messages))
+
+
+class HistoryCompactor:
+    """
+    Template for microchain's `LLM`, that keeps the messages sent to the model
+    within `max_tokens`.
+
+    The leading system (and user) prompt is always kept, as are the most recent
+    messages. Once the budget is exceeded, the older messages are folded into a
+    rolling summary. The summary is only extended with messages that aged out
+    of the recent window since the last compaction, so each message is
+    summarized once.
+
+    The agent's own `history` is left untouched, so it can still be saved to
+    the long-term memory in full.
+
+    The summary is written by `generator`, a microchain chat generator, e.g.
+    the agent's own.
+    """
+
+    def __init__(
+        self,
+        count_tokens: t.Callable[[Messages], int],
+        max_tokens: int,
+        generator: t.Callable[[Messages], str],
+        min_recent_messages: int = 4,
+    ) -> None:
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.generator = generator
+        self.min_recent_messages = min_recent_messages
+        self.summary: str | None = None
+        # Number of the non-pinned messages folded into `summary`.
+        self.n_summarized = 0
+
+    def reset(self) -> None:
+        self.summary = None
+        self.n_summarized = 0
+
+    @staticmethod
+    def get_n_pinned_messages(messages: Messages) -> int:
+        """
+        Number of the leading messages (system prompt and optional user prompt)
+        before the agent's first function call.
+        """
+        for i, message in enumerate(messages):
+            if message["role"] == "assistant":
+                return i
+        return len(messages)
+
+    def build_summary_message(self) -> dict[str, t.Any]:
+        return dict(role="user", content=f"{SUMMARY_MESSAGE_HEADER}\n{self.summary}")
+
+    def __call__(self, messages: Messages) -> Messages:
+        n_pinned = self.get_n_pinned_messages(messages)
+        pinned, rest = messages[:n_pinned], messages[n_pinned:]
+
+        if len(rest) < self.n_summarized:
+            # The agent's history has been reset, start from scratch.
+            self.reset()
+
+        compacted = self.compact(pinned, rest)
+        # Usually one pass is enough, but the first summary can push the
+        # prompt over the budget again, as its size isn't known beforehand.
+        while self.count_tokens(compacted) > self.max_tokens:
+            split = self.get_recent_window_start(pinned, rest)
+            if split <= self.n_summarized:
+                # Nothing more to summarize, the recent window must be kept.
+                break
+
+            logger.info(
+                f"Compacting {split - self.n_summarized} messages into the history summary."
+            )
+            self.summary = self.summarize(
+                previous_summary=self.summary,
+                messages=rest[self.n_summarized : split],
+            )
+            self.n_summarized = split
+            compacted = self.compact(pinned, rest)
+
+        return compacted
+
+    def get_recent_window_start(self, pinned: Messages, rest: Messages) -> int:
+        """
+        Find the start of the longest window of recent messages that fits into
+        the budget, next to the pinned messages and the summary.
+        """
+        budget = self.max_tokens - self.count_tokens(pinned)
+        if self.summary is not None:
+            budget -= self.count_tokens([self.build_summary_message()])
+
+        split, window_tokens = len(rest), 0
+        while split > self.n_summarized:
+            message_tokens = self.count_tokens([rest[split - 1]])
+            if (
+                len(rest) - split >= self.min_recent_messages
+                and window_tokens + message_tokens > budget
+            ):
+                break
+            window_tokens += message_tokens
+            split -= 1
+
+        # Start the window at a function call, not in the middle of a call
+        # and its result.
+        while (
+            split > self.n_summarized
+            and split < len(rest)
+            and rest[split]["role"] != "assistant"
+        ):
+            split -= 1
+        return split
+
+    def compact(self, pinned: Messages, rest: Messages) -> Messages:
+        if self.summary is None:
+            return pinned + rest
+        return pinned + [self.build_summary_message()] + rest[self.n_summarized :]
+
+    @observe()
+    def summarize(self, previous_summary: str | None, messages: Messages) -> str:
+        prompt = SUMMARIZE_HISTORY_PROMPT_TEMPLATE.format(
+            previous_summary=previous_summary or "-- None --",
+            messages="\n".join(f"{m['role']}: {m['content']}" for m in messages),
+        )
+        return self.generator([dict(role="user", content=prompt)])
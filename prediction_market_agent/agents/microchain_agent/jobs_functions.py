@@ -19,6 +19,8 @@ class JobFunction(Function):
 
 
 class GetJobs(JobFunction):
+    is_read_only = True
+
     @property
     def description(self) -> str:
         return f"""Use this function to get available jobs in a JSON dumped format.
@@ -4,6 +4,8 @@ from microchain import Function
 
 
 class LearningFunction(Function):
+    is_read_only = True
+
     title: str
     knowledge: str
 
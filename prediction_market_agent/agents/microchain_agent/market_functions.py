@@ -1,3 +1,4 @@
+import json
 import typing as t
 from datetime import timedelta
 
@@ -19,13 +20,17 @@ from prediction_market_agent_tooling.tools.betting_strategies.kelly_criterion im
 from prediction_market_agent_tooling.tools.utils import utcnow
 
 from prediction_market_agent.agents.microchain_agent.utils import (
+    MarketProbability,
     MicroMarket,
     get_balance,
     get_binary_markets,
     get_boolean_outcome,
     get_example_market_id,
+    get_market_probabilities,
     get_no_outcome,
+    get_traded_token_amount_from_tx,
     get_yes_outcome,
+    is_trade_receipt_supported,
 )
 from prediction_market_agent.tools.mech.utils import MechResponse, MechTool
 from prediction_market_agent.tools.prediction_prophet.research import (
@@ -39,6 +44,9 @@ WITHDRAW_MULTIPLIER = 2
 
 
 class MarketFunction(Function):
+    # Read-only functions don't change any state, so they can be called concurrently.
+    is_read_only = False
+
     def __init__(self, market_type: MarketType, keys: APIKeys) -> None:
         self.keys = keys
         self.market_type = market_type
@@ -50,6 +58,8 @@ class MarketFunction(Function):
 
 
 class GetMarkets(MarketFunction):
+    is_read_only = True
+
     @property
     def description(self) -> str:
         return (
@@ -69,6 +79,8 @@ class GetMarkets(MarketFunction):
 
 
 class GetMarketProbability(MarketFunction):
+    is_read_only = True
+
     @property
     def description(self) -> str:
         return (
@@ -92,6 +104,45 @@ class GetMarketProbability(MarketFunction):
         ]
 
 
+class GetMarketProbabilities(MarketFunction):
+    is_read_only = True
+
+    @property
+    def description(self) -> str:
+        return (
+            f"Use this function to get the probability of a 'Yes' outcome, the "
+            f"liquidity in {self.currency} and the closing time for multiple "
+            f"binary prediction markets at once. Pass in a single json encoded "
+            f"list of market ids. Prefer this over calling GetMarketProbability "
+            f"for each market."
+        )
+
+    @property
+    def example_args(self) -> list[str]:
+        return [json.dumps([get_example_market_id(self.market_type)])]
+
+    def __call__(self, market_ids: str) -> str:
+        market_ids_parsed: list[str] = json.loads(market_ids)
+        if not isinstance(market_ids_parsed, list):
+            raise ValueError("Market ids must be passed as a json encoded list.")
+
+        probabilities = {
+            p.id.lower(): p
+            for p in get_market_probabilities(
+                market_type=self.market_type, market_ids=market_ids_parsed
+            )
+        }
+        rows = [MarketProbability.TABLE_HEADER]
+        for market_id in market_ids_parsed:
+            probability = probabilities.get(market_id.lower())
+            rows.append(
+                str(probability)
+                if probability is not None
+                else f"{market_id} | not found"
+            )
+        return "\n".join(rows)
+
+
 class PredictProbabilityForQuestionBase(MarketFunction):
     def __init__(
         self,
@@ -116,6 +167,8 @@ class PredictProbabilityForQuestion(PredictProbabilityForQuestionBase):
     Uses the prediction_prophet library to make a prediction.
     """
 
+    is_read_only = True
+
     def __init__(
         self,
         market_type: MarketType,
@@ -191,6 +244,20 @@ class PredictProbabilityForQuestionMech(PredictProbabilityForQuestionBase):
         return str(response.p_yes)
 
 
+def get_unknown_traded_amount_message(
+    market: AgentMarket, outcome: str, user_address: str
+) -> str:
+    """
+    Reply for a trade that went through, but whose traded token amount
+    couldn't be read from its receipt.
+    """
+    holding = market.get_token_balance(user_id=user_address, outcome=outcome)
+    return (
+        f"The trade of {outcome} outcome tokens of market with id: {market.id} went through, "
+        f"but the traded token amount is unknown. You now hold {holding.amount} {outcome} outcome tokens."
+    )
+
+
 class BuyTokens(MarketFunction):
     def __init__(self, market_type: MarketType, outcome: str, keys: APIKeys):
         super().__init__(market_type=market_type, keys=keys)
@@ -229,19 +296,33 @@ class BuyTokens(MarketFunction):
             )
 
         market: AgentMarket = self.market_type.market_class.get_binary_market(market_id)
-        before_balance = market.get_token_balance(
-            user_id=self.user_address,
-            outcome=self.outcome,
-        )
-        market.buy_tokens(
+        # Read the bought amount from the trade's receipt if possible, and
+        # only fall back to polling the token balance before and after.
+        poll_balance = not is_trade_receipt_supported(self.market_type)
+        if poll_balance:
+            before_balance = market.get_token_balance(
+                user_id=self.user_address,
+                outcome=self.outcome,
+            )
+        tx_hash = market.buy_tokens(
             outcome=self.outcome_bool,
             amount=TokenAmount(amount=amount, currency=self.currency),
         )
-        after_balance = market.get_token_balance(
-            user_id=self.user_address,
-            outcome=self.outcome,
-        )
-        tokens = float(after_balance.amount - before_balance.amount)
+        if poll_balance:
+            after_balance = market.get_token_balance(
+                user_id=self.user_address,
+                outcome=self.outcome,
+            )
+            tokens = float(after_balance.amount - before_balance.amount)
+        else:
+            tokens = get_traded_token_amount_from_tx(
+                market=market, tx_hash=tx_hash, outcome=self.outcome, is_buy=True
+            )
+            if tokens is None:
+                # Don't report a failure, the tokens were bought.
+                return get_unknown_traded_amount_message(
+                    market=market, outcome=self.outcome, user_address=self.user_address
+                )
         return f"Bought {tokens} {self.outcome} outcome tokens of market with id: {market_id}"
 
 
@@ -295,21 +376,35 @@ class SellTokens(MarketFunction):
             )
 
         market: AgentMarket = self.market_type.market_class.get_binary_market(market_id)
-        before_balance = market.get_token_balance(
-            user_id=self.user_address,
-            outcome=self.outcome,
-        )
+        # Read the sold amount from the trade's receipt if possible, and only
+        # fall back to polling the token balance before and after.
+        poll_balance = not is_trade_receipt_supported(self.market_type)
+        if poll_balance:
+            before_balance = market.get_token_balance(
+                user_id=self.user_address,
+                outcome=self.outcome,
+            )
 
-        market.sell_tokens(
+        tx_hash = market.sell_tokens(
             outcome=self.outcome_bool,
             amount=TokenAmount(amount=amount, currency=self.currency),
         )
 
-        after_balance = market.get_token_balance(
-            user_id=self.user_address,
-            outcome=self.outcome,
-        )
-        tokens = float(before_balance.amount - after_balance.amount)
+        if poll_balance:
+            after_balance = market.get_token_balance(
+                user_id=self.user_address,
+                outcome=self.outcome,
+            )
+            tokens = float(before_balance.amount - after_balance.amount)
+        else:
+            tokens = get_traded_token_amount_from_tx(
+                market=market, tx_hash=tx_hash, outcome=self.outcome, is_buy=False
+            )
+            if tokens is None:
+                # Don't report a failure, the tokens were sold.
+                return get_unknown_traded_amount_message(
+                    market=market, outcome=self.outcome, user_address=self.user_address
+                )
         return f"Sold {tokens} {self.outcome} outcome tokens of market with id: {market_id}"
 
 
@@ -332,6 +427,8 @@ class SellNo(SellTokens):
 
 
 class GetBalance(MarketFunction):
+    is_read_only = True
+
     @property
     def description(self) -> str:
         return (
@@ -347,6 +444,8 @@ class GetBalance(MarketFunction):
 
 
 class GetLiquidPositions(MarketFunction):
+    is_read_only = True
+
     def __init__(self, market_type: MarketType, keys: APIKeys) -> None:
         super().__init__(market_type=market_type, keys=keys)
         self.user_address = self.keys.bet_from_address
@@ -373,6 +472,8 @@ class GetLiquidPositions(MarketFunction):
 
 
 class GetResolvedBetsWithOutcomes(MarketFunction):
+    is_read_only = True
+
     def __init__(self, market_type: MarketType, keys: APIKeys) -> None:
         super().__init__(market_type=market_type, keys=keys)
         self.user_address = self.keys.bet_from_address
@@ -397,6 +498,8 @@ class GetResolvedBetsWithOutcomes(MarketFunction):
 
 
 class GetKellyBet(MarketFunction):
+    is_read_only = True
+
     @property
     def description(self) -> str:
         return (
@@ -432,6 +535,7 @@ class GetKellyBet(MarketFunction):
 MARKET_FUNCTIONS: list[type[MarketFunction]] = [
     GetMarkets,
     GetMarketProbability,
+    GetMarketProbabilities,
     PredictProbabilityForQuestion,
     GetBalance,
     BuyYes,
@@ -1,10 +1,10 @@
 # inspired by crewAI's LongTermMemory (https://github.com/joaomdmoura/crewAI/blob/main/src/crewai/memory/long_term/long_term_memory.py)
-import json
 from datetime import timedelta
 from typing import Dict, Sequence
 
 from prediction_market_agent_tooling.tools.utils import DatetimeUTC, check_not_none
 from pydantic import BaseModel
+from pydantic_core import from_json
 
 from prediction_market_agent.agents.microchain_agent.answer_with_scenario import (
     AnswerWithScenario,
@@ -13,6 +13,7 @@ from prediction_market_agent.db.long_term_memory_table_handler import (
     LongTermMemoryTableHandler,
 )
 from prediction_market_agent.db.models import LongTermMemories
+from prediction_market_agent.utils import trusted_datetime_utc
 
 
 class ChatMessage(BaseModel):
@@ -34,11 +35,13 @@ class DatedChatMessage(ChatMessage):
     def from_long_term_memory(
         long_term_memory: LongTermMemories,
     ) -> "DatedChatMessage":
-        metadata = json.loads(check_not_none(long_term_memory.metadata_))
-        return DatedChatMessage(
+        # The memories are written by us, so they are loaded without the
+        # (relatively slow) validation.
+        metadata = from_json(check_not_none(long_term_memory.metadata_))
+        return DatedChatMessage.model_construct(
             content=metadata["content"],
             role=metadata["role"],
-            datetime_=long_term_memory.datetime_,
+            datetime_=trusted_datetime_utc(long_term_memory.datetime_),
         )
 
     def __str__(self) -> str:
@@ -53,11 +56,12 @@ class SimpleMemoryThinkThoroughly(BaseModel):
     def from_long_term_memory(
         long_term_memory: LongTermMemories,
     ) -> "SimpleMemoryThinkThoroughly":
-        return SimpleMemoryThinkThoroughly(
-            metadata=AnswerWithScenario.model_validate_json(
-                check_not_none(long_term_memory.metadata_)
+        # Loaded without validation, see `DatedChatMessage.from_long_term_memory`.
+        return SimpleMemoryThinkThoroughly.model_construct(
+            metadata=AnswerWithScenario.model_construct(
+                **from_json(check_not_none(long_term_memory.metadata_))
             ),
-            datetime_=long_term_memory.datetime_,
+            datetime_=trusted_datetime_utc(long_term_memory.datetime_),
         )
 
 
@@ -129,33 +133,41 @@ class DatedChatHistory(ChatHistory):
     ) -> "DatedChatHistory":
         memories = long_term_memory.search(from_=from_, to_=to)
 
-        # Sort memories by datetime
-        memories = sorted(memories, key=lambda m: m.datetime_)
+        # Sort memories by datetime, and by id for the ones saved together
+        memories = sorted(memories, key=lambda m: (m.datetime_, m.id or 0))
         chat_messages = [DatedChatMessage.from_long_term_memory(m) for m in memories]
         return cls(chat_messages=chat_messages)
 
-    def cluster_by_session(self) -> list["DatedChatHistory"]:
+    def get_session_ranges(self) -> list[tuple[int, int]]:
         """
-        Cluster chat messages by session, where a new session starts with a
-        system prompt message.
+        Offsets `(start, end)` of the sessions in the chat messages, where a new
+        session starts with a system prompt message.
         """
         if self.is_empty:
             return []
 
-        clusters: list[DatedChatHistory] = []
-        chat_messages = list(self.chat_messages).copy()
-
         # Check that the first message is a system message
-        if not chat_messages[0].is_system_message:
+        if not self.chat_messages[0].is_system_message:
             raise ValueError("First message must be a system message")
 
-        while chat_messages:
-            if chat_messages[0].is_system_message:
-                clusters.append(DatedChatHistory(chat_messages=[chat_messages.pop(0)]))
-            else:
-                clusters[-1].chat_messages.append(chat_messages.pop(0))
+        starts = [i for i, m in enumerate(self.chat_messages) if m.is_system_message]
+        return list(zip(starts, starts[1:] + [self.num_messages]))
+
+    def get_session(self, start: int, end: int) -> "DatedChatHistory":
+        # The messages are already validated, so they are shared with the
+        # session, instead of being copied and validated again.
+        return DatedChatHistory.model_construct(
+            chat_messages=list(self.chat_messages[start:end])
+        )
 
-        return clusters
+    def cluster_by_session(self) -> list["DatedChatHistory"]:
+        """
+        Cluster chat messages by session, where a new session starts with a
+        system prompt message.
+        """
+        return [
+            self.get_session(start, end) for start, end in self.get_session_ranges()
+        ]
 
     def to_undated_chat_history(self) -> ChatHistory:
         # Convert DatedChatMessages to ChatMessages
@@ -1,21 +1,34 @@
 from datetime import timedelta
 
 from microchain import Function
-from prediction_market_agent_tooling.tools.utils import utcnow
+from prediction_market_agent_tooling.tools.utils import check_not_none, utcnow
 
 from prediction_market_agent.agents.microchain_agent.memory import DatedChatMessage
 from prediction_market_agent.agents.utils import memories_to_learnings
 from prediction_market_agent.db.long_term_memory_table_handler import (
     LongTermMemoryTableHandler,
 )
+from prediction_market_agent.db.memory_summary_table_handler import (
+    MemorySummaryTableHandler,
+)
+from prediction_market_agent.db.models import MemorySummaryModel
 
 
 class RememberPastActions(Function):
+    # The rolling summary is started over once it covers more than this.
+    max_summary_span = timedelta(days=2)
+
     def __init__(
-        self, long_term_memory: LongTermMemoryTableHandler, model: str
+        self,
+        long_term_memory: LongTermMemoryTableHandler,
+        model: str,
+        memory_summary: MemorySummaryTableHandler | None = None,
     ) -> None:
         self.long_term_memory = long_term_memory
         self.model = model
+        self.memory_summary = memory_summary or MemorySummaryTableHandler(
+            task_description=long_term_memory.task_description
+        )
         super().__init__()
 
     @property
@@ -34,11 +47,82 @@ class RememberPastActions(Function):
         return []
 
     def __call__(self) -> str:
-        # Get the last day's of the agent's memory. Add a +1hour buffer to
-        # make sure a cronjob-scheduled agent that calls this in the middle of
-        # its run doesn't miss anything from the previous day.
-        memories = self.long_term_memory.search(from_=utcnow() - timedelta(hours=25))
-        simple_memories = [
-            DatedChatMessage.from_long_term_memory(ltm) for ltm in memories
-        ]
-        return memories_to_learnings(memories=simple_memories, model=self.model)
+        now = utcnow()
+        previous_summary = self.memory_summary.get_latest_summary()
+        if (
+            previous_summary is not None
+            and previous_summary.covered_from < now - self.max_summary_span
+        ):
+            previous_summary = None
+
+        if previous_summary is None:
+            # Get the last day's of the agent's memory. Add a +1hour buffer to
+            # make sure a cronjob-scheduled agent that calls this in the middle of
+            # its run doesn't miss anything from the previous day.
+            covered_from = now - timedelta(hours=25)
+            memories = self.long_term_memory.search(from_=covered_from)
+        else:
+            # Only the memories added since the last summary need to be summarized.
+            covered_from = previous_summary.covered_from
+            memories = self.long_term_memory.search(
+                after_id=previous_summary.last_memory_id
+            )
+
+        if not memories and previous_summary is not None:
+            return previous_summary.summary
+
+        memories = sorted(memories, key=lambda m: (m.datetime_, m.id or 0))
+        learnings = memories_to_learnings(
+            memories=[DatedChatMessage.from_long_term_memory(m) for m in memories],
+            model=self.model,
+            previous_learnings=previous_summary.summary if previous_summary else None,
+        )
+        if memories:
+            self.memory_summary.save_summary(
+                MemorySummaryModel(
+                    task_description=self.long_term_memory.task_description,
+                    summary=learnings,
+                    covered_from=covered_from,
+                    last_memory_id=check_not_none(memories[-1].id),
+                    last_memory_datetime=memories[-1].datetime_,
+                    datetime_=now,
+                )
+            )
+        return learnings
+
+
+class RememberPastActionsAbout(Function):
+    is_read_only = True
+
+    # How many of the most relevant memories are summarized.
+    n_memories = 30
+
+    def __init__(
+        self, long_term_memory: LongTermMemoryTableHandler, model: str
+    ) -> None:
+        self.long_term_memory = long_term_memory
+        self.model = model
+        super().__init__()
+
+    @property
+    def description(self) -> str:
+        return (
+            "Use this function to fetch information about the actions you "
+            "executed over the past week, that are related to the given topic, "
+            "for example a market's question."
+        )
+
+    @property
+    def example_args(self) -> list[str]:
+        return ["Will GNO be above $300 by the end of the month?"]
+
+    def __call__(self, topic: str) -> str:
+        memories = self.long_term_memory.search_relevant(
+            query=topic, k=self.n_memories, from_=utcnow() - timedelta(days=7)
+        )
+        # Summarize the memories in their chronological order.
+        memories = sorted(memories, key=lambda m: (m.datetime_, m.id or 0))
+        return memories_to_learnings(
+            memories=[DatedChatMessage.from_long_term_memory(m) for m in memories],
+            model=self.model,
+        )
@@ -1,4 +1,7 @@
+import typing as t
+from collections import defaultdict
 from enum import Enum
+from functools import cache
 
 from eth_typing import ChecksumAddress
 from microchain import (
@@ -28,6 +31,12 @@ from prediction_market_agent.agents.microchain_agent.call_api import API_FUNCTIO
 from prediction_market_agent.agents.microchain_agent.code_functions import (
     CODE_FUNCTIONS,
 )
+from prediction_market_agent.agents.microchain_agent.history_compaction import (
+    HFTokenizerCounter,
+    HistoryCompactor,
+    Messages,
+    TiktokenCounter,
+)
 from prediction_market_agent.agents.microchain_agent.jobs_functions import JOB_FUNCTIONS
 from prediction_market_agent.agents.microchain_agent.learning_functions import (
     LEARNING_FUNCTIONS,
@@ -37,15 +46,23 @@ from prediction_market_agent.agents.microchain_agent.market_functions import (
 )
 from prediction_market_agent.agents.microchain_agent.memory_functions import (
     RememberPastActions,
+    RememberPastActionsAbout,
 )
 from prediction_market_agent.agents.microchain_agent.omen_functions import (
     OMEN_FUNCTIONS,
 )
 from prediction_market_agent.agents.microchain_agent.prompts import (
+    NON_UPDATABLE_DIVIDOR,
     FunctionsConfig,
     build_full_unformatted_system_prompt,
     extract_updatable_system_prompt,
 )
+from prediction_market_agent.agents.microchain_agent.tool_selection import (
+    FunctionSelector,
+    ListOtherFunctions,
+    SelectiveHelpEngine,
+    build_engine,
+)
 from prediction_market_agent.db.long_term_memory_table_handler import (
     LongTermMemoryTableHandler,
 )
@@ -74,17 +91,38 @@ def replicate_model_to_tokenizer(model: SupportedModel) -> str:
         raise ValueError(f"Unsupported model: {model}")
 
 
+def build_token_counter(model: SupportedModel) -> t.Callable[[Messages], int]:
+    if model.is_openai:
+        return TiktokenCounter(model=model.value)
+    elif model.is_replicate:
+        return HFTokenizerCounter(
+            pretrained_model_name_or_path=replicate_model_to_tokenizer(model)
+        )
+    else:
+        raise ValueError(f"Unsupported model: {model}")
+
+
+@cache
+def get_classes_from_smart_contract(
+    contract_address: ChecksumAddress, contract_name: str
+) -> defaultdict[AbiItemStateMutabilityEnum | None, list[type[Function]]]:
+    """
+    Generated classes are kept for the process' lifetime, so agents built
+    repeatedly with the same contract don't generate them again.
+    """
+    return ContractClassConverter(
+        contract_address=contract_address, contract_name=contract_name
+    ).create_classes_from_smart_contract()
+
+
 def build_functions_from_smart_contract(
     keys: APIKeys, contract_address: ChecksumAddress, contract_name: str
 ) -> list[Function]:
     functions = []
 
-    contract_class_converter = ContractClassConverter(
+    function_types_to_classes = get_classes_from_smart_contract(
         contract_address=contract_address, contract_name=contract_name
     )
-    function_types_to_classes = (
-        contract_class_converter.create_classes_from_smart_contract()
-    )
 
     view_classes = function_types_to_classes[AbiItemStateMutabilityEnum.VIEW]
     functions.extend([clz() for clz in view_classes])
@@ -138,25 +176,32 @@ def build_agent_functions(
         functions.append(
             RememberPastActions(long_term_memory=long_term_memory, model=model)
         )
+        if long_term_memory.embeddings is not None:
+            functions.append(
+                RememberPastActionsAbout(long_term_memory=long_term_memory, model=model)
+            )
+
+    if isinstance(agent.engine, SelectiveHelpEngine):
+        functions.append(ListOtherFunctions())
 
     return functions
 
 
-def build_agent(
-    keys: APIKeys,
-    market_type: MarketType,
+def get_function_selection_query(unformatted_system_prompt: str) -> str:
+    """
+    The functions are selected by the agent's instructions, i.e. the
+    updatable part of the system prompt.
+    """
+    return unformatted_system_prompt.split(NON_UPDATABLE_DIVIDOR)[0]
+
+
+def build_generator(
     model: SupportedModel,
-    unformatted_system_prompt: str,
-    functions_config: FunctionsConfig,
+    keys: APIKeys,
     enable_langfuse: bool,
     api_base: str = "https://api.openai.com/v1",
-    long_term_memory: LongTermMemoryTableHandler | None = None,
-    allow_stop: bool = True,
-    bootstrap: str | None = None,
-    raise_on_error: bool = True,
-) -> Agent:
-    engine = Engine()
-    generator = (
+) -> OpenAIChatGenerator | ReplicateLlama31ChatGenerator:
+    return (
         OpenAIChatGenerator(
             model=model.value,
             api_key=keys.openai_api_key.get_secret_value(),
@@ -179,6 +224,46 @@ def build_agent(
         )
     )
 
+
+def build_agent(
+    keys: APIKeys,
+    market_type: MarketType,
+    model: SupportedModel,
+    unformatted_system_prompt: str,
+    functions_config: FunctionsConfig,
+    enable_langfuse: bool,
+    api_base: str = "https://api.openai.com/v1",
+    long_term_memory: LongTermMemoryTableHandler | None = None,
+    allow_stop: bool = True,
+    bootstrap: str | None = None,
+    raise_on_error: bool = True,
+    max_history_tokens: int | None = None,
+    history_summarization_model: SupportedModel | None = None,
+    allow_parallel_read_only_calls: bool = False,
+    function_selector: FunctionSelector | None = None,
+) -> Agent:
+    """
+    If `max_history_tokens` is given, the history sent to the model is
+    compacted into a rolling summary and a window of recent messages, to keep
+    each iteration's prompt within that many tokens. The summary is written by
+    `history_summarization_model`, by default the agent's own model.
+
+    If `allow_parallel_read_only_calls` is set, the agent can call several
+    read-only functions in one message, and they are executed concurrently.
+
+    If `function_selector` is given, only the functions relevant to the
+    system prompt are described in it, and the agent can list the rest.
+    """
+    engine = build_engine(
+        allow_parallel_read_only_calls=allow_parallel_read_only_calls,
+        function_selector=function_selector,
+    )
+    if isinstance(engine, SelectiveHelpEngine):
+        engine.help_query = get_function_selection_query(unformatted_system_prompt)
+    generator = build_generator(
+        model=model, keys=keys, enable_langfuse=enable_langfuse, api_base=api_base
+    )
+
     if raise_on_error:
         # Define a callback that raises an if an iteration of `agent.run` fails
         def step_end_callback(agent: Agent, step_output: StepOutput) -> None:
@@ -189,8 +274,29 @@ def build_agent(
     else:
         on_iteration_step = None
 
+    templates = (
+        [
+            HistoryCompactor(
+                count_tokens=build_token_counter(model),
+                max_tokens=max_history_tokens,
+                generator=(
+                    build_generator(
+                        model=history_summarization_model,
+                        keys=keys,
+                        enable_langfuse=enable_langfuse,
+                        api_base=api_base,
+                    )
+                    if history_summarization_model is not None
+                    else generator
+                ),
+            )
+        ]
+        if max_history_tokens is not None
+        else []
+    )
+
     agent = Agent(
-        llm=LLM(generator=generator),
+        llm=LLM(generator=generator, templates=templates),
         engine=engine,
         on_iteration_step=on_iteration_step,
         enable_langfuse=enable_langfuse,
@@ -229,25 +335,91 @@ def get_unformatted_system_prompt(
     return unformatted_prompt
 
 
-def save_agent_history(
-    long_term_memory: LongTermMemoryTableHandler,
-    agent: Agent,
-    initial_system_prompt: str,
-) -> None:
+class AgentHistorySaver:
     """
-    Save the agent's history to the long-term memory. But first, restore the
-    system prompt to its initial state. This is necessary because the some
-    functions may have changed the system prompt during the agent's run.
+    Callback for `agent.on_iteration_step`, that persists the agent's history
+    to the long-term memory as the session goes, instead of all at once at
+    its end. New messages are buffered and written every
+    `flush_every_n_steps` steps, and the rest with an explicit `flush`.
+
+    The system prompt is saved in its initial state, even if the agent has
+    modified it in the meantime.
     """
-    # Save off the most up-to-date, or 'head' system prompt
-    head_system_prompt = agent.history[0]
 
-    # Restore the system prompt to its initial state
-    agent.history[0] = dict(role="system", content=initial_system_prompt)
-    long_term_memory.save_history(agent.history)
+    def __init__(
+        self,
+        long_term_memory: LongTermMemoryTableHandler,
+        initial_system_prompt: str,
+        flush_every_n_steps: int = 5,
+        n_saved_messages: int = 0,
+    ) -> None:
+        self.long_term_memory = long_term_memory
+        self.initial_system_prompt = initial_system_prompt
+        self.flush_every_n_steps = flush_every_n_steps
+        # Number of messages from the agent's history that are already
+        # persisted or buffered, e.g. when resuming a persisted session.
+        self.n_collected_messages = n_saved_messages
+        self.n_buffered_steps = 0
+        self.buffer: Messages = []
 
-    # Restore the head system prompt
-    agent.history[0] = head_system_prompt
+    @property
+    def n_saved_messages(self) -> int:
+        return self.n_collected_messages - len(self.buffer)
+
+    def register(self, agent: Agent) -> None:
+        """
+        Chain this saver before the agent's current `on_iteration_step` callback,
+        so the completed steps are saved even if that callback raises.
+        """
+        previous_callback = agent.on_iteration_step
+
+        def on_iteration_step(agent: Agent, step_output: StepOutput) -> None:
+            self(agent, step_output)
+            if previous_callback is not None:
+                previous_callback(agent, step_output)
+
+        agent.on_iteration_step = on_iteration_step
+
+    def __call__(self, agent: Agent, step_output: StepOutput) -> None:
+        self.collect(agent)
+        if not step_output.abort:
+            # The agent appends the step to its history only after this callback.
+            self.buffer.append(dict(role="assistant", content=step_output.reply))
+            self.buffer.append(dict(role="user", content=step_output.output))
+            self.n_collected_messages += 2
+            self.n_buffered_steps += 1
+
+        if self.n_buffered_steps >= self.flush_every_n_steps:
+            self.flush(agent)
+
+    def collect(self, agent: Agent) -> None:
+        """
+        Buffer messages in the agent's history that weren't collected yet, e.g.
+        the initial prompts, or messages appended outside of `agent.run`.
+        """
+        for i in range(self.n_collected_messages, len(agent.history)):
+            message = agent.history[i]
+            if i == 0 and message["role"] == "system":
+                message = dict(role="system", content=self.initial_system_prompt)
+            self.buffer.append(message)
+        self.n_collected_messages = max(self.n_collected_messages, len(agent.history))
+
+    def flush(self, agent: Agent) -> None:
+        self.collect(agent)
+        if self.buffer:
+            self.long_term_memory.save_history(self.buffer)
+        self.buffer = []
+        self.n_buffered_steps = 0
+
+
+def get_user_prompt_index(agent: Agent) -> int | None:
+    """
+    Index of the user prompt (e.g. the goal) in the agent's history, where
+    microchain puts it, right after the system prompt.
+    """
+    if agent.prompt is None:
+        return None
+    return 1 if agent.system_prompt else 0
 
 
 def get_editable_prompt_from_agent(agent: Agent) -> str:
@@ -0,0 +1,108 @@
+import ast
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+from microchain import Engine, FunctionResult
+
+
+def is_read_only(function: t.Any) -> bool:
+    return bool(getattr(function, "is_read_only", False))
+
+
+class ParallelReadOnlyEngine(Engine):
+    """
+    Microchain's engine allows exactly one function call per message. This
+    engine also accepts a list of calls, e.g. `[GetBalance(), GetMarkets()]`,
+    if all of them are read-only functions. The calls are executed
+    concurrently and their results returned together, saving the agent
+    iterations spent only on gathering information.
+
+    Functions that change any state are still executed one per message.
+    """
+
+    def __init__(self, max_workers: int = 8) -> None:
+        # Microchain's engine has a mutable default argument for the state,
+        # so pass a fresh one explicitly.
+        super().__init__(state={})
+        self.max_workers = max_workers
+
+    def execute(self, command: str) -> tuple[FunctionResult, str]:
+        calls = self.parse_batch(command)
+        if calls is None:
+            return super().execute(command)
+
+        if not calls:
+            return (
+                FunctionResult.ERROR,
+                f"Error: the list in command {command} is empty. Please try again.",
+            )
+
+        for call in calls:
+            if not isinstance(call, ast.Call) or not isinstance(call.func, ast.Name):
+                return (
+                    FunctionResult.ERROR,
+                    f"Error: every item of the list in command {command} must be a function call. Please try again.",
+                )
+            function = self.functions.get(call.func.id)
+            if function is None:
+                return (
+                    FunctionResult.ERROR,
+                    f"Error: unknown function {call.func.id} in command {command}. Please try again.",
+                )
+            if not is_read_only(function):
+                return (
+                    FunctionResult.ERROR,
+                    f"Error: {call.func.id} can not be called in a list, because it isn't read-only. Call it on its own. Please try again.",
+                )
+
+        single_commands = [ast.unparse(call) for call in calls]
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(single_commands))
+        ) as executor:
+            results = list(executor.map(super().execute, single_commands))
+
+        # Individual failures are reported in the output, so the successful
+        # results aren't lost by retrying the whole list.
+        output = "\n".join(
+            f"{single_command} -> {single_output}"
+            for single_command, (_, single_output) in zip(single_commands, results)
+        )
+        return FunctionResult.SUCCESS, output
+
+    @staticmethod
+    def parse_batch(command: str) -> list[ast.expr] | None:
+        """
+        Returns the calls of a list command, or None if the command isn't a
+        list (single calls are handled by microchain's engine).
+        """
+        stripped = command.strip()
+        if not stripped.startswith(("[", "(")):
+            return None
+        # Microchain cuts the reply after the last ')', so the closing bracket
+        # of the list is usually missing.
+        if stripped.startswith("[") and not stripped.endswith("]"):
+            stripped += "]"
+        try:
+            tree = ast.parse(stripped)
+        except SyntaxError:
+            return None
+        if (
+            len(tree.body) != 1
+            or not isinstance(tree.body[0], ast.Expr)
+            or not isinstance(tree.body[0].value, (ast.List, ast.Tuple))
+        ):
+            return None
+        return list(tree.body[0].value.elts)
+
+    @property
+    def help(self) -> str:
+        functions_help = super().help
+        read_only = [name for name, f in self.functions.items() if is_read_only(f)]
+        if not read_only:
+            return functions_help
+        return (
+            f"{functions_help}\n\n"
+            "The following functions only read information, so you can call several of them at once, "
+            f"by writing a list of calls on a single line, e.g. `[{read_only[0]}(...), {read_only[-1]}(...)]`: "
+            f"{', '.join(read_only)}. All the other functions must be called on their own."
+        )
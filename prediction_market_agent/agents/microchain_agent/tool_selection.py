@@ -0,0 +1,168 @@
+import typing as t
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from microchain import Engine, Function
+
+from prediction_market_agent.agents.microchain_agent.parallel_engine import (
+    ParallelReadOnlyEngine,
+)
+from prediction_market_agent.utils import get_most_similar_indices
+
+# Functions the agent needs in every session, regardless of its goal.
+DEFAULT_ALWAYS_INCLUDED_FUNCTIONS = ("Reasoning", "Stop", "ListOtherFunctions")
+
+
+class FunctionSelector:
+    """
+    Picks the `k` functions most relevant to a query (e.g. the agent's
+    instructions or goal), by the similarity of the query and the functions'
+    descriptions. The descriptions are embedded once and kept in a local index.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        k: int,
+        always_included: t.Sequence[str] = DEFAULT_ALWAYS_INCLUDED_FUNCTIONS,
+    ) -> None:
+        self.embeddings = embeddings
+        self.k = k
+        self.always_included = always_included
+        # Embedded help of the functions, by their name.
+        self._index: dict[str, tuple[str, np.ndarray]] = {}
+        self._query_index: dict[str, np.ndarray] = {}
+
+    def select(self, functions: t.Mapping[str, Function], query: str) -> list[str]:
+        """
+        Returns the names of the selected functions, in the order of their
+        registration.
+        """
+        always_included = [name for name in functions if name in self.always_included]
+        candidates = [name for name in functions if name not in self.always_included]
+        if len(candidates) <= self.k:
+            return list(functions)
+
+        most_similar = get_most_similar_indices(
+            self._get_embeddings(functions, candidates),
+            self._get_query_embedding(query),
+            k=self.k,
+        )
+        selected = set(always_included) | {candidates[i] for i in most_similar}
+        return [name for name in functions if name in selected]
+
+    def _get_query_embedding(self, query: str) -> np.ndarray:
+        if query not in self._query_index:
+            self._query_index[query] = np.array(self.embeddings.embed_query(query))
+        return self._query_index[query]
+
+    def _get_embeddings(
+        self, functions: t.Mapping[str, Function], names: list[str]
+    ) -> list[np.ndarray]:
+        # Re-embed if a function's help changed, e.g. re-registered under the same name.
+        if missing := [
+            name
+            for name in names
+            if name not in self._index or self._index[name][0] != functions[name].help
+        ]:
+            vectors = self.embeddings.embed_documents(
+                [functions[name].help for name in missing]
+            )
+            for name, vector in zip(missing, vectors):
+                self._index[name] = (functions[name].help, np.array(vector))
+        return [self._index[name][1] for name in names]
+
+
+class SelectiveHelpEngine(Engine):
+    """
+    Engine whose `help`, formatted into the system prompt, describes only the
+    functions relevant to `help_query`, instead of all registered functions.
+    All the functions can still be called, and the agent can list the rest
+    with `ListOtherFunctions`.
+    """
+
+    def __init__(
+        self, function_selector: FunctionSelector, state: dict[str, t.Any] | None = None
+    ) -> None:
+        super().__init__(state={} if state is None else state)
+        self.function_selector = function_selector
+        self.help_query = ""
+        self.functions_in_help: list[str] | None = None
+        # The selection is made once for each query and the registered functions.
+        self._selected_for: tuple[str, tuple[str, ...]] | None = None
+
+    @property
+    def help(self) -> str:
+        self.help_called = True
+        selected_for = (self.help_query, tuple(self.functions))
+        if self.functions_in_help is None or self._selected_for != selected_for:
+            self.functions_in_help = self.function_selector.select(
+                self.functions, self.help_query
+            )
+            self._selected_for = selected_for
+        functions_help = "\n".join(
+            self.functions[name].help for name in self.functions_in_help
+        )
+        if len(self.functions_in_help) == len(self.functions):
+            return functions_help
+        return (
+            f"{functions_help}\n"
+            f"There are {len(self.functions) - len(self.functions_in_help)} more functions available, "
+            "call ListOtherFunctions() to see them."
+        )
+
+    def get_functions_not_in_help(self) -> list[Function]:
+        if self.functions_in_help is None:
+            # Help wasn't built yet, so nothing has been shown.
+            return list(self.functions.values())
+        return [
+            function
+            for name, function in self.functions.items()
+            if name not in self.functions_in_help
+        ]
+
+
+class ParallelReadOnlySelectiveHelpEngine(ParallelReadOnlyEngine, SelectiveHelpEngine):
+    """
+    Both of the above: the help describes only the relevant functions, and
+    read-only functions can be called concurrently.
+    """
+
+    def __init__(
+        self, function_selector: FunctionSelector, max_workers: int = 8
+    ) -> None:
+        SelectiveHelpEngine.__init__(self, function_selector=function_selector)
+        self.max_workers = max_workers
+
+
+class ListOtherFunctions(Function):
+    is_read_only = True
+
+    @property
+    def description(self) -> str:
+        return "Use this function to list the functions you can use, that aren't described in your system prompt"
+
+    @property
+    def example_args(self) -> list[str]:
+        return []
+
+    def __call__(self) -> str:
+        if not isinstance(self.engine, SelectiveHelpEngine):
+            raise ValueError("ListOtherFunctions requires the SelectiveHelpEngine.")
+        functions = self.engine.get_functions_not_in_help()
+        if not functions:
+            return "All the functions are already described in your system prompt."
+        return "\n".join(f.help for f in functions)
+
+
+def build_engine(
+    allow_parallel_read_only_calls: bool,
+    function_selector: FunctionSelector | None,
+) -> Engine:
+    if function_selector is not None:
+        return (
+            ParallelReadOnlySelectiveHelpEngine(function_selector=function_selector)
+            if allow_parallel_read_only_calls
+            else SelectiveHelpEngine(function_selector=function_selector)
+        )
+    return ParallelReadOnlyEngine() if allow_parallel_read_only_calls else Engine()
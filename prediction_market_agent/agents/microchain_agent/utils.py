@@ -1,7 +1,11 @@
+import re
 import typing as t
+from collections import Counter
 
 import pandas as pd
 from microchain import Agent
+from prediction_market_agent_tooling.gtypes import Wei
+from prediction_market_agent_tooling.loggers import logger
 from prediction_market_agent_tooling.markets.agent_market import (
     AgentMarket,
     FilterBy,
@@ -16,12 +20,25 @@ from prediction_market_agent_tooling.markets.omen.data_models import (
 from prediction_market_agent_tooling.markets.omen.data_models import (
     get_boolean_outcome as get_omen_boolean_outcome,
 )
-from prediction_market_agent_tooling.tools.balances import get_balances
+from prediction_market_agent_tooling.markets.omen.omen import OmenAgentMarket
+from prediction_market_agent_tooling.markets.omen.omen_contracts import (
+    OmenFixedProductMarketMakerContract,
+)
+from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
+    OmenSubgraphHandler,
+)
+from prediction_market_agent_tooling.tools.utils import DatetimeUTC
+from prediction_market_agent_tooling.tools.web3_utils import wei_to_xdai
 from pydantic import BaseModel
+from web3.logs import DISCARD
 
 from prediction_market_agent.agents.microchain_agent.memory import ChatHistory
+from prediction_market_agent.tools.multicall import MulticallBatch, get_balances
 from prediction_market_agent.utils import APIKeys
 
+# Name of the function called in a message, e.g. `GetMarkets` in `GetMarkets()`.
+FUNCTION_CALL_NAME_REGEX = re.compile(r"([A-Za-z_][A-Za-z0-9_]*)\(")
+
 
 class MicroMarket(BaseModel):
     question: str
@@ -38,6 +55,21 @@ class MicroMarket(BaseModel):
         return f"'{self.question}', id: {self.id}"
 
 
+class MarketProbability(BaseModel):
+    id: str
+    p_yes: float
+    # In the market's currency, e.g. xDai for Omen, if known.
+    liquidity: float | None
+    close_time: DatetimeUTC | None
+
+    TABLE_HEADER: t.ClassVar[str] = "id | p_yes | liquidity | close_time"
+
+    def __str__(self) -> str:
+        liquidity = f"{self.liquidity:.2f}" if self.liquidity is not None else "-"
+        close_time = self.close_time.isoformat() if self.close_time else "-"
+        return f"{self.id} | {self.p_yes:.4f} | {liquidity} | {close_time}"
+
+
 def get_binary_markets(market_type: MarketType) -> list[AgentMarket]:
     # Get the 15 markets that are closing soonest
     cls = market_type.market_class
@@ -53,6 +85,54 @@ def get_binary_markets(market_type: MarketType) -> list[AgentMarket]:
     return list(markets)
 
 
+def get_market_probabilities(
+    market_type: MarketType, market_ids: list[str]
+) -> list[MarketProbability]:
+    """
+    Get the current probabilities of the given markets. For Omen, all markets
+    are fetched with a single subgraph query.
+    """
+    if market_type == MarketType.OMEN:
+        omen_markets = OmenSubgraphHandler().get_omen_binary_markets(
+            limit=None,
+            id_in=market_ids,
+            # Don't filter out any markets the agent explicitly asked for.
+            collateral_token_address_in=None,
+        )
+        # The liquidity is the market maker's pool shares' supply, as in
+        # `OmenAgentMarket.get_liquidity_in_xdai`, read in a single request.
+        with MulticallBatch() as batch:
+            liquidities = [
+                batch.call(
+                    OmenFixedProductMarketMakerContract(
+                        address=m.market_maker_contract_address_checksummed
+                    ),
+                    "totalSupply",
+                )
+                for m in omen_markets
+            ]
+        return [
+            MarketProbability(
+                id=m.id,
+                p_yes=m.current_p_yes,
+                liquidity=float(wei_to_xdai(Wei(liquidity.result()))),
+                close_time=m.close_time,
+            )
+            for m, liquidity in zip(omen_markets, liquidities)
+        ]
+    else:
+        markets = [market_type.market_class.get_binary_market(id=i) for i in market_ids]
+        return [
+            MarketProbability(
+                id=m.id,
+                p_yes=m.current_p_yes,
+                liquidity=None,
+                close_time=m.close_time,
+            )
+            for m in markets
+        ]
+
+
 def get_balance(api_keys: APIKeys, market_type: MarketType) -> BetAmount:
     currency = market_type.market_class.currency
     if market_type == MarketType.OMEN:
@@ -98,6 +178,55 @@ def get_no_outcome(market_type: MarketType) -> str:
         raise ValueError(f"Market type '{market_type}' not supported")
 
 
+def is_trade_receipt_supported(market_type: MarketType) -> bool:
+    """
+    Whether the number of traded outcome tokens can be read from the trade
+    transaction's receipt, instead of polling the token balance.
+    """
+    return market_type == MarketType.OMEN
+
+
+def get_traded_token_amount_from_tx(
+    market: AgentMarket, tx_hash: str, outcome: str, is_buy: bool
+) -> float | None:
+    """
+    Get the number of outcome tokens bought (or sold) in the trade with the
+    given transaction hash, from the `FPMMBuy` (or `FPMMSell`) event emitted
+    by the market's contract.
+
+    The trade is already done at this point, so instead of raising, returns
+    None if the amount can't be read from the receipt.
+    """
+    if not isinstance(market, OmenAgentMarket):
+        raise ValueError(f"Market type '{type(market)}' not supported")
+
+    try:
+        contract = market.get_contract()
+        receipt = contract.get_web3().eth.get_transaction_receipt(tx_hash)
+        events = contract.get_web3_contract().events
+        event = events.FPMMBuy() if is_buy else events.FPMMSell()
+        outcome_index = market.get_outcome_index(outcome)
+        for log in event.process_receipt(receipt, errors=DISCARD):
+            # Logs from other contracts with the same event signature (e.g. in a
+            # batched Safe transaction) are ignored.
+            if log["address"] != contract.address:
+                continue
+            if log["args"]["outcomeIndex"] != outcome_index:
+                continue
+            token_amount = (
+                log["args"]["outcomeTokensBought"]
+                if is_buy
+                else log["args"]["outcomeTokensSold"]
+            )
+            return float(wei_to_xdai(token_amount))
+    except Exception as e:
+        logger.warning(f"Reading the trade event from tx {tx_hash} failed: {e}")
+        return None
+
+    logger.warning(f"No trade event for market {market.id} found in tx {tx_hash}.")
+    return None
+
+
 def get_example_market_id(market_type: MarketType) -> str:
     if market_type == MarketType.OMEN:
         return "0x0020d13c89140b47e10db54cbd53852b90bc1391"
@@ -128,15 +257,38 @@ def get_function_useage_from_history(
     Returns a DataFrame, indexed by the function names, with a column for the
     usage count.
     """
-    function_names = [function for function in agent.engine.functions]
-    function_useage = {function: 0 for function in function_names}
-    for message in chat_history.chat_messages:
-        for function in function_names:
-            if message.content.startswith(f"{function}("):
-                function_useage[function] += 1
-                break
+    return get_function_useage_from_histories(
+        chat_histories={"Usage Count": chat_history}, agent=agent
+    )
+
+
+def get_function_useage_from_histories(
+    chat_histories: t.Mapping[str, ChatHistory], agent: Agent
+) -> pd.DataFrame:
+    """
+    Get the number of times each function is used in each of the chat
+    histories (e.g. the sessions), in a single pass over their messages.
+
+    Returns a DataFrame, indexed by the function names, with a column of usage
+    counts for each of the chat histories' keys.
+    """
+    function_names = list(agent.engine.functions)
+    registered = set(function_names)
+    counts: dict[str, Counter[str]] = {}
+    for key, chat_history in chat_histories.items():
+        counts[key] = Counter(
+            name
+            for message in chat_history.chat_messages
+            if (match := FUNCTION_CALL_NAME_REGEX.match(message.content))
+            and (name := match.group(1)) in registered
+        )
 
     return pd.DataFrame(
-        data={"Usage Count": list(function_useage.values())},
+        data={
+            key: [counter[name] for name in function_names]
+            for key, counter in counts.items()
+        },
         index=function_names,
+        columns=list(chat_histories),
+        dtype=int,
     )
@@ -28,6 +28,7 @@ from prediction_market_agent.agents.ofvchallenger_agent.ofv_resolver import (
 )
 from prediction_market_agent.agents.replicate_to_omen_agent.omen_resolve_replicated import (
     claim_all_bonds_on_reality,
+    get_responses_by_question_id,
 )
 from prediction_market_agent.utils import APIKeys
 
@@ -87,8 +88,15 @@ class OFVChallengerAgent(DeployableAgent):
         )
         logger.info(f"Found {len(markets_open_for_answers)} markets to challenge.")
 
+        responses_by_question_id = get_responses_by_question_id(
+            [market.question.id for market in markets_open_for_answers]
+        )
         for market in markets_open_for_answers:
-            self.challenge_market(market, api_keys)
+            self.challenge_market(
+                market,
+                api_keys,
+                existing_responses=responses_by_question_id[market.question.id],
+            )
 
         # Compute accuracy on Reality and report as error if it goes down too much.
         last_week_accuracy = reality_accuracy(
@@ -104,13 +112,15 @@ class OFVChallengerAgent(DeployableAgent):
         market: OmenMarket,
         api_keys: APIKeys,
         web3: Web3 | None = None,
+        existing_responses: list[RealityResponse] | None = None,
     ) -> Challenge:
         logger.info(f"Challenging market {market.url=}")
         langfuse_context.update_current_observation(metadata={"url": market.url})
 
-        existing_responses = OmenSubgraphHandler().get_responses(
-            limit=None, question_id=market.question.id
-        )
+        if existing_responses is None:
+            existing_responses = OmenSubgraphHandler().get_responses(
+                limit=None, question_id=market.question.id
+            )
         logger.info(
             f"{market.url=}'s responses and bonds: {[(r.answer, r.bond_xdai) for r in existing_responses]}"
         )
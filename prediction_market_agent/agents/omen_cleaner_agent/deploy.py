@@ -15,7 +15,6 @@ from prediction_market_agent_tooling.markets.omen.omen import (
     omen_remove_fund_market_tx,
     redeem_from_all_user_positions,
 )
-from prediction_market_agent_tooling.markets.omen.omen_resolving import resolve_markets
 from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
     OmenSubgraphHandler,
 )
@@ -26,6 +25,9 @@ from prediction_market_agent_tooling.tools.web3_utils import xdai_to_wei
 from prediction_market_agent.agents.replicate_to_omen_agent.image_gen import (
     generate_and_set_image_for_market,
 )
+from prediction_market_agent.agents.replicate_to_omen_agent.omen_resolve_replicated import (
+    resolve_markets_pipelined,
+)
 from prediction_market_agent.utils import APIKeys
 
 CLEANER_TAG = "cleaner"
@@ -67,7 +69,7 @@ class OmenCleanerAgent(DeployableAgent):
         logger.info(
             f"Found {len(finalized_unresolved_markets)} finalized unresolved markets."
         )
-        return resolve_markets(api_keys, finalized_unresolved_markets)
+        return resolve_markets_pipelined(api_keys, finalized_unresolved_markets)
 
     @observe()
     def generate_missing_images(
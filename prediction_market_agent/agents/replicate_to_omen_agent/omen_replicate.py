@@ -9,7 +9,11 @@ from prediction_market_agent_tooling.gtypes import (
     xDai,
 )
 from prediction_market_agent_tooling.loggers import logger
-from prediction_market_agent_tooling.markets.agent_market import FilterBy, SortBy
+from prediction_market_agent_tooling.markets.agent_market import (
+    AgentMarket,
+    FilterBy,
+    SortBy,
+)
 from prediction_market_agent_tooling.markets.categorize import infer_category
 from prediction_market_agent_tooling.markets.markets import (
     MarketType,
@@ -29,23 +33,38 @@ from prediction_market_agent_tooling.markets.omen.omen_contracts import sDaiCont
 from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
     OmenSubgraphHandler,
 )
+from prediction_market_agent_tooling.tools.caches.db_cache import db_cache
 from prediction_market_agent_tooling.tools.is_invalid import is_invalid
 from prediction_market_agent_tooling.tools.is_predictable import (
     is_predictable_binary,
     is_predictable_without_description,
 )
 from prediction_market_agent_tooling.tools.langfuse_ import observe
-from prediction_market_agent_tooling.tools.utils import DatetimeUTC, utcnow
+from prediction_market_agent_tooling.tools.parallelism import par_map
+from prediction_market_agent_tooling.tools.utils import (
+    DatetimeUTC,
+    check_not_none,
+    utcnow,
+)
+from pydantic import BaseModel
 
 from prediction_market_agent.agents.replicate_to_omen_agent.image_gen import (
     generate_and_set_image_for_market,
 )
+from prediction_market_agent.db.omen_market_snapshot_table_handler import (
+    OmenMarketSnapshotTableHandler,
+)
+from prediction_market_agent.tools.cached_subgraph_handler import (
+    CachedOmenSubgraphHandler,
+)
 from prediction_market_agent.utils import APIKeys
 
 # According to Omen's recommendation, closing time of the market should be at least 6 days after the outcome is known.
 # That is because at the closing time, the question will open on Realitio, and we don't want it to be resolved as unknown/invalid.
 # All replicated markets that close at N, needs to have closing time on Realition N + `EXTEND_CLOSING_TIME_DELTA`.
 EXTEND_CLOSING_TIME_DELTA = timedelta(days=6)
+# How many candidates are checked by the LLMs at once.
+GATING_MAX_WORKERS = 5
 
 
 @observe()
@@ -59,7 +78,10 @@ def omen_replicate_from_tx(
     auto_deposit: bool = False,
     test: bool = False,
 ) -> list[ChecksumAddress]:
-    existing_markets = OmenSubgraphHandler().get_omen_binary_markets(limit=None)
+    # Titles never change, so the snapshot doesn't need to refresh the markets.
+    market_snapshot = OmenMarketSnapshotTableHandler()
+    market_snapshot.sync(refresh=False)
+    existing_titles = market_snapshot.get_question_titles()
 
     markets = get_binary_markets(
         # Polymarket is slow to get, so take only 10 candidates for him.
@@ -71,7 +93,7 @@ def omen_replicate_from_tx(
             if market_type == MarketType.POLYMARKET
             else SortBy.CLOSING_SOONEST
         ),
-        excluded_questions=set(m.question_title for m in existing_markets),
+        excluded_questions=existing_titles,
     )
     markets_sorted = sorted(
         markets,
@@ -93,29 +115,21 @@ def omen_replicate_from_tx(
     # Get a set of possible categories from existing markets (but created by anyone, not just your agent)
     existing_categories = set(
         m.category
-        for m in OmenSubgraphHandler().get_omen_binary_markets_simple(
+        for m in CachedOmenSubgraphHandler().get_omen_binary_markets_simple(
             limit=1000,
             sort_by=SortBy.NEWEST,
             filter_by=FilterBy.NONE,
         )
     )
 
-    created_addresses: list[ChecksumAddress] = []
-
+    candidates: list[AgentMarket] = []
     for market in markets_to_replicate:
-        if len(created_addresses) > n_to_replicate:
-            logger.info(
-                f"Replicated {len(created_addresses)} from {market_type}, breaking."
-            )
-            break
-
         if market.close_time is None:
             logger.info(
                 f"Skipping `{market.question}` because it's missing the closing time."
             )
             continue
 
-        safe_closing_time = market.close_time + EXTEND_CLOSING_TIME_DELTA
         # If `close_time_after` isn't provided, force at least 48 hours of time where the resolution is unknown.
         soonest_allowed_resolution_known_time = (
             close_time_after
@@ -128,27 +142,93 @@ def omen_replicate_from_tx(
             )
             continue
 
-        # Do as the last steps, becuase it calls OpenAI (costly & slow).
-        if is_invalid(market.question):
-            logger.info(
-                f"Skipping `{market.question}` because it seems to be an invalid question."
-            )
-            continue
+        candidates.append(market)
 
-        if not is_predictable_binary(market.question):
-            logger.info(
-                f"Skipping `{market.question}` because it seems to not be predictable."
-            )
-            continue
+    created_addresses: list[ChecksumAddress] = []
 
-        if market.description and not is_predictable_without_description(
-            market.question, market.description
-        ):
-            logger.info(
-                f"Skipping `{market.question}` because it seems to not be predictable without the description `{market.description}`."
+    # Do the LLM checks as the last steps, because they are costly & slow.
+    # Candidates are checked concurrently, a chunk at a time, so that we don't check more than needed.
+    for chunk_start in range(0, len(candidates), GATING_MAX_WORKERS):
+        if len(created_addresses) >= n_to_replicate:
+            break
+        chunk = candidates[chunk_start : chunk_start + GATING_MAX_WORKERS]
+        verdicts = par_map(
+            items=chunk,
+            func=lambda market: get_replication_verdict(
+                market.question, market.description
+            ),
+            max_workers=GATING_MAX_WORKERS,
+        )
+        created_addresses.extend(
+            replicate_markets_with_verdicts(
+                api_keys=api_keys,
+                markets_with_verdicts=list(zip(chunk, verdicts)),
+                n_to_replicate=n_to_replicate - len(created_addresses),
+                existing_categories=existing_categories,
+                initial_funds=initial_funds,
+                auto_deposit=auto_deposit,
+                test=test,
             )
+        )
+
+    logger.info(f"Replicated {len(created_addresses)} from {market_type}.")
+    return created_addresses
+
+
+class ReplicationVerdict(BaseModel):
+    passed: bool
+    reason: str | None = None
+
+
+@db_cache
+def get_replication_verdict(
+    question: str, description: str | None
+) -> ReplicationVerdict:
+    """
+    LLM checks whether the question is fit to be replicated, stopping at the
+    first failed check. Cached by the question, so that rejected questions
+    aren't evaluated again on the later runs.
+    """
+    if is_invalid(question):
+        return ReplicationVerdict(
+            passed=False, reason="it seems to be an invalid question"
+        )
+
+    if not is_predictable_binary(question):
+        return ReplicationVerdict(passed=False, reason="it seems to not be predictable")
+
+    if description and not is_predictable_without_description(question, description):
+        return ReplicationVerdict(
+            passed=False,
+            reason=f"it seems to not be predictable without the description `{description}`",
+        )
+
+    return ReplicationVerdict(passed=True)
+
+
+def replicate_markets_with_verdicts(
+    api_keys: APIKeys,
+    markets_with_verdicts: list[tuple[AgentMarket, ReplicationVerdict]],
+    n_to_replicate: int,
+    existing_categories: set[str],
+    initial_funds: xDai,
+    auto_deposit: bool,
+    test: bool,
+) -> list[ChecksumAddress]:
+    created_addresses: list[ChecksumAddress] = []
+
+    for market, verdict in markets_with_verdicts:
+        if len(created_addresses) >= n_to_replicate:
+            break
+
+        if not verdict.passed:
+            logger.info(f"Skipping `{market.question}` because {verdict.reason}.")
             continue
 
+        # Checked already when collecting the candidates.
+        close_time = check_not_none(market.close_time)
+        safe_closing_time = close_time + EXTEND_CLOSING_TIME_DELTA
+
         category = infer_category(market.question, existing_categories)
         # Realitio will allow new categories or misformated categories, so double check that the LLM got it right.
         if category not in existing_categories:
@@ -1,3 +1,4 @@
+from collections import defaultdict
 from datetime import timedelta
 from functools import partial
 
@@ -6,6 +7,7 @@ from prediction_market_agent_tooling.gtypes import (
     ChecksumAddress,
     HexAddress,
     HexBytes,
+    HexStr,
     xDai,
     xdai_type,
 )
@@ -15,6 +17,9 @@ from prediction_market_agent_tooling.markets.omen.data_models import (
     RealityQuestion,
     RealityResponse,
 )
+from prediction_market_agent_tooling.markets.omen.omen_contracts import (
+    OmenOracleContract,
+)
 from prediction_market_agent_tooling.markets.omen.omen_resolving import (
     Resolution,
     claim_bonds_on_realitio_questions,
@@ -25,11 +30,19 @@ from prediction_market_agent_tooling.markets.omen.omen_resolving import (
 from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
     OmenSubgraphHandler,
 )
-from prediction_market_agent_tooling.tools.balances import get_balances
+from prediction_market_agent_tooling.tools.caches.db_cache import db_cache
 from prediction_market_agent_tooling.tools.is_invalid import is_invalid
 from prediction_market_agent_tooling.tools.langfuse_ import observe
+from prediction_market_agent_tooling.tools.parallelism import par_generator
 from prediction_market_agent_tooling.tools.utils import DatetimeUTC, utcnow
 from pydantic import BaseModel
+from web3 import Web3
+
+from prediction_market_agent.tools.multicall import get_balances
+from prediction_market_agent.tools.tx_pipeline import TransactionPipeline
+
+# Keeps the `question_id_in` filter, and so the subgraph query, of a reasonable size.
+RESPONSES_QUESTION_IDS_BATCH_SIZE = 500
 
 
 class ClaimResult(BaseModel):
@@ -73,17 +86,9 @@ def omen_finalize_and_resolve_and_claim_back_all_markets_based_on_others_tx(
     )
     logger.info(f"Found {len(created_opened_markets)} markets to answer.")
     # Finalize them (set answer on Realitio).
-    created_opened_markets_with_resolutions = [
-        (
-            m,
-            (
-                find_resolution_on_other_markets(m)
-                if not is_invalid(m.question_title)
-                else Resolution.CANCEL
-            ),
-        )
-        for m in created_opened_markets
-    ]
+    created_opened_markets_with_resolutions = find_resolutions_of_replicated_markets(
+        created_opened_markets
+    )
     created_opened_markets_with_resolutions_to_answer = (
         filter_replicated_markets_to_answer(
             created_opened_markets_with_resolutions,
@@ -110,7 +115,7 @@ def omen_finalize_and_resolve_and_claim_back_all_markets_based_on_others_tx(
         resolved=False,
     )
     # Resolve them (resolve them on Oracle).
-    resolved_markets = resolve_markets(
+    resolved_markets = resolve_markets_pipelined(
         api_keys,
         created_finalized_markets,
     )
@@ -126,6 +131,115 @@ def omen_finalize_and_resolve_and_claim_back_all_markets_based_on_others_tx(
     )
 
 
+@db_cache(cache_none=False, ignore_args=["market"])
+def _find_resolution_of_replicated_question(
+    question_id: str, market: OmenMarket
+) -> str | None:
+    """
+    Cached by the question, so that re-runs don't look again for the resolutions
+    already found. Missing resolutions aren't cached, as they can appear later.
+    """
+    resolution = (
+        Resolution.CANCEL
+        if is_invalid(market.question_title)
+        else find_resolution_on_other_markets(market)
+    )
+    return resolution.value if resolution is not None else None
+
+
+def find_resolution_of_replicated_market(
+    market: OmenMarket,
+) -> tuple[OmenMarket, Resolution | None] | None:
+    """
+    Returns None if the resolution couldn't be looked up, instead of raising,
+    so that the failure of one market doesn't stop the others.
+    """
+    try:
+        resolution = _find_resolution_of_replicated_question(
+            question_id=market.question.id.hex(), market=market
+        )
+    except Exception as e:
+        logger.exception(f"Failed to find resolution for {market.url=}: {e}")
+        return None
+    return market, (Resolution(resolution) if resolution is not None else None)
+
+
+def find_resolutions_of_replicated_markets(
+    markets: list[OmenMarket], max_workers: int = 5
+) -> list[tuple[OmenMarket, Resolution | None]]:
+    """
+    Markets for which the lookup failed are left out, because a missing
+    resolution would eventually get them answered as invalid.
+    """
+    markets_with_resolutions: list[tuple[OmenMarket, Resolution | None]] = []
+    for idx, market_with_resolution in enumerate(
+        par_generator(
+            markets, find_resolution_of_replicated_market, max_workers=max_workers
+        )
+    ):
+        logger.info(
+            f"[{idx + 1} / {len(markets)}] Looked up resolution for {markets[idx].url=}."
+        )
+        if market_with_resolution is not None:
+            markets_with_resolutions.append(market_with_resolution)
+    return markets_with_resolutions
+
+
+def resolve_markets_pipelined(
+    api_keys: APIKeys,
+    markets: list[OmenMarket],
+    web3: Web3 | None = None,
+    dry_run: bool = False,
+) -> list[HexAddress]:
+    """
+    Same as `resolve_markets`, but doesn't wait for each transaction to be
+    mined before sending the next one. Markets that failed to resolve are
+    logged and left out of the result, instead of stopping the others.
+    """
+    if api_keys.SAFE_ADDRESS:
+        return resolve_markets(api_keys, markets, web3=web3)
+
+    oracle_contract = OmenOracleContract()
+    pipeline = TransactionPipeline(
+        api_keys, web3=web3 or oracle_contract.get_web3(), dry_run=dry_run
+    )
+    for idx, market in enumerate(markets):
+        logger.info(
+            f"[{idx+1} / {len(markets)}] Resolving {market.url=} {market.question_title=}"
+        )
+        pipeline.submit(
+            oracle_contract,
+            "resolve",
+            label=market.id,
+            function_params=dict(
+                questionId=market.question.id,
+                templateId=market.question.templateId,
+                question=market.question.question_raw,
+                numOutcomes=market.question.n_outcomes,
+            ),
+        )
+    return [HexAddress(HexStr(r.label)) for r in pipeline.wait() if r.success]
+
+
+def get_responses_by_question_id(
+    question_ids: list[HexBytes],
+    batch_size: int = RESPONSES_QUESTION_IDS_BATCH_SIZE,
+) -> defaultdict[HexBytes, list[RealityResponse]]:
+    """
+    Responses to all the given questions, fetched in a subgraph query per
+    batch of questions, instead of a query per question.
+    """
+    responses_by_question_id: defaultdict[
+        HexBytes, list[RealityResponse]
+    ] = defaultdict(list)
+    for i in range(0, len(question_ids), batch_size):
+        for response in OmenSubgraphHandler().get_responses(
+            limit=None, question_id_in=question_ids[i : i + batch_size]
+        ):
+            responses_by_question_id[response.question.questionId].append(response)
+    return responses_by_question_id
+
+
 @observe()
 def filter_replicated_markets_to_answer(
     markets: list[tuple[OmenMarket, Resolution | None]],
@@ -133,11 +247,12 @@ def filter_replicated_markets_to_answer(
     realitio_bond: xDai,
 ) -> list[tuple[OmenMarket, Resolution | None]]:
     filtered: list[tuple[OmenMarket, Resolution | None]] = []
+    responses_by_question_id = get_responses_by_question_id(
+        [market.question.id for market, _ in markets]
+    )
 
     for market, possible_resolution in markets:
-        existing_responses = OmenSubgraphHandler().get_responses(
-            limit=None, question_id=market.question.id
-        )
+        existing_responses = responses_by_question_id[market.question.id]
         latest_response = (
             max(existing_responses, key=lambda r: r.timestamp)
             if existing_responses
@@ -23,6 +23,7 @@ from prediction_market_agent.agents.social_media_agent.social_media.twitter_hand
 from prediction_market_agent.agents.utils import AgentIdentifier
 from prediction_market_agent.db.long_term_memory_table_handler import (
     LongTermMemoryTableHandler,
+    build_memory_embeddings,
 )
 from prediction_market_agent.utils import APIKeys
 
@@ -50,7 +51,9 @@ class DeployableSocialMediaAgent(DeployableAgent):
             logger.info("No bets available from last day. No post will be created.")
             return
 
-        long_term_memory = LongTermMemoryTableHandler(AgentIdentifier.THINK_THOROUGHLY)
+        long_term_memory = LongTermMemoryTableHandler(
+            AgentIdentifier.THINK_THOROUGHLY, embeddings=build_memory_embeddings()
+        )
         tweet = build_social_media_text(self.model, bets)
         reasoning_reply_tweet = build_reply_tweet(
             model=self.model,
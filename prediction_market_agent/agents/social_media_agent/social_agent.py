@@ -25,6 +25,9 @@ from prediction_market_agent.db.long_term_memory_table_handler import (
 )
 from prediction_market_agent.utils import APIKeys
 
+# Number of the memories most relevant to the tweet, to extract the reasoning from.
+MAX_REASONING_MEMORIES = 50
+
 
 # Options from https://microsoft.github.io/autogen/docs/reference/agentchat/conversable_agent/#initiate_chat
 class SummaryMethod(str, Enum):
@@ -145,7 +148,9 @@ def extract_reasoning_behind_tweet(
     Fetches memories from the DB that are most closely related to bets.
     Returns a summary of the reasoning value from the metadata of those memories.
     """
-    memories = long_term_memory.search(from_=memories_since)
+    memories = long_term_memory.search_relevant(
+        query=tweet, k=MAX_REASONING_MEMORIES, from_=memories_since
+    )
     simple_memories = [
         SimpleMemoryThinkThoroughly.from_long_term_memory(ltm) for ltm in memories
     ]
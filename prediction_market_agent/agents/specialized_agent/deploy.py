@@ -9,15 +9,15 @@ from prediction_market_agent_tooling.deploy.agent import (
 from prediction_market_agent_tooling.gtypes import ChecksumAddress
 from prediction_market_agent_tooling.markets.markets import MarketType
 from prediction_market_agent_tooling.markets.omen.omen import OmenAgentMarket
-from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
-    OmenSubgraphHandler,
-)
 from web3 import Web3
 
 from prediction_market_agent.agents.prophet_agent.deploy import (
     DeployablePredictionProphetGPT4oAgent,
     DeployablePredictionProphetGPTo1PreviewAgent,
 )
+from prediction_market_agent.tools.cached_subgraph_handler import (
+    CachedOmenSubgraphHandler,
+)
 
 # List of white-listed market creator addresses that these specialized agents will bet on.
 SPECIALIZED_FOR_MARKET_CREATORS: list[ChecksumAddress] = [
@@ -41,7 +41,7 @@ class GetMarketCreatorsStalkerMarkets:
     ) -> t.Sequence[OmenAgentMarket]:
         available_markets = [
             OmenAgentMarket.from_data_model(m)
-            for m in OmenSubgraphHandler().get_omen_binary_markets_simple(
+            for m in CachedOmenSubgraphHandler().get_omen_binary_markets_simple(
                 limit=self.n_markets_to_fetch,
                 sort_by=sort_by,
                 filter_by=filter_by,
@@ -16,9 +16,6 @@ from langchain_openai import ChatOpenAI
 from prediction_market_agent_tooling.deploy.agent import initialize_langfuse
 from prediction_market_agent_tooling.loggers import logger
 from prediction_market_agent_tooling.markets.data_models import ProbabilisticAnswer
-from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
-    OmenSubgraphHandler,
-)
 from prediction_market_agent_tooling.tools.langfuse_ import langfuse_context, observe
 from prediction_market_agent_tooling.tools.parallelism import par_generator, par_map
 from prediction_market_agent_tooling.tools.utils import (
@@ -49,6 +46,9 @@ from prediction_market_agent.db.long_term_memory_table_handler import (
     LongTermMemoryTableHandler,
 )
 from prediction_market_agent.db.pinecone_handler import PineconeHandler
+from prediction_market_agent.tools.cached_subgraph_handler import (
+    CachedOmenSubgraphHandler,
+)
 from prediction_market_agent.tools.prediction_prophet.research import (
     prophet_make_prediction,
     prophet_research,
@@ -109,7 +109,7 @@ class ThinkThoroughlyBase(ABC):
 
     def __init__(self, enable_langfuse: bool, memory: bool = True) -> None:
         self.enable_langfuse = enable_langfuse
-        self.subgraph_handler = OmenSubgraphHandler()
+        self.subgraph_handler = CachedOmenSubgraphHandler()
         self.pinecone_handler = PineconeHandler()
         self.memory = memory
         self._long_term_memory = (
@@ -240,7 +240,7 @@ class ThinkThoroughlyBase(ABC):
 
         markets = par_map(
             items=[q.market_address for q in nearest_questions],
-            func=lambda market_address: OmenSubgraphHandler().get_omen_market_by_market_id(
+            func=lambda market_address: CachedOmenSubgraphHandler().get_omen_market_by_market_id(
                 market_id=market_address
             ),
         )
@@ -3,6 +3,7 @@ from string import Template
 
 from langchain.chains.summarize import load_summarize_chain
 from langchain_core.documents import Document
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
 from prediction_market_agent_tooling.loggers import logger
@@ -11,6 +12,7 @@ from prediction_market_agent_tooling.tools.langfuse_ import (
     get_langfuse_langchain_config,
     observe,
 )
+from prediction_market_agent_tooling.tools.parallelism import par_map
 from prediction_market_agent_tooling.tools.utils import DatetimeUTC
 
 from prediction_market_agent.agents.microchain_agent.memory import (
@@ -51,6 +53,22 @@ MEMORIES:
 {memories}
 """
 
+MERGE_LEARNINGS_TEMPLATE = """
+You are an agent that trades in prediction markets. You are aiming to improve
+your strategy over time.
+
+Below are several lists of 'past learnings', each one summarising a different,
+consecutive part of your memories, from the oldest to the newest. Merge them
+into a single, concise list of 'past learnings'. Keep a separate list for each
+'Trading Session', and display the range of timestamps for each.
+
+LEARNINGS:
+{learnings}
+"""
+
+# Memories longer than this are summarized in chunks, and the chunks' summaries merged.
+MAX_MEMORIES_CHARS_PER_CHUNK = 50_000
+
 EXTRACT_REASONINGS_TEMPLATE = """
 You are an agent that trades in prediction markets. You have a collection of memories that record your
 actions, and your reasoning behind them.
@@ -101,16 +119,67 @@ def extract_reasonings_to_learnings(
     )
 
 
-def memories_to_learnings(memories: list[DatedChatMessage], model: str) -> str:
+def split_into_chunks(texts: list[str], max_chars: int) -> list[list[str]]:
+    """
+    Split the texts into consecutive chunks of at most `max_chars` characters,
+    except for texts that are longer on their own.
+    """
+    chunks: list[list[str]] = [[]]
+    chunk_chars = 0
+    for text in texts:
+        if chunks[-1] and chunk_chars + len(text) > max_chars:
+            chunks.append([])
+            chunk_chars = 0
+        chunks[-1].append(text)
+        chunk_chars += len(text)
+    return chunks
+
+
+def merge_learnings(learnings: list[str], model: str = DEFAULT_OPENAI_MODEL) -> str:
+    llm = ChatOpenAI(
+        temperature=0,
+        model=model,
+        api_key=APIKeys().openai_api_key_secretstr_v1,
+    )
+    prompt = PromptTemplate.from_template(MERGE_LEARNINGS_TEMPLATE)
+    merged: str = (prompt | llm | StrOutputParser()).invoke(
+        {"learnings": "\n\n".join(learnings)},
+        config=get_langfuse_langchain_config(),
+    )
+    return merged
+
+
+def memories_to_learnings(
+    memories: list[DatedChatMessage],
+    model: str,
+    previous_learnings: str | None = None,
+) -> str:
     """
     Synthesize the memories into an intelligible summary that represents the
     past learnings.
+
+    If `previous_learnings` are given, they are merged with the learnings from
+    the memories, so only the memories that are new since then need to be
+    summarized. Too many memories are summarized in chunks, in parallel.
     """
     prompt = PromptTemplate.from_template(MEMORIES_TO_LEARNINGS_TEMPLATE)
-    return _summarize_learnings(
-        memories=[str(m) for m in memories],
-        prompt_template=prompt,
-        model=model,
+    chunks = split_into_chunks(
+        [str(m) for m in memories], max_chars=MAX_MEMORIES_CHARS_PER_CHUNK
+    )
+
+    def summarize_chunk(chunk: list[str]) -> str:
+        return _summarize_learnings(memories=chunk, prompt_template=prompt, model=model)
+
+    learnings = (
+        [summarize_chunk(chunks[0])]
+        if len(chunks) == 1
+        else par_map(items=chunks, func=summarize_chunk)
+    )
+    if previous_learnings is not None:
+        learnings.insert(0, previous_learnings)
+
+    return (
+        learnings[0] if len(learnings) == 1 else merge_learnings(learnings, model=model)
     )
 
 
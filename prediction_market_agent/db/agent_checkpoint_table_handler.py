@@ -0,0 +1,126 @@
+import json
+import typing as t
+from datetime import timedelta
+
+from prediction_market_agent_tooling.loggers import logger
+from prediction_market_agent_tooling.tools.utils import DatetimeUTC, utcnow
+from sqlmodel import col
+
+from prediction_market_agent.db.models import (
+    AgentCheckpointMessageModel,
+    AgentCheckpointModel,
+)
+from prediction_market_agent.db.sql_handler import SQLHandler
+
+
+class AgentCheckpointTableHandler:
+    def __init__(
+        self,
+        agent_id: str,
+        sqlalchemy_db_url: str | None = None,
+    ):
+        self.agent_id = agent_id
+        self.sql_handler = SQLHandler(
+            model=AgentCheckpointModel,
+            sqlalchemy_db_url=sqlalchemy_db_url,
+        )
+        self.messages_sql_handler = SQLHandler(
+            model=AgentCheckpointMessageModel,
+            sqlalchemy_db_url=sqlalchemy_db_url,
+        )
+
+    def save_checkpoint(
+        self,
+        model: AgentCheckpointModel,
+        new_messages: list[dict[str, t.Any]] | None = None,
+        n_previous_messages: int = 0,
+    ) -> AgentCheckpointModel:
+        """
+        Save the checkpoint, overwriting the previous checkpoint of the same
+        session if `model.id` is set, and add the history messages that came
+        after the first `n_previous_messages`.
+        """
+        checkpoint = self.sql_handler.save_or_update(model)
+        if new_messages:
+            self.messages_sql_handler.save_or_update_multiple(
+                [
+                    AgentCheckpointMessageModel(
+                        checkpoint_id=checkpoint.id,
+                        index=n_previous_messages + i,
+                        message=json.dumps(message),
+                    )
+                    for i, message in enumerate(new_messages)
+                ]
+            )
+        return checkpoint
+
+    def get_history(
+        self, checkpoint: AgentCheckpointModel
+    ) -> list[dict[str, t.Any]] | None:
+        """
+        History of the checkpointed session, or None if its messages weren't
+        all saved, e.g. the process was killed in between.
+        """
+        column_to_order: str = AgentCheckpointMessageModel.index.key  # type: ignore
+        items: t.Sequence[
+            AgentCheckpointMessageModel
+        ] = self.messages_sql_handler.get_with_filter_and_order(
+            query_filters=[
+                col(AgentCheckpointMessageModel.checkpoint_id) == checkpoint.id,
+                col(AgentCheckpointMessageModel.index) < checkpoint.n_history_messages,
+            ],
+            order_by_column_name=column_to_order,
+            order_desc=False,
+        )
+        if len(items) != checkpoint.n_history_messages:
+            return None
+        return [json.loads(item.message) for item in items]
+
+    def get_latest_checkpoint(self) -> AgentCheckpointModel | None:
+        column_to_order: str = AgentCheckpointModel.datetime_.key  # type: ignore
+        items: t.Sequence[
+            AgentCheckpointModel
+        ] = self.sql_handler.get_with_filter_and_order(
+            query_filters=[col(AgentCheckpointModel.agent_id) == self.agent_id],
+            order_by_column_name=column_to_order,
+            order_desc=True,
+            limit=1,
+        )
+        return items[0] if items else None
+
+    def get_unfinished_checkpoint(
+        self, max_age: timedelta | None = None
+    ) -> AgentCheckpointModel | None:
+        """
+        Checkpoint of the latest session, if it didn't finish. If `max_age` is
+        given, older checkpoints are ignored, as their state would be stale.
+        """
+        checkpoint = self.get_latest_checkpoint()
+        if checkpoint is None or checkpoint.is_finished:
+            return None
+        if (
+            max_age is not None
+            # Naive datetimes are returned by e.g. SQLite.
+            and DatetimeUTC.to_datetime_utc(checkpoint.datetime_) < utcnow() - max_age
+        ):
+            logger.info(
+                f"Not resuming the unfinished session from {checkpoint.datetime_}, it's older than {max_age}."
+            )
+            return None
+        return checkpoint
+
+    def delete_all_checkpoints(self) -> None:
+        """
+        Delete all checkpoints with `agent_id`
+        """
+        for checkpoint in self.sql_handler.get_with_filter_and_order(
+            query_filters=[col(AgentCheckpointModel.agent_id) == self.agent_id]
+        ):
+            self.messages_sql_handler.delete_all_entries(
+                col_name=AgentCheckpointMessageModel.checkpoint_id.key,  # type: ignore
+                col_value=checkpoint.id,
+            )
+        self.sql_handler.delete_all_entries(
+            col_name=AgentCheckpointModel.agent_id.key,  # type: ignore
+            col_value=self.agent_id,
+        )
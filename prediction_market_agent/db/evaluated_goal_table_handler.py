@@ -1,6 +1,8 @@
 import typing as t
 
-from sqlmodel import col
+from sqlalchemy import func, or_
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, col, desc, select
 
 from prediction_market_agent.db.models import EvaluatedGoalModel
 from prediction_market_agent.db.sql_handler import SQLHandler
@@ -33,6 +35,89 @@ class EvaluatedGoalTableHandler:
         )
         return list(items)
 
+    def get_latest_unique_evaluated_goals(self, limit: int) -> list[EvaluatedGoalModel]:
+        """
+        Get the latest evaluation of each distinct goal (by its goal,
+        motivation and completion criteria), ordered from the most recent, up
+        to `limit` goals.
+        """
+        goal_columns = (
+            col(EvaluatedGoalModel.goal),
+            col(EvaluatedGoalModel.motivation),
+            col(EvaluatedGoalModel.completion_criteria),
+        )
+        latest_first = (
+            desc(col(EvaluatedGoalModel.datetime_)),
+            desc(col(EvaluatedGoalModel.id)),
+        )
+        engine = self.sql_handler.engine
+        with Session(engine) as session:
+            if engine.dialect.name == "postgresql":
+                subquery = (
+                    select(EvaluatedGoalModel)
+                    .where(col(EvaluatedGoalModel.agent_id) == self.agent_id)
+                    .distinct(*goal_columns)
+                    .order_by(*goal_columns, *latest_first)
+                    .subquery()
+                )
+                latest_goals = aliased(EvaluatedGoalModel, subquery)
+                query = select(latest_goals)
+            else:
+                # No DISTINCT ON in other DBs (e.g. SQLite), so number the
+                # evaluations of each goal and keep the latest ones.
+                goal_rank = (
+                    func.row_number()
+                    .over(partition_by=goal_columns, order_by=latest_first)
+                    .label("goal_rank")
+                )
+                subquery = (
+                    select(EvaluatedGoalModel, goal_rank)
+                    .where(col(EvaluatedGoalModel.agent_id) == self.agent_id)
+                    .subquery()
+                )
+                latest_goals = aliased(EvaluatedGoalModel, subquery)
+                query = select(latest_goals).where(subquery.c.goal_rank == 1)
+
+            items = session.exec(
+                query.order_by(
+                    desc(latest_goals.datetime_), desc(latest_goals.id)
+                ).limit(limit)
+            ).all()
+        return list(items)
+
+    def count_latest_goal_evaluations(self, goal: EvaluatedGoalModel) -> int:
+        """
+        Count how many times in a row, up to now, the given goal (the latest
+        one) has been evaluated.
+        """
+        is_same_agent = col(EvaluatedGoalModel.agent_id) == self.agent_id
+        last_other_goal_datetime = (
+            select(func.max(EvaluatedGoalModel.datetime_))
+            .where(
+                is_same_agent,
+                or_(
+                    col(EvaluatedGoalModel.goal) != goal.goal,
+                    col(EvaluatedGoalModel.motivation) != goal.motivation,
+                    col(EvaluatedGoalModel.completion_criteria)
+                    != goal.completion_criteria,
+                ),
+            )
+            .scalar_subquery()
+        )
+        with Session(self.sql_handler.engine) as session:
+            count = session.exec(
+                select(func.count())
+                .select_from(EvaluatedGoalModel)
+                .where(
+                    is_same_agent,
+                    or_(
+                        last_other_goal_datetime.is_(None),
+                        col(EvaluatedGoalModel.datetime_) > last_other_goal_datetime,
+                    ),
+                )
+            ).one()
+        return int(count)
+
     def delete_all_evaluated_goals(self) -> None:
         """
         Delete all evaluated goals with `agent_id`
@@ -1,22 +1,75 @@
 import json
 import typing as t
 
-from prediction_market_agent_tooling.tools.utils import DatetimeUTC, utcnow
-from sqlmodel import col
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from prediction_market_agent_tooling.tools.utils import (
+    DatetimeUTC,
+    check_not_none,
+    utcnow,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import col, select
 
 from prediction_market_agent.agents.microchain_agent.answer_with_scenario import (
     AnswerWithScenario,
 )
-from prediction_market_agent.db.models import LongTermMemories
+from prediction_market_agent.db.models import LongTermMemories, LongTermMemoryEmbeddings
 from prediction_market_agent.db.sql_handler import SQLHandler
+from prediction_market_agent.utils import APIKeys, get_most_similar_indices
+
+DEFAULT_EMBEDDINGS_MODEL = "text-embedding-3-small"
+# Memories are embedded lazily, in requests of at most this many texts.
+EMBEDDINGS_BATCH_SIZE = 100
+# Only this many of the latest memories are ranked by relevance.
+MAX_RELEVANCE_CANDIDATES = 1000
+
+
+def build_memory_embeddings(model: str = DEFAULT_EMBEDDINGS_MODEL) -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(
+        api_key=APIKeys().openai_api_key_secretstr_v1,
+        model=model,
+    )
+
+
+def get_memory_text(memory: LongTermMemories) -> str:
+    """
+    Text of the memory to embed: the content of chat messages, or the whole
+    metadata for other kinds of memories.
+    """
+    metadata = json.loads(memory.metadata_ or "null")
+    if isinstance(metadata, dict) and "content" in metadata:
+        return str(metadata["content"])
+    return memory.metadata_ or ""
 
 
 class LongTermMemoryTableHandler:
-    def __init__(self, task_description: str, sqlalchemy_db_url: str | None = None):
+    def __init__(
+        self,
+        task_description: str,
+        sqlalchemy_db_url: str | None = None,
+        embeddings: Embeddings | None = None,
+    ):
+        """
+        If `embeddings` are given, the memories can be retrieved by relevance
+        with `search_relevant`, which embeds them on its first use, not when
+        they are saved.
+        """
         self.task_description = task_description
         self.sql_handler = SQLHandler(
             model=LongTermMemories, sqlalchemy_db_url=sqlalchemy_db_url
         )
+        self.embeddings = embeddings
+        self.embeddings_sql_handler = SQLHandler(
+            model=LongTermMemoryEmbeddings, sqlalchemy_db_url=sqlalchemy_db_url
+        )
+        # Local index of the already loaded embeddings, by memory id.
+        self._embeddings_index: dict[int, np.ndarray] = {}
+
+    @property
+    def embeddings_model(self) -> str:
+        return str(getattr(self.embeddings, "model", type(self.embeddings).__name__))
 
     def save_history(self, history: list[dict[str, t.Any]]) -> None:
         """Save item to storage. Note that score allows many types for easier handling by agent."""
@@ -41,9 +94,13 @@ class LongTermMemoryTableHandler:
         self,
         from_: DatetimeUTC | None = None,
         to_: DatetimeUTC | None = None,
+        after_id: int | None = None,
+        limit: int | None = None,
     ) -> t.Sequence[LongTermMemories]:
         """Searches the LongTermMemoryTableHandler for entries within a specified datetime range that match
-        self.task_description."""
+        self.task_description. If `after_id` is given, only entries saved after that one are returned.
+        If `limit` is given, only that many of the latest entries are returned.
+        """
         query_filters = [
             col(LongTermMemories.task_description) == self.task_description
         ]
@@ -51,17 +108,104 @@ class LongTermMemoryTableHandler:
             query_filters.append(col(LongTermMemories.datetime_) >= from_)
         if to_ is not None:
             query_filters.append(col(LongTermMemories.datetime_) <= to_)
+        if after_id is not None:
+            query_filters.append(col(LongTermMemories.id) > after_id)
 
         return self.sql_handler.get_with_filter_and_order(
             query_filters=query_filters,
             order_by_column_name=LongTermMemories.datetime_.key,  # type: ignore[attr-defined]
             order_desc=True,
+            limit=limit,
+        )
+
+    def search_relevant(
+        self,
+        query: str,
+        k: int,
+        from_: DatetimeUTC | None = None,
+        to_: DatetimeUTC | None = None,
+        max_candidates: int = MAX_RELEVANCE_CANDIDATES,
+    ) -> list[LongTermMemories]:
+        """
+        Returns the `k` memories within the datetime range that are most
+        relevant to the query (e.g. a market question or a tweet), the most
+        relevant first. Only the latest `max_candidates` memories are ranked.
+        """
+        if self.embeddings is None:
+            raise ValueError("Embeddings are required to search relevant memories.")
+
+        memories = self.search(from_=from_, to_=to_, limit=max_candidates)
+        if not memories:
+            return []
+
+        most_similar = get_most_similar_indices(
+            self._get_embeddings(memories),
+            np.array(self.embeddings.embed_query(query)),
+            k=k,
         )
+        return [memories[i] for i in most_similar]
+
+    def _get_embeddings(
+        self, memories: t.Sequence[LongTermMemories]
+    ) -> list[np.ndarray]:
+        """
+        Get the memories' embeddings from the local index, loading the missing
+        ones from the DB, and embedding the memories that weren't embedded yet.
+        """
+        memory_ids = [check_not_none(m.id) for m in memories]
+        if missing_ids := [i for i in memory_ids if i not in self._embeddings_index]:
+            for item in self.embeddings_sql_handler.get_with_filter_and_order(
+                query_filters=[
+                    col(LongTermMemoryEmbeddings.memory_id).in_(missing_ids),
+                    col(LongTermMemoryEmbeddings.model) == self.embeddings_model,
+                ]
+            ):
+                self._embeddings_index[item.memory_id] = np.array(
+                    json.loads(item.embedding)
+                )
+        not_embedded = [m for m in memories if m.id not in self._embeddings_index]
+        for i in range(0, len(not_embedded), EMBEDDINGS_BATCH_SIZE):
+            self._embed_memories(not_embedded[i : i + EMBEDDINGS_BATCH_SIZE])
+        return [self._embeddings_index[i] for i in memory_ids]
+
+    def _embed_memories(self, memories: t.Sequence[LongTermMemories]) -> None:
+        embeddings = check_not_none(self.embeddings)
+        vectors = embeddings.embed_documents([get_memory_text(m) for m in memories])
+        items = [
+            LongTermMemoryEmbeddings(
+                memory_id=check_not_none(memory.id),
+                model=self.embeddings_model,
+                embedding=json.dumps(vector),
+            )
+            for memory, vector in zip(memories, vectors)
+        ]
+        try:
+            self.embeddings_sql_handler.save_multiple(items)
+        except IntegrityError:
+            # Some were embedded by a concurrent search meanwhile, save the rest.
+            for item in items:
+                try:
+                    self.embeddings_sql_handler.save_multiple([item])
+                except IntegrityError:
+                    pass
+        for memory, vector in zip(memories, vectors):
+            self._embeddings_index[check_not_none(memory.id)] = np.array(vector)
 
     def delete_all_memories(self) -> None:
         """
-        Delete all memories with `task_description`
+        Delete all memories with `task_description`, and their embeddings.
         """
+        # Embeddings first, so none are left without their memory, if this fails halfway.
+        self.embeddings_sql_handler.delete_with_filter(
+            query_filters=[
+                col(LongTermMemoryEmbeddings.memory_id).in_(
+                    select(LongTermMemories.id).where(
+                        col(LongTermMemories.task_description) == self.task_description
+                    )
+                )
+            ]
+        )
+        self._embeddings_index.clear()
         self.sql_handler.delete_all_entries(
             col_name=LongTermMemories.task_description.key,  # type: ignore[attr-defined]
             col_value=self.task_description,
@@ -0,0 +1,45 @@
+import typing as t
+
+from sqlmodel import col
+
+from prediction_market_agent.db.models import MemorySummaryModel
+from prediction_market_agent.db.sql_handler import SQLHandler
+
+
+class MemorySummaryTableHandler:
+    def __init__(
+        self,
+        task_description: str,
+        sqlalchemy_db_url: str | None = None,
+    ):
+        self.task_description = task_description
+        self.sql_handler = SQLHandler(
+            model=MemorySummaryModel,
+            sqlalchemy_db_url=sqlalchemy_db_url,
+        )
+
+    def save_summary(self, model: MemorySummaryModel) -> None:
+        self.sql_handler.save_multiple([model])
+
+    def get_latest_summary(self) -> MemorySummaryModel | None:
+        column_to_order: str = MemorySummaryModel.datetime_.key  # type: ignore
+        items: t.Sequence[
+            MemorySummaryModel
+        ] = self.sql_handler.get_with_filter_and_order(
+            query_filters=[
+                col(MemorySummaryModel.task_description) == self.task_description
+            ],
+            order_by_column_name=column_to_order,
+            order_desc=True,
+            limit=1,
+        )
+        return items[0] if items else None
+
+    def delete_all_summaries(self) -> None:
+        """
+        Delete all summaries with `task_description`
+        """
+        self.sql_handler.delete_all_entries(
+            col_name=MemorySummaryModel.task_description.key,  # type: ignore
+            col_value=self.task_description,
+        )
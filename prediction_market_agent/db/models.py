@@ -1,7 +1,7 @@
 from typing import Optional
 
 from prediction_market_agent_tooling.tools.utils import DatetimeUTC
-from sqlmodel import Field, SQLModel
+from sqlmodel import Field, SQLModel, UniqueConstraint
 
 
 class LongTermMemories(SQLModel, table=True):
@@ -13,6 +13,21 @@ class LongTermMemories(SQLModel, table=True):
     datetime_: DatetimeUTC
 
 
+class LongTermMemoryEmbeddings(SQLModel, table=True):
+    """Embedding of a `LongTermMemories` entry, used to retrieve the relevant memories."""
+
+    __tablename__ = "long_term_memory_embeddings"
+    __table_args__ = (
+        # Concurrent searches could embed the same memory otherwise.
+        UniqueConstraint("memory_id", "model"),
+        {"extend_existing": True},
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    memory_id: int = Field(index=True)
+    model: str
+    embedding: str  # JSON-serialized list of floats
+
+
 PROMPT_DEFAULT_SESSION_IDENTIFIER = "microchain-streamlit"
 
 
@@ -48,3 +63,83 @@ class EvaluatedGoalModel(SQLModel, table=True):
     reasoning: str
     output: str | None
     datetime_: DatetimeUTC
+
+
+class AgentCheckpointModel(SQLModel, table=True):
+    """
+    Checkpoint of general agent's session, updated after each iteration, so an
+    unfinished session can be resumed, e.g. after the agent's pod is preempted.
+    """
+
+    __tablename__ = "agent_checkpoints"
+    __table_args__ = {"extend_existing": True}
+    id: Optional[int] = Field(default=None, primary_key=True)
+    agent_id: str  # Per-agent identifier
+    # The messages are stored as `AgentCheckpointMessageModel`s
+    n_history_messages: int
+    initial_system_prompt: str
+    system_prompt: str
+    goal: Optional[str] = None  # JSON-serialized goal, if the agent has one
+    iteration: int
+    # Number of the history messages already saved to the long-term memory
+    n_saved_history_messages: int
+    prompt_tokens: int
+    completion_tokens: int
+    is_finished: bool
+    datetime_: DatetimeUTC
+
+
+class AgentCheckpointMessageModel(SQLModel, table=True):
+    """
+    Message of a checkpointed session's history, stored separately so that
+    each checkpoint only adds the new messages, instead of the whole history.
+    """
+
+    __tablename__ = "agent_checkpoint_messages"
+    __table_args__ = {"extend_existing": True}
+    checkpoint_id: int = Field(primary_key=True)
+    index: int = Field(primary_key=True)
+    message: str  # JSON-serialized message
+
+
+class MemorySummaryModel(SQLModel, table=True):
+    """
+    Rolling summary of agent's long-term memories, so that only the memories
+    added after `last_memory_id` need to be summarized the next time.
+    """
+
+    __tablename__ = "memory_summaries"
+    __table_args__ = {"extend_existing": True}
+    id: Optional[int] = Field(default=None, primary_key=True)
+    task_description: str
+    summary: str
+    # Range of the memories covered by the summary
+    covered_from: DatetimeUTC
+    last_memory_id: int
+    last_memory_datetime: DatetimeUTC
+    datetime_: DatetimeUTC
+
+
+class OmenMarketSnapshotModel(SQLModel, table=True):
+    """
+    Local copy of an Omen market from the subgraph, with the columns used for
+    filtering, so the agents don't need to pull all the markets on each run.
+    """
+
+    __tablename__ = "omen_market_snapshots"
+    __table_args__ = {"extend_existing": True}
+    id: str = Field(primary_key=True)  # Market's address
+    title: str
+    creator: str = Field(index=True)
+    collateral_token: str
+    creation_timestamp: int = Field(index=True)
+    opening_timestamp: int
+    answer_finalized_timestamp: Optional[int] = None
+    resolution_timestamp: Optional[int] = None
+    has_answer: bool
+    has_invalid_answer: bool
+    liquidity_parameter: float  # In wei, as a float because it can overflow int64
+    # The subgraph doesn't return these markets, so neither does the snapshot.
+    is_pending_arbitration: bool = False
+    market: str  # JSON-serialized OmenMarket
+    synced_at: int = Field(index=True)  # When the market was pulled last time
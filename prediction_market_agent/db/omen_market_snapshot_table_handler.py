@@ -0,0 +1,323 @@
+import sys
+import typing as t
+from datetime import timedelta
+
+from prediction_market_agent_tooling.gtypes import ChecksumAddress, HexAddress, Wei
+from prediction_market_agent_tooling.loggers import logger
+from prediction_market_agent_tooling.markets.omen.data_models import OmenMarket
+from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
+    SAFE_COLLATERAL_TOKEN_MARKETS,
+    OmenSubgraphHandler,
+)
+from prediction_market_agent_tooling.tools.utils import (
+    DatetimeUTC,
+    to_int_timestamp,
+    utcnow,
+)
+from pydantic import BaseModel
+from sqlalchemy import ColumnElement, func, update
+from sqlmodel import Session, col, desc, select
+
+from prediction_market_agent.db.models import OmenMarketSnapshotModel
+from prediction_market_agent.db.sql_handler import SQLHandler
+from prediction_market_agent.tools.cached_subgraph_handler import (
+    CachedOmenSubgraphHandler,
+)
+
+
+class MarketId(BaseModel):
+    id: HexAddress
+
+
+class OmenMarketSnapshotTableHandler:
+    """
+    Local snapshot of Omen's binary markets, kept up to date by `sync`, which
+    pulls only the markets created since the last sync, and refreshes only the
+    markets updated since then (traded, answered, resolved, or with an
+    arbitration requested).
+
+    Good for filtering on the fields that don't change once set (e.g. titles
+    or creators). Anything that is acted upon on-chain should be re-checked
+    against the subgraph or the contracts, as the snapshot is only as fresh as
+    its last sync.
+    """
+
+    # Markets are refreshed from the subgraph in batches of this many ids.
+    REFRESH_BATCH_SIZE = 500
+    # The updates are looked up since the last sync minus this, because the
+    # market's `lastActiveHour` is rounded down, and the subgraph can lag behind.
+    SYNC_OVERLAP = timedelta(hours=1)
+
+    def __init__(
+        self,
+        sqlalchemy_db_url: str | None = None,
+        subgraph_handler: OmenSubgraphHandler | None = None,
+    ) -> None:
+        self.sql_handler = SQLHandler(
+            model=OmenMarketSnapshotModel, sqlalchemy_db_url=sqlalchemy_db_url
+        )
+        self.subgraph_handler = subgraph_handler or CachedOmenSubgraphHandler()
+
+    @staticmethod
+    def to_model(market: OmenMarket, synced_at: DatetimeUTC) -> OmenMarketSnapshotModel:
+        return OmenMarketSnapshotModel(
+            id=market.id,
+            title=market.title,
+            creator=market.creator.lower(),
+            collateral_token=market.collateralToken.lower(),
+            creation_timestamp=market.creationTimestamp,
+            opening_timestamp=market.openingTimestamp,
+            answer_finalized_timestamp=market.answerFinalizedTimestamp,
+            resolution_timestamp=market.resolutionTimestamp,
+            has_answer=market.currentAnswer is not None,
+            has_invalid_answer=market.currentAnswer is not None
+            and not market.has_valid_answer,
+            liquidity_parameter=float(market.liquidityParameter),
+            is_pending_arbitration=market.question.isPendingArbitration,
+            market=market.model_dump_json(),
+            synced_at=to_int_timestamp(synced_at),
+        )
+
+    def sync(
+        self,
+        refresh: bool = True,
+        initial_created_after: DatetimeUTC | None = None,
+    ) -> None:
+        """
+        Pull the markets created since the last sync (or since
+        `initial_created_after`, if the snapshot is empty). If `refresh` is set,
+        also update the markets that changed since the last sync.
+        """
+        synced_at = utcnow()
+        with Session(self.sql_handler.engine) as session:
+            last_creation_timestamp, last_synced_at = session.exec(
+                select(
+                    func.max(OmenMarketSnapshotModel.creation_timestamp),
+                    func.max(OmenMarketSnapshotModel.synced_at),
+                )
+            ).one()
+
+        created_after = (
+            # Markets created in the same second might not have been indexed
+            # yet, so pull that second again.
+            DatetimeUTC.to_datetime_utc(last_creation_timestamp - 1)
+            if last_creation_timestamp is not None
+            else initial_created_after
+        )
+        new_markets = self.subgraph_handler.get_omen_binary_markets(
+            limit=None,
+            created_after=created_after,
+            collateral_token_address_in=None,
+        )
+        logger.info(f"Syncing {len(new_markets)} new markets to the snapshot.")
+        self.sql_handler.save_or_update_multiple(
+            [self.to_model(m, synced_at=synced_at) for m in new_markets]
+        )
+
+        if refresh and last_synced_at is not None:
+            self.refresh_updated_markets(
+                updated_after=DatetimeUTC.to_datetime_utc(last_synced_at)
+                - self.SYNC_OVERLAP,
+                synced_at=synced_at,
+            )
+
+    def refresh_updated_markets(
+        self, updated_after: DatetimeUTC, synced_at: DatetimeUTC | None = None
+    ) -> None:
+        """
+        Refresh the markets of the snapshot that were traded, answered or
+        resolved after `updated_after`, or whose arbitration has finished, and
+        mark the ones pending arbitration.
+        """
+        synced_at = synced_at or utcnow()
+        timestamp = to_int_timestamp(updated_after)
+        updated_ids = (
+            self.get_market_ids({"lastActiveHour_gte": timestamp})
+            | self.get_market_ids(
+                {"question_": {"currentAnswerTimestamp_gte": timestamp}}
+            )
+            | self.get_market_ids({"resolutionTimestamp_gte": timestamp})
+        )
+        pending_arbitration_ids = self.get_market_ids({"isPendingArbitration": True})
+
+        with Session(self.sql_handler.engine) as session:
+            in_snapshot_ids = set(
+                session.exec(
+                    select(OmenMarketSnapshotModel.id).where(
+                        col(OmenMarketSnapshotModel.id).in_(
+                            updated_ids | pending_arbitration_ids
+                        )
+                    )
+                ).all()
+            )
+            previously_pending_ids = set(
+                session.exec(
+                    select(OmenMarketSnapshotModel.id).where(
+                        col(OmenMarketSnapshotModel.is_pending_arbitration)
+                        == True  # noqa: E712
+                    )
+                ).all()
+            )
+            # The subgraph doesn't return the markets pending arbitration, so just mark them.
+            session.execute(
+                update(OmenMarketSnapshotModel)
+                .where(
+                    col(OmenMarketSnapshotModel.id).in_(
+                        pending_arbitration_ids & in_snapshot_ids
+                    )
+                )
+                .values(is_pending_arbitration=True)
+            )
+            session.commit()
+
+        refresh_ids = sorted(
+            ((updated_ids & in_snapshot_ids) | previously_pending_ids)
+            - pending_arbitration_ids
+        )
+        logger.info(f"Refreshing {len(refresh_ids)} updated markets in the snapshot.")
+        for i in range(0, len(refresh_ids), self.REFRESH_BATCH_SIZE):
+            markets = self.subgraph_handler.get_omen_binary_markets(
+                limit=None,
+                id_in=refresh_ids[i : i + self.REFRESH_BATCH_SIZE],
+                collateral_token_address_in=None,
+            )
+            self.sql_handler.save_or_update_multiple(
+                [self.to_model(m, synced_at=synced_at) for m in markets]
+            )
+
+    def get_market_ids(self, where: dict[str, t.Any]) -> set[HexAddress]:
+        """
+        Ids of the markets matching the subgraph filter, without pulling the
+        whole markets.
+        """
+        markets = self.subgraph_handler.trades_subgraph.Query.fixedProductMarketMakers(
+            first=sys.maxsize, where=where
+        )
+        return {
+            m.id
+            for m in self.subgraph_handler.do_query(
+                fields=[markets.id], pydantic_model=MarketId
+            )
+        }
+
+    def get_markets(
+        self,
+        limit: int | None = None,
+        creator: HexAddress | None = None,
+        created_after: DatetimeUTC | None = None,
+        question_opened_before: DatetimeUTC | None = None,
+        question_finalized_before: DatetimeUTC | None = None,
+        question_finalized_after: DatetimeUTC | None = None,
+        question_with_answers: bool | None = None,
+        resolved: bool | None = None,
+        liquidity_bigger_than: Wei | None = None,
+        collateral_token_address_in: (
+            tuple[ChecksumAddress, ...] | None
+        ) = SAFE_COLLATERAL_TOKEN_MARKETS,
+    ) -> list[OmenMarket]:
+        """
+        Same filters as in `OmenSubgraphHandler.get_omen_binary_markets`,
+        newest markets first.
+        """
+        query = select(OmenMarketSnapshotModel.market).where(
+            *self._build_where_statements(
+                creator=creator,
+                created_after=created_after,
+                question_opened_before=question_opened_before,
+                question_finalized_before=question_finalized_before,
+                question_finalized_after=question_finalized_after,
+                question_with_answers=question_with_answers,
+                resolved=resolved,
+                liquidity_bigger_than=liquidity_bigger_than,
+                collateral_token_address_in=collateral_token_address_in,
+            )
+        )
+        query = query.order_by(desc(col(OmenMarketSnapshotModel.creation_timestamp)))
+        if limit is not None:
+            query = query.limit(limit)
+        with Session(self.sql_handler.engine) as session:
+            markets_json = session.exec(query).all()
+        return [OmenMarket.model_validate_json(m) for m in markets_json]
+
+    def get_question_titles(
+        self,
+        collateral_token_address_in: (
+            tuple[ChecksumAddress, ...] | None
+        ) = SAFE_COLLATERAL_TOKEN_MARKETS,
+    ) -> set[str]:
+        """
+        Titles of all the markets, without loading the whole markets.
+        """
+        with Session(self.sql_handler.engine) as session:
+            titles = session.exec(
+                select(OmenMarketSnapshotModel.title).where(
+                    *self._build_where_statements(
+                        collateral_token_address_in=collateral_token_address_in
+                    )
+                )
+            ).all()
+        return set(titles)
+
+    @staticmethod
+    def _build_where_statements(
+        creator: HexAddress | None = None,
+        created_after: DatetimeUTC | None = None,
+        question_opened_before: DatetimeUTC | None = None,
+        question_finalized_before: DatetimeUTC | None = None,
+        question_finalized_after: DatetimeUTC | None = None,
+        question_with_answers: bool | None = None,
+        resolved: bool | None = None,
+        liquidity_bigger_than: Wei | None = None,
+        collateral_token_address_in: tuple[ChecksumAddress, ...] | None = None,
+    ) -> list[ColumnElement[bool]]:
+        model = OmenMarketSnapshotModel
+        # As the subgraph does.
+        where_stms: list[ColumnElement[bool]] = [
+            col(model.is_pending_arbitration) == False  # noqa: E712
+        ]
+
+        if creator is not None:
+            where_stms.append(col(model.creator) == creator.lower())
+        if created_after is not None:
+            where_stms.append(
+                col(model.creation_timestamp) > to_int_timestamp(created_after)
+            )
+        if question_opened_before is not None:
+            where_stms.append(
+                col(model.opening_timestamp) < to_int_timestamp(question_opened_before)
+            )
+        if question_finalized_before is not None:
+            where_stms.append(
+                col(model.answer_finalized_timestamp)
+                < to_int_timestamp(question_finalized_before)
+            )
+        if question_finalized_after is not None:
+            where_stms.append(
+                col(model.answer_finalized_timestamp)
+                > to_int_timestamp(question_finalized_after)
+            )
+        if question_with_answers is not None:
+            where_stms.append(col(model.has_answer) == question_with_answers)
+        if resolved is not None:
+            if resolved:
+                where_stms.append(col(model.resolution_timestamp).is_not(None))
+                where_stms.append(col(model.has_invalid_answer) == False)  # noqa: E712
+            else:
+                where_stms.append(col(model.resolution_timestamp).is_(None))
+        if liquidity_bigger_than is not None:
+            where_stms.append(
+                col(model.liquidity_parameter) > float(liquidity_bigger_than)
+            )
+        if collateral_token_address_in:
+            where_stms.append(
+                col(model.collateral_token).in_(
+                    [x.lower() for x in collateral_token_address_in]
+                )
+            )
+
+        return where_stms
+
+    def delete_all_markets(self) -> None:
+        with Session(self.sql_handler.engine) as session:
+            session.query(OmenMarketSnapshotModel).delete()
+            session.commit()
@@ -1,5 +1,4 @@
 import base64
-import sys
 import typing as t
 from typing import Optional
 
@@ -8,17 +7,16 @@ from langchain_openai import OpenAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from loguru import logger
 from pinecone import Index, Pinecone
-from prediction_market_agent_tooling.markets.agent_market import FilterBy, SortBy
 from prediction_market_agent_tooling.markets.omen.data_models import OmenMarket
-from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
-    OmenSubgraphHandler,
-)
 from prediction_market_agent_tooling.tools.datetime_utc import DatetimeUTC
 from tqdm import tqdm
 
 from prediction_market_agent.agents.think_thoroughly_agent.models import (
     PineconeMetadata,
 )
+from prediction_market_agent.db.omen_market_snapshot_table_handler import (
+    OmenMarketSnapshotTableHandler,
+)
 from prediction_market_agent.utils import APIKeys
 
 INDEX_NAME = "omen-index-text-embeddings-3-large"
@@ -117,13 +115,11 @@ class PineconeHandler:
     ) -> None:
         """We use the agent's run to add embeddings of new markets that don't exist yet in the
         vector DB."""
-        subgraph_handler = OmenSubgraphHandler()
-        markets = subgraph_handler.get_omen_binary_markets_simple(
-            limit=sys.maxsize,
-            filter_by=FilterBy.NONE,
-            sort_by=SortBy.NEWEST,
-            created_after=created_after,
-        )
+        # Pulls only the markets created or updated since the last run, instead of all of them every time.
+        # The updates matter for deduplication by the volume, and for the markets pending arbitration.
+        snapshot_handler = OmenMarketSnapshotTableHandler()
+        snapshot_handler.sync()
+        markets = snapshot_handler.get_markets(created_after=created_after)
 
         markets_without_duplicates = self.deduplicate_markets(markets)
         missing_markets = self.filter_markets_already_in_index(
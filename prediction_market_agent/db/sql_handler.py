@@ -2,11 +2,16 @@ import typing as t
 
 from prediction_market_agent_tooling.tools.utils import check_not_none
 from sqlalchemy import BinaryExpression, ColumnElement
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlmodel import Session, SQLModel, asc, create_engine, desc
 
 from prediction_market_agent.utils import DBKeys
 
 SQLModelType = t.TypeVar("SQLModelType", bound=SQLModel)
+# Dialects with `INSERT ... ON CONFLICT DO UPDATE`.
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+# Keep the upserts under the bound parameters limit of the DBs (65535 for Postgres, 32766 for SQLite).
+MAX_STATEMENT_PARAMETERS = 30000
 
 
 class SQLHandler:
@@ -33,11 +38,73 @@ class SQLHandler:
             session.add_all(items)
             session.commit()
 
-    def delete_all_entries(self, col_name: str, col_value: str) -> None:
+    def save_or_update(self, item: SQLModelType) -> SQLModelType:
+        """
+        Insert the item, or update it if an item with the same primary key
+        already exists. Returns the saved item, with its primary key set.
+        """
+        with Session(self.engine) as session:
+            saved_item = session.merge(item)
+            session.commit()
+            session.refresh(saved_item)
+        return saved_item
+
+    def save_or_update_multiple(self, items: t.Sequence[SQLModelType]) -> None:
+        """
+        Like `save_or_update`, but for many items in a single transaction.
+        Items are upserted (`INSERT ... ON CONFLICT DO UPDATE`), so writers
+        saving the same items concurrently don't fail on the primary key.
+        """
+        if self.engine.dialect.name not in UPSERT_INSERTS:
+            with Session(self.engine) as session:
+                for item in items:
+                    session.merge(item)
+                session.commit()
+            return
+
+        table = SQLModel.metadata.tables[str(self.table.__tablename__)]
+        primary_keys = [c.name for c in table.primary_key.columns]
+        # The same row can't be updated twice by one statement, so keep the last one.
+        rows = list(
+            {
+                tuple(row[k] for k in primary_keys): row
+                for row in (item.model_dump() for item in items)
+            }.values()
+        )
+        chunk_size = max(1, MAX_STATEMENT_PARAMETERS // len(table.columns))
+        with Session(self.engine) as session:
+            for i in range(0, len(rows), chunk_size):
+                statement = UPSERT_INSERTS[self.engine.dialect.name](table).values(
+                    rows[i : i + chunk_size]
+                )
+                session.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=primary_keys,
+                        set_={
+                            c.name: statement.excluded[c.name]
+                            for c in table.columns
+                            if c.name not in primary_keys
+                        },
+                    )
+                )
+            session.commit()
+
+    def delete_all_entries(self, col_name: str, col_value: str | int) -> None:
         with Session(self.engine) as session:
             session.query(self.table).filter_by(**{col_name: col_value}).delete()
             session.commit()
 
+    def delete_with_filter(
+        self,
+        query_filters: t.Sequence[ColumnElement[bool] | BinaryExpression[bool]],
+    ) -> None:
+        with Session(self.engine) as session:
+            query = session.query(self.table)
+            for exp in query_filters:
+                query = query.where(exp)
+            query.delete(synchronize_session=False)
+            session.commit()
+
     def get_with_filter_and_order(
         self,
         query_filters: t.Sequence[ColumnElement[bool] | BinaryExpression[bool]] = (),
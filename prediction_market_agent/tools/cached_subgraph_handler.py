@@ -0,0 +1,185 @@
+import atexit
+import threading
+import time
+import typing as t
+from concurrent.futures import Future
+from datetime import timedelta
+
+from prediction_market_agent_tooling.loggers import logger
+from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
+    OmenSubgraphHandler,
+)
+from pydantic import BaseModel
+
+# How long are the results of the cached methods valid.
+DEFAULT_METHOD_TTLS: dict[str, timedelta] = {
+    "get_responses": timedelta(seconds=30),
+    "get_omen_market_by_market_id": timedelta(seconds=30),
+    "get_omen_binary_markets": timedelta(seconds=30),
+    "get_omen_binary_markets_simple": timedelta(seconds=30),
+    # Images are set once per market and practically never change.
+    "get_market_image_url": timedelta(minutes=10),
+}
+DEFAULT_MAX_ENTRIES = 256
+
+
+class MethodCacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    # Unbounded queries (`limit=None`), which aren't cached.
+    bypassed: int = 0
+    # Calls that waited for an identical call already in flight.
+    coalesced: int = 0
+    errors: int = 0
+
+
+class _CacheEntry(t.NamedTuple):
+    expires_at: float
+    value: t.Any
+
+
+def _normalize(value: t.Any) -> t.Hashable:
+    """
+    Turns the arguments into something hashable, equal for equal arguments
+    (e.g. sets with a different insertion order).
+    """
+    if isinstance(value, (set, frozenset)):
+        return ("set", tuple(sorted((_normalize(v) for v in value), key=repr)))
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _normalize(v)) for k, v in value.items()))
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+class SingleFlightTTLCache:
+    """
+    In-memory cache of function results, valid for the given TTL. Identical
+    calls made while the first one is still running wait for its result,
+    instead of all computing it.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._cache: dict[t.Hashable, _CacheEntry] = {}
+        self._in_flight: dict[t.Hashable, Future[t.Any]] = {}
+        self._stats: dict[str, MethodCacheStats] = {}
+
+    def wrap(
+        self, name: str, func: t.Callable[..., t.Any], ttl: timedelta
+    ) -> t.Callable[..., t.Any]:
+        ttl_seconds = ttl.total_seconds()
+        stats = self._stats.setdefault(name, MethodCacheStats())
+
+        def wrapper(*args: t.Any, **kwargs: t.Any) -> t.Any:
+            if "limit" in kwargs and kwargs["limit"] is None:
+                # Results of unbounded queries can be huge, so they'd bloat the
+                # cache, and they're mostly made by the jobs acting on them.
+                with self._lock:
+                    stats.bypassed += 1
+                return func(*args, **kwargs)
+
+            key = (name, _normalize(args), _normalize(kwargs))
+            owner = False
+
+            with self._lock:
+                entry = self._cache.get(key)
+                if entry is not None:
+                    if entry.expires_at > time.monotonic():
+                        stats.hits += 1
+                        return _copy(entry.value)
+                    # Don't keep the expired results until the next write.
+                    del self._cache[key]
+                future = self._in_flight.get(key)
+                if future is not None:
+                    stats.coalesced += 1
+                else:
+                    stats.misses += 1
+                    future = self._in_flight[key] = Future()
+                    owner = True
+            if not owner:
+                return _copy(future.result())
+
+            try:
+                value = func(*args, **kwargs)
+            except BaseException as e:
+                # Errors aren't cached, but the waiting callers get them too.
+                with self._lock:
+                    stats.errors += 1
+                    del self._in_flight[key]
+                future.set_exception(e)
+                raise
+
+            with self._lock:
+                del self._in_flight[key]
+                self._cache[key] = _CacheEntry(
+                    expires_at=time.monotonic() + ttl_seconds, value=value
+                )
+                self._evict()
+            future.set_result(value)
+            return _copy(value)
+
+        return wrapper
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, e in self._cache.items() if e.expires_at <= now]:
+            del self._cache[key]
+        # Dicts keep the insertion order, so the oldest entries go first.
+        while len(self._cache) > self.max_entries:
+            del self._cache[next(iter(self._cache))]
+
+    def get_stats(self) -> dict[str, MethodCacheStats]:
+        with self._lock:
+            return {name: stats.model_copy() for name, stats in self._stats.items()}
+
+    def log_stats(self) -> None:
+        for name, stats in self.get_stats().items():
+            logger.info(f"Cache of {name}: {stats}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+class CachedOmenSubgraphHandler(OmenSubgraphHandler):
+    """
+    Omen subgraph handler that caches the results of the read methods in
+    `DEFAULT_METHOD_TTLS` for a short time, and coalesces identical queries
+    in flight, so that concurrent callers (e.g. in `par_map`) wait for the
+    single query instead of all issuing it.
+
+    As `OmenSubgraphHandler`, this is a singleton, so the cache is shared by
+    the whole process. Results can be as old as their method's TTL, so use it
+    only for reads that don't need to see the agent's own transactions, e.g.
+    not before answering a question the agent could have just answered.
+    Unbounded queries (`limit=None`) aren't cached.
+
+    The cache's counters are logged when the process exits, and available from
+    `get_cache_stats` in the meantime.
+    """
+
+    def __init__(
+        self,
+        method_ttls: t.Mapping[str, timedelta] = DEFAULT_METHOD_TTLS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        super().__init__()
+        self.cache = SingleFlightTTLCache(max_entries=max_entries)
+        for name, ttl in method_ttls.items():
+            setattr(self, name, self.cache.wrap(name, getattr(self, name), ttl))
+        # Report the counters of every process that used the handler.
+        atexit.register(self.cache.log_stats)
+
+    def get_cache_stats(self) -> dict[str, MethodCacheStats]:
+        return self.cache.get_stats()
+
+
+def _copy(value: t.Any) -> t.Any:
+    # Callers may modify the returned lists, which mustn't change the cache.
+    return list(value) if isinstance(value, list) else value
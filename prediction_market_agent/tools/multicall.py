@@ -0,0 +1,278 @@
+import json
+import threading
+import typing as t
+from concurrent.futures import Future
+from datetime import timedelta
+from functools import cache
+
+from eth_utils.abi import collapse_if_tuple
+from prediction_market_agent_tooling.gtypes import ABI, ChecksumAddress, HexBytes, Wei
+from prediction_market_agent_tooling.markets.omen.omen_contracts import (
+    WrappedxDaiContract,
+)
+from prediction_market_agent_tooling.tools.balances import Balances
+from prediction_market_agent_tooling.tools.contract import (
+    ContractBaseClass,
+    ContractOnGnosisChain,
+)
+from prediction_market_agent_tooling.tools.web3_utils import (
+    parse_function_params,
+    wei_to_xdai,
+)
+from web3 import Web3
+from web3._utils.abi import map_abi_data
+from web3._utils.error_formatters_utils import (
+    SOLIDITY_ERROR_FUNC_SELECTOR,
+    raise_contract_logic_error_on_revert,
+)
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from web3.exceptions import ContractLogicError
+
+# Multicall3 is deployed on the same address on most of the chains, including Gnosis Chain, see https://www.multicall3.com.
+MULTICALL3_ADDRESS = Web3.to_checksum_address(
+    "0xcA11bde05977b3631167028862bE2a173976CA11"
+)
+# Only the functions used here.
+MULTICALL3_ABI = json.dumps(
+    [
+        {
+            "name": "aggregate3",
+            "type": "function",
+            "stateMutability": "payable",
+            "inputs": [
+                {
+                    "name": "calls",
+                    "type": "tuple[]",
+                    "components": [
+                        {"name": "target", "type": "address"},
+                        {"name": "allowFailure", "type": "bool"},
+                        {"name": "callData", "type": "bytes"},
+                    ],
+                }
+            ],
+            "outputs": [
+                {
+                    "name": "returnData",
+                    "type": "tuple[]",
+                    "components": [
+                        {"name": "success", "type": "bool"},
+                        {"name": "returnData", "type": "bytes"},
+                    ],
+                }
+            ],
+        },
+        {
+            "name": "getEthBalance",
+            "type": "function",
+            "stateMutability": "view",
+            "inputs": [{"name": "addr", "type": "address"}],
+            "outputs": [{"name": "balance", "type": "uint256"}],
+        },
+    ]
+)
+# Keep the requests well under the gas limit of `eth_call`.
+MAX_CALLS_PER_REQUEST = 500
+
+
+class Multicall3Contract(ContractOnGnosisChain):
+    abi: ABI = ABI(MULTICALL3_ABI)
+    address: ChecksumAddress = MULTICALL3_ADDRESS
+
+
+class _PendingCall(t.NamedTuple):
+    target: ChecksumAddress
+    call_data: HexBytes
+    output_types: list[str]
+    future: Future[t.Any]
+
+
+class MulticallBatch:
+    """
+    Collects read calls and executes them together in a single Multicall3
+    request, instead of a request per call:
+
+        with MulticallBatch() as batch:
+            wxdai = batch.call(WrappedxDaiContract(), "balanceOf", [address])
+            xdai = batch.get_eth_balance(address)
+        print(wxdai.result(), xdai.result())
+
+    Results are the same as of `ContractBaseClass.call`, and a reverted call
+    sets the same `ContractLogicError`, but only on its own future.
+    """
+
+    def __init__(self, web3: Web3 | None = None) -> None:
+        self.web3 = web3 or Multicall3Contract.get_web3()
+        self.multicall = self.web3.eth.contract(
+            address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI
+        )
+        self._calls: list[_PendingCall] = []
+
+    def __enter__(self) -> "MulticallBatch":
+        return self
+
+    def __exit__(self, exc_type: t.Any, exc_value: t.Any, traceback: t.Any) -> None:
+        if exc_type is None:
+            self.execute()
+
+    def call(
+        self,
+        contract: ContractBaseClass,
+        function_name: str,
+        function_params: t.Optional[list[t.Any] | dict[str, t.Any]] = None,
+    ) -> Future[t.Any]:
+        web3_contract = self.web3.eth.contract(
+            address=contract.address, abi=contract.abi
+        )
+        return self._add_call(
+            web3_contract, contract.address, function_name, function_params
+        )
+
+    def get_eth_balance(self, address: ChecksumAddress) -> Future[Wei]:
+        """
+        Native balance (xDai on Gnosis Chain), as Multicall3 can read it too.
+        """
+        return self._add_call(
+            self.multicall, MULTICALL3_ADDRESS, "getEthBalance", [address]
+        )
+
+    def _add_call(
+        self,
+        web3_contract: t.Any,
+        target: ChecksumAddress,
+        function_name: str,
+        function_params: t.Optional[list[t.Any] | dict[str, t.Any]],
+    ) -> Future[t.Any]:
+        function_abi = web3_contract.get_function_by_name(function_name).abi
+        future: Future[t.Any] = Future()
+        self._calls.append(
+            _PendingCall(
+                target=target,
+                call_data=HexBytes(
+                    web3_contract.encodeABI(
+                        fn_name=function_name,
+                        args=parse_function_params(function_params),
+                    )
+                ),
+                output_types=[collapse_if_tuple(o) for o in function_abi["outputs"]],
+                future=future,
+            )
+        )
+        return future
+
+    def execute(self) -> None:
+        calls, self._calls = self._calls, []
+        error: Exception | None = None
+        for i in range(0, len(calls), MAX_CALLS_PER_REQUEST):
+            chunk = calls[i : i + MAX_CALLS_PER_REQUEST]
+            try:
+                self._execute_chunk(chunk)
+            except Exception as e:
+                # Resolve the futures of all the chunks, before raising.
+                for c in chunk:
+                    c.future.set_exception(e)
+                error = error or e
+        if error is not None:
+            raise error
+
+    def _execute_chunk(self, calls: list[_PendingCall]) -> None:
+        results = self.multicall.functions.aggregate3(
+            [(c.target, True, c.call_data) for c in calls]
+        ).call()
+        for c, (success, return_data) in zip(calls, results):
+            if not success:
+                c.future.set_exception(self._revert_error(return_data))
+                continue
+            try:
+                decoded = self.web3.codec.decode(c.output_types, return_data)
+            except Exception as e:
+                # E.g. the target isn't a contract, so it returned nothing.
+                c.future.set_exception(e)
+                continue
+            # As web3 does for direct calls, e.g. checksums the addresses.
+            normalized = map_abi_data(BASE_RETURN_NORMALIZERS, c.output_types, decoded)
+            c.future.set_result(
+                normalized[0] if len(normalized) == 1 else list(normalized)
+            )
+
+    def _revert_error(self, return_data: bytes) -> Exception:
+        data = Web3.to_hex(return_data)
+        try:
+            if data.startswith(SOLIDITY_ERROR_FUNC_SELECTOR):
+                (reason,) = self.web3.codec.decode(["string"], return_data[4:])
+                return ContractLogicError(f"execution reverted: {reason}", data=data)
+            # Handles panics, custom errors and reverts without data the same as web3 does for direct calls.
+            raise_contract_logic_error_on_revert(
+                {"error": {"message": "execution reverted", "data": data}}  # type: ignore[typeddict-item]
+            )
+        except Exception as e:
+            return e
+        return ContractLogicError("execution reverted", data=data)
+
+
+class MulticallMicroBatcher:
+    """
+    Blocking calls made concurrently, e.g. from the threads of the parallel
+    engine, are executed in a single Multicall3 request. A call made while no
+    other is in flight is sent directly, without waiting for the `window`.
+    """
+
+    def __init__(
+        self,
+        window: timedelta = timedelta(milliseconds=10),
+        web3: Web3 | None = None,
+    ) -> None:
+        self.window = window
+        self.web3 = web3 or Multicall3Contract.get_web3()
+        self._lock = threading.Lock()
+        self._batch: MulticallBatch | None = None
+        self._n_in_flight = 0
+
+    def call(
+        self,
+        contract: ContractBaseClass,
+        function_name: str,
+        function_params: t.Optional[list[t.Any] | dict[str, t.Any]] = None,
+    ) -> t.Any:
+        with self._lock:
+            is_concurrent = self._n_in_flight > 0
+            self._n_in_flight += 1
+            if is_concurrent:
+                if self._batch is None:
+                    self._batch = MulticallBatch(web3=self.web3)
+                    threading.Timer(self.window.total_seconds(), self._flush).start()
+                future = self._batch.call(contract, function_name, function_params)
+        try:
+            if not is_concurrent:
+                return contract.call(function_name, function_params, web3=self.web3)
+            return future.result()
+        finally:
+            with self._lock:
+                self._n_in_flight -= 1
+
+    def _flush(self) -> None:
+        with self._lock:
+            batch, self._batch = self._batch, None
+        if batch is not None:
+            try:
+                batch.execute()
+            except Exception:
+                # Already set on the futures of the waiting callers.
+                pass
+
+
+@cache
+def get_multicall_micro_batcher() -> MulticallMicroBatcher:
+    return MulticallMicroBatcher()
+
+
+def get_balances(address: ChecksumAddress, web3: Web3 | None = None) -> Balances:
+    """
+    Same as PMAT's `get_balances`, but in a single request.
+    """
+    with MulticallBatch(web3=web3) as batch:
+        xdai = batch.get_eth_balance(address)
+        wxdai = batch.call(WrappedxDaiContract(), "balanceOf", [address])
+    return Balances(
+        xdai=wei_to_xdai(Wei(xdai.result())),
+        wxdai=wei_to_xdai(Wei(wxdai.result())),
+    )
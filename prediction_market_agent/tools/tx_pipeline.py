@@ -0,0 +1,322 @@
+import threading
+import time
+import typing as t
+
+from prediction_market_agent_tooling.config import APIKeys
+from prediction_market_agent_tooling.gtypes import (
+    ChecksumAddress,
+    HexBytes,
+    Nonce,
+    TxParams,
+    Wei,
+)
+from prediction_market_agent_tooling.loggers import logger
+from prediction_market_agent_tooling.tools.contract import ContractBaseClass
+from prediction_market_agent_tooling.tools.web3_utils import parse_function_params
+from pydantic import BaseModel
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+
+def build_transaction(
+    web3: Web3,
+    contract: ContractBaseClass,
+    from_address: ChecksumAddress,
+    function_name: str,
+    function_params: t.Optional[list[t.Any] | dict[str, t.Any]],
+    tx_params: TxParams,
+) -> TxParams:
+    """
+    Same as PMAT's `prepare_tx`, but the given nonce is kept as it is. PMAT's
+    treats nonce 0 as not set, and asks the node for the account's nonce
+    again, which can differ from the allocated one, e.g. if something else
+    sent a transaction meanwhile.
+    """
+    web3_contract = web3.eth.contract(address=contract.address, abi=contract.abi)
+    function_call = web3_contract.functions[function_name](
+        *parse_function_params(function_params)
+    )
+    tx_params_with_sender = TxParams(**tx_params)
+    tx_params_with_sender["from"] = from_address
+    return function_call.build_transaction(tx_params_with_sender)
+
+
+class NonceManager:
+    """
+    Hands out consecutive nonces of an account, without asking the node for
+    each of them, so that transactions can be sent before the previous ones
+    are mined.
+    """
+
+    def __init__(self, web3: Web3, address: ChecksumAddress) -> None:
+        self.web3 = web3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next_nonce: Nonce | None = None
+
+    def allocate(self) -> Nonce:
+        with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = self.web3.eth.get_transaction_count(
+                    self.address, "pending"
+                )
+            nonce = self._next_nonce
+            self._next_nonce = Nonce(nonce + 1)
+            return nonce
+
+    def release(self, nonce: Nonce) -> None:
+        """
+        Gives back a nonce that wasn't used, e.g. because the transaction
+        failed to be sent, so that it doesn't leave a gap.
+        """
+        with self._lock:
+            if self._next_nonce == nonce + 1:
+                self._next_nonce = nonce
+            else:
+                # Later nonces were handed out already, so ask the node again.
+                self._next_nonce = None
+
+    def resync(self) -> None:
+        with self._lock:
+            self._next_nonce = None
+
+
+class PendingTransaction(BaseModel):
+    label: str
+    nonce: Nonce
+    tx_hash: HexBytes
+    raw_transaction: HexBytes
+    sent_at: float
+    n_rebroadcasts: int = 0
+
+
+class TransactionResult(BaseModel):
+    label: str
+    tx_hash: HexBytes | None
+    error: str | None = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+class TransactionPipeline:
+    """
+    Sends independent transactions of an EOA one after another, without
+    waiting for each of them to be mined, and collects their receipts at the
+    end. Runs over many markets then take roughly a block time, instead of a
+    block time per market.
+
+    If a transaction gets stuck (e.g. dropped by the node), it's broadcasted
+    again, as all the later ones wait for its nonce. If it doesn't help, or the
+    blocking nonce isn't one of ours, all the pending transactions are failed,
+    the same as those not mined within `wait_timeout`.
+
+    With `dry_run`, transactions are only built, which simulates them on the
+    node, but nothing is sent.
+    """
+
+    def __init__(
+        self,
+        api_keys: APIKeys,
+        web3: Web3,
+        max_in_flight: int = 32,
+        receipt_timeout: int = 180,
+        poll_interval: float = 2.0,
+        max_rebroadcasts: int = 2,
+        wait_timeout: int | None = None,
+        dry_run: bool = False,
+    ) -> None:
+        if api_keys.SAFE_ADDRESS:
+            raise ValueError(
+                "Transactions of a Safe can't be pipelined, send them one by one."
+            )
+        self.api_keys = api_keys
+        self.web3 = web3
+        self.address = api_keys.bet_from_address
+        self.nonce_manager = NonceManager(web3=web3, address=self.address)
+        self.max_in_flight = max_in_flight
+        self.receipt_timeout = receipt_timeout
+        self.poll_interval = poll_interval
+        self.max_rebroadcasts = max_rebroadcasts
+        # By default, enough for the stuck transaction to be broadcasted again the maximum number of times.
+        self.wait_timeout = (
+            wait_timeout
+            if wait_timeout is not None
+            else receipt_timeout * (max_rebroadcasts + 2)
+        )
+        self.dry_run = dry_run
+        self._pending: list[PendingTransaction] = []
+        self._results: list[TransactionResult] = []
+
+    def submit(
+        self,
+        contract: ContractBaseClass,
+        function_name: str,
+        label: str,
+        function_params: t.Optional[list[t.Any] | dict[str, t.Any]] = None,
+        amount_wei: Wei | None = None,
+    ) -> None:
+        """
+        Sends the transaction without waiting for it to be mined. Errors are
+        reported in the results of `wait`.
+        """
+        if len(self._pending) >= self.max_in_flight:
+            self._poll_until(lambda: len(self._pending) < self.max_in_flight)
+
+        tx_params = TxParams()
+        if amount_wei is not None:
+            tx_params["value"] = amount_wei
+
+        if self.dry_run:
+            try:
+                # Building the transaction estimates its gas, which fails if it would revert.
+                build_transaction(
+                    web3=self.web3,
+                    contract=contract,
+                    from_address=self.address,
+                    function_name=function_name,
+                    function_params=function_params,
+                    tx_params=tx_params,
+                )
+            except Exception as e:
+                self._fail(label, tx_hash=None, error=str(e))
+            else:
+                self._results.append(TransactionResult(label=label, tx_hash=None))
+            return
+
+        # One retry, in case something else used our nonces meanwhile.
+        for attempt in range(2):
+            nonce = self.nonce_manager.allocate()
+            try:
+                tx = build_transaction(
+                    web3=self.web3,
+                    contract=contract,
+                    from_address=self.address,
+                    function_name=function_name,
+                    function_params=function_params,
+                    tx_params=TxParams(**tx_params, nonce=nonce),
+                )
+                signed_tx = self.web3.eth.account.sign_transaction(
+                    tx,
+                    private_key=self.api_keys.bet_from_private_key.get_secret_value(),
+                )
+            except Exception as e:
+                # Nothing was sent, so the nonce can be used by the next one.
+                self.nonce_manager.release(nonce)
+                self._fail(label, tx_hash=None, error=str(e))
+                return
+
+            try:
+                tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            except ValueError as e:
+                # The node responded with an error, so it didn't accept the transaction.
+                if "nonce too low" in str(e).lower() and attempt == 0:
+                    self.nonce_manager.resync()
+                    continue
+                self.nonce_manager.release(nonce)
+                self._fail(label, tx_hash=None, error=str(e))
+                return
+            except Exception as e:
+                # E.g. a timeout, the node could have accepted the transaction,
+                # so keep its nonce and wait for it as for any other. If it
+                # wasn't accepted, it's broadcasted again once it's stuck.
+                logger.warning(f"Sending {label} with {nonce=} failed: {e}")
+                tx_hash = HexBytes(signed_tx.hash)
+            break
+
+        logger.info(f"Sent {label} with {nonce=}, {tx_hash.hex()=}.")
+        self._pending.append(
+            PendingTransaction(
+                label=label,
+                nonce=nonce,
+                tx_hash=tx_hash,
+                raw_transaction=signed_tx.rawTransaction,
+                sent_at=time.monotonic(),
+            )
+        )
+
+    def wait(self) -> list[TransactionResult]:
+        """
+        Waits for all the sent transactions to be mined, and returns the
+        results of everything submitted since the last `wait`.
+        """
+        self._poll_until(lambda: not self._pending)
+        results, self._results = self._results, []
+        return results
+
+    def _poll_until(self, condition: t.Callable[[], bool]) -> None:
+        deadline = time.monotonic() + self.wait_timeout
+        while not condition():
+            self._poll()
+            if condition():
+                break
+            if time.monotonic() >= deadline:
+                self._fail_pending(f"Not mined in {self.wait_timeout} seconds.")
+                break
+            time.sleep(self.poll_interval)
+
+    def _poll(self) -> None:
+        # Every transaction with a lower nonce than this is mined, so a single
+        # request tells which receipts are ready.
+        mined_count = self.web3.eth.get_transaction_count(self.address, "latest")
+        still_pending: list[PendingTransaction] = []
+
+        for tx in self._pending:
+            if tx.nonce < mined_count:
+                self._collect_receipt(tx)
+            else:
+                still_pending.append(tx)
+        self._pending = still_pending
+        if not self._pending:
+            return
+
+        # Only the lowest pending nonce can be the one that blocks the others.
+        lowest = min(self._pending, key=lambda tx: tx.nonce)
+        if time.monotonic() - lowest.sent_at < self.receipt_timeout:
+            return
+        if lowest.nonce > mined_count:
+            # A nonce below ours isn't mined, e.g. a dropped transaction sent
+            # outside of the pipeline, which we can't broadcast again.
+            self._fail_pending(f"Not mined, blocked by nonce {mined_count}.")
+        elif lowest.n_rebroadcasts < self.max_rebroadcasts:
+            self._rebroadcast(lowest)
+        else:
+            self._fail_pending(f"Not mined, stuck at nonce {mined_count}.")
+
+    def _collect_receipt(self, tx: PendingTransaction) -> None:
+        try:
+            receipt = self.web3.eth.get_transaction_receipt(tx.tx_hash)
+        except TransactionNotFound:
+            self._fail(
+                tx.label,
+                tx_hash=tx.tx_hash,
+                error=f"Replaced by another transaction with nonce {tx.nonce}.",
+            )
+            return
+        if receipt["status"] != 1:
+            self._fail(tx.label, tx_hash=tx.tx_hash, error="Transaction reverted.")
+            return
+        self._results.append(TransactionResult(label=tx.label, tx_hash=tx.tx_hash))
+
+    def _rebroadcast(self, tx: PendingTransaction) -> None:
+        logger.warning(f"Broadcasting again {tx.label} stuck at nonce {tx.nonce}.")
+        tx.n_rebroadcasts += 1
+        tx.sent_at = time.monotonic()
+        try:
+            self.web3.eth.send_raw_transaction(tx.raw_transaction)
+        except Exception as e:
+            # E.g. `already known`, if the node still has it.
+            logger.warning(f"Broadcasting {tx.label} again failed: {e}")
+
+    def _fail_pending(self, error: str) -> None:
+        for tx in self._pending:
+            self._fail(tx.label, tx_hash=tx.tx_hash, error=error)
+        self._pending = []
+        self.nonce_manager.resync()
+
+    def _fail(self, label: str, tx_hash: HexBytes | None, error: str) -> None:
+        logger.error(f"Transaction {label} failed: {error}")
+        self._results.append(
+            TransactionResult(label=label, tx_hash=tx_hash, error=error)
+        )
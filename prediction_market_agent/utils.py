@@ -1,9 +1,12 @@
 import json
 import typing as t
+from datetime import datetime, timezone
 
+import numpy as np
 from prediction_market_agent_tooling.config import APIKeys as APIKeysBase
 from prediction_market_agent_tooling.loggers import logger
 from prediction_market_agent_tooling.tools.utils import (
+    DatetimeUTC,
     check_not_none,
     should_not_happen,
 )
@@ -210,3 +213,39 @@ def disable_crewai_telemetry() -> None:
     for attr in dir(Telemetry):
         if callable(getattr(Telemetry, attr)) and not attr.startswith("__"):
             setattr(Telemetry, attr, lambda *args, **kwargs: None)
+
+
+def trusted_datetime_utc(value: datetime) -> DatetimeUTC:
+    """
+    Fast conversion of a datetime loaded from our own database, where all of
+    them are stored in UTC (but some DBs, like SQLite, drop the timezone).
+    Unlike the validation of `DatetimeUTC`, it doesn't warn about the missing
+    timezone for every row.
+    """
+    if isinstance(value, DatetimeUTC):
+        return value
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return DatetimeUTC(
+        value.year,
+        value.month,
+        value.day,
+        value.hour,
+        value.minute,
+        value.second,
+        value.microsecond,
+    )
+
+
+def get_most_similar_indices(
+    vectors: t.Sequence[np.ndarray], query_vector: np.ndarray, k: int
+) -> list[int]:
+    """
+    Indices of the `k` vectors most similar to the query vector by cosine
+    similarity, the most similar first. Ties keep the vectors' order.
+    """
+    matrix = np.stack(vectors)
+    similarities = (matrix @ query_vector) / (
+        np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector) + 1e-12
+    )
+    return [int(i) for i in np.argsort(-similarities, kind="stable")[:k]]
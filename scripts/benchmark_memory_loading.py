@@ -0,0 +1,67 @@
+"""
+Micro-benchmark of loading long-term memories into chat messages, comparing
+the validated construction with the trusted path used for our own DB rows.
+
+python scripts/benchmark_memory_loading.py --n-memories 100000
+"""
+
+import json
+import time
+import typing as t
+from datetime import datetime, timedelta
+
+import typer
+
+from prediction_market_agent.agents.microchain_agent.memory import DatedChatMessage
+from prediction_market_agent.db.models import LongTermMemories
+
+
+def build_memories(n_memories: int) -> list[LongTermMemories]:
+    # Naive datetimes, as they are returned from SQLite.
+    start = datetime(2024, 1, 1)
+    return [
+        LongTermMemories(
+            id=i,
+            task_description="benchmark",
+            metadata_=json.dumps(
+                {
+                    "role": "assistant" if i % 2 else "user",
+                    "content": f"GetMarketProbability(market_id='0x{i:040x}')",
+                }
+            ),
+            datetime_=start + timedelta(seconds=i),
+        )
+        for i in range(n_memories)
+    ]
+
+
+def validated_from_long_term_memory(memory: LongTermMemories) -> DatedChatMessage:
+    metadata = json.loads(memory.metadata_ or "")
+    return DatedChatMessage(
+        content=metadata["content"],
+        role=metadata["role"],
+        datetime_=memory.datetime_,
+    )
+
+
+def measure(
+    name: str,
+    load: t.Callable[[LongTermMemories], DatedChatMessage],
+    memories: list[LongTermMemories],
+) -> list[DatedChatMessage]:
+    start = time.perf_counter()
+    messages = [load(m) for m in memories]
+    elapsed = time.perf_counter() - start
+    print(f"{name}: {len(memories) / elapsed:,.0f} rows/s ({elapsed:.2f}s)")
+    return messages
+
+
+def main(n_memories: int = 100_000) -> None:
+    memories = build_memories(n_memories)
+    validated = measure("validated", validated_from_long_term_memory, memories)
+    trusted = measure("trusted", DatedChatMessage.from_long_term_memory, memories)
+    assert validated == trusted, "Both paths must load the same messages."
+
+
+if __name__ == "__main__":
+    typer.run(main)
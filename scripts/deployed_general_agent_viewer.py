@@ -18,9 +18,6 @@ from prediction_market_agent.utils import patch_sqlite3  # isort:skip
 patch_sqlite3()
 
 
-from datetime import datetime
-
-import pandas as pd
 import plotly.express as px
 import streamlit as st
 from prediction_market_agent_tooling.gtypes import PrivateKey
@@ -45,6 +42,7 @@ from prediction_market_agent.agents.microchain_agent.prompts import (
     SystemPromptChoice,
 )
 from prediction_market_agent.agents.microchain_agent.utils import (
+    get_function_useage_from_histories,
     get_function_useage_from_history,
     get_total_asset_value,
 )
@@ -215,20 +213,14 @@ with tab1:
         x_label=usage_count_col_name,
     )
 with tab2:
-    session_start_times = [session.start_time for session in sessions]
-    session_function_use: dict[datetime, pd.DataFrame] = {}
-    for session in sessions:
-        session_function_use[session.start_time] = get_function_useage_from_history(
-            chat_history=session,
-            agent=agent,
-        )
-
-    # Concatenate the per-session DataFrames by date for displaying in a heatmap
-    heatmap_data = {}
-    for date, df in session_function_use.items():
-        date_str = date.strftime("%Y-%m-%d %H:%M:%S")
-        heatmap_data[date_str] = df[usage_count_col_name]
-    heatmap_df = pd.DataFrame(heatmap_data)
+    # Usage counts of all the sessions, as columns by date, for displaying in a heatmap
+    heatmap_df = get_function_useage_from_histories(
+        chat_histories={
+            session.start_time.strftime("%Y-%m-%d %H:%M:%S"): session
+            for session in sessions
+        },
+        agent=agent,
+    )
     heatmap_df.index.name = tool_name_col_name
     dates = heatmap_df.columns.tolist()
     tool_names = heatmap_df.index.tolist()
@@ -14,6 +14,16 @@ from prediction_market_agent.agents.microchain_agent.blockchain.code_interpreter
 from prediction_market_agent.agents.microchain_agent.blockchain.contract_class_converter import (
     ContractClassConverter,
 )
+from tests.utils import sqlite_db_cache
+
+
+@pytest.fixture(scope="session", autouse=True)
+def db_cache_in_sqlite(
+    tmp_path_factory: pytest.TempPathFactory,
+) -> Generator[None, None, None]:
+    # The contract's data and summaries are cached with `db_cache`, which needs a DB.
+    with sqlite_db_cache(tmp_path_factory.mktemp("db_cache") / "cache.db"):
+        yield
 
 
 def mock_summaries(function_names: list[str]) -> Summaries:
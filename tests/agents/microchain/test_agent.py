@@ -22,10 +22,18 @@ from prediction_market_agent.agents.microchain_agent.blockchain.contract_class_c
 from prediction_market_agent.agents.microchain_agent.blockchain.models import (
     AbiItemStateMutabilityEnum,
 )
+from prediction_market_agent.agents.microchain_agent.history_compaction import Messages
 from prediction_market_agent.agents.microchain_agent.market_functions import (
     GetMarketProbability,
     GetMarkets,
 )
+from prediction_market_agent.agents.microchain_agent.memory import DatedChatHistory
+from prediction_market_agent.agents.microchain_agent.microchain_agent import (
+    AgentHistorySaver,
+)
+from prediction_market_agent.db.long_term_memory_table_handler import (
+    LongTermMemoryTableHandler,
+)
 from prediction_market_agent.utils import APIKeys
 from tests.utils import RUN_PAID_TESTS
 
@@ -175,3 +183,76 @@ def test_run_error() -> None:
     agent.system_prompt = "Foo"  # Required but not used
     agent.run(iterations=1)
     assert context["callback_has_been_called"] is True
+
+
+def load_last_session_history(
+    long_term_memory: LongTermMemoryTableHandler,
+) -> Messages:
+    """
+    Rebuild the history of the last session persisted to the long-term memory.
+    """
+    chat_history = DatedChatHistory.from_long_term_memory(
+        long_term_memory=long_term_memory
+    )
+    session_ranges = chat_history.get_session_ranges()
+    last_session = chat_history.get_session(*session_ranges[-1])
+    return [
+        m.model_dump() for m in last_session.to_undated_chat_history().chat_messages
+    ]
+
+
+def test_history_saver() -> None:
+    class Sum(Function):
+        @property
+        def description(self) -> str:
+            return "Use this function to compute the sum of two numbers"
+
+        @property
+        def example_args(self) -> list[t.Any]:
+            return [2, 2]
+
+        def __call__(self, a: int, b: int) -> int:
+            return a + b
+
+    class DummyLLM(LLM):
+        def __call__(self, prompt: str | None, stop: str | None = None) -> str:
+            return "Sum(1, 2)"
+
+    def build_dummy_agent() -> Agent:
+        engine = Engine()
+        engine.register(Sum())
+        engine.help_called = True
+        agent = Agent(llm=DummyLLM(generator=None), engine=engine)
+        agent.system_prompt = "Foo"
+        return agent
+
+    long_term_memory = LongTermMemoryTableHandler(
+        task_description="test_history_saver", sqlalchemy_db_url="sqlite://"
+    )
+    agent = build_dummy_agent()
+    history_saver = AgentHistorySaver(
+        long_term_memory=long_term_memory,
+        initial_system_prompt="Foo",
+        flush_every_n_steps=2,
+    )
+    history_saver.register(agent)
+    agent.run(iterations=3)
+
+    # System prompt and the first two steps are flushed, the third is buffered.
+    assert len(long_term_memory.search()) == 5
+    history_saver.flush(agent)
+    assert load_last_session_history(long_term_memory) == agent.history
+
+    # Continue the persisted session with a new agent.
+    agent = build_dummy_agent()
+    agent.history = load_last_session_history(long_term_memory)
+    history_saver = AgentHistorySaver(
+        long_term_memory=long_term_memory,
+        initial_system_prompt="Foo",
+        n_saved_messages=len(agent.history),
+    )
+    history_saver.register(agent)
+    agent.run(iterations=1, resume=True)
+    history_saver.flush(agent)
+    assert load_last_session_history(long_term_memory) == agent.history
+    assert len(agent.history) == 9
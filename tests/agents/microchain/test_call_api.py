@@ -0,0 +1,22 @@
+import io
+
+import requests
+
+from prediction_market_agent.agents.microchain_agent.call_api import read_response_text
+
+
+def build_response(content: bytes) -> requests.Response:
+    response = requests.Response()
+    response.raw = io.BytesIO(content)
+    response.encoding = "utf-8"
+    return response
+
+
+def test_read_response_text() -> None:
+    assert read_response_text(build_response(b"hello"), max_bytes=10) == "hello"
+
+
+def test_read_response_text_truncated() -> None:
+    text = read_response_text(build_response(b"a" * 20_000), max_bytes=10_000)
+    assert text.startswith("a" * 10_000 + "\n")
+    assert "truncated after 10000 bytes" in text
@@ -1,9 +1,13 @@
+from unittest.mock import Mock, patch
+
 from prediction_market_agent.agents.microchain_agent.blockchain.code_interpreter import (
     CodeInterpreter,
+    extract_function_source,
 )
 from prediction_market_agent.agents.microchain_agent.blockchain.contract_class_converter import (
     ContractClassConverter,
 )
+from tests.agents.microchain.conftest import mock_summaries
 
 
 def test_generate_summaries(
@@ -17,3 +21,61 @@ def test_generate_summaries(
         function_names=[i.name for i in abi_items]
     )
     assert len(summaries.summaries) == len(abi_items)
+
+
+SOURCE_CODE = """
+contract WETH9 {
+    uint8  public decimals = 18;
+    mapping (address => uint)                       public  balanceOf;
+    function transfer(address dst, uint wad) public returns (bool) {
+        return transferFrom(msg.sender, dst, wad);
+    }
+    function transferFrom(address src, address dst, uint wad)
+        public
+        returns (bool)
+    {
+        if (balanceOf[src] < wad) { revert(); }
+        return true;
+    }
+    function totalSupply() public view returns (uint);
+}
+"""
+
+
+def test_extract_function_source() -> None:
+    assert (
+        extract_function_source(SOURCE_CODE, "decimals")
+        == "    uint8  public decimals = 18;"
+    )
+    assert (
+        extract_function_source(SOURCE_CODE, "balanceOf")
+        .strip()
+        .startswith("mapping (address => uint)")
+    )
+    assert extract_function_source(SOURCE_CODE, "transfer") == (
+        "    function transfer(address dst, uint wad) public returns (bool) {\n"
+        "        return transferFrom(msg.sender, dst, wad);\n"
+        "    }"
+    )
+    assert extract_function_source(SOURCE_CODE, "transferFrom").endswith(
+        "return true;\n    }"
+    )
+    assert (
+        extract_function_source(SOURCE_CODE, "totalSupply")
+        == "    function totalSupply() public view returns (uint);"
+    )
+    assert extract_function_source(SOURCE_CODE, "approve") == ""
+
+
+def test_summaries_are_cached() -> None:
+    with patch.object(CodeInterpreter, "build_chain"):
+        code_interpreter = CodeInterpreter(source_code=SOURCE_CODE)
+    code_interpreter.prompt_and_model = Mock()
+    code_interpreter.prompt_and_model.batch.return_value = [
+        mock_summaries(["decimals"])
+    ]
+
+    summaries = [code_interpreter.generate_summary(["decimals"]) for _ in range(2)]
+
+    assert summaries == [mock_summaries(["decimals"])] * 2
+    code_interpreter.prompt_and_model.batch.assert_called_once()
@@ -0,0 +1,73 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from prediction_market_agent.agents.microchain_agent.code_sandbox import (
+    Sandbox,
+    SandboxPool,
+)
+
+
+def test_sandbox_is_reset_and_keeps_venv(tmp_path: Path) -> None:
+    pool = SandboxPool(size=1, root_dir=tmp_path, preinstalled_packages=[])
+
+    with pool.acquire() as sandbox:
+        venv_exe = sandbox.venv_context.env_exe
+        (sandbox.work_dir / "leftover.txt").write_text("foo")
+
+    with pool.acquire() as sandbox:
+        assert list(sandbox.work_dir.iterdir()) == []
+        assert sandbox.venv_context.env_exe == venv_exe
+
+
+def test_pools_dont_share_work_dirs(tmp_path: Path) -> None:
+    pools = [
+        SandboxPool(size=1, root_dir=tmp_path, preinstalled_packages=[])
+        for _ in range(2)
+    ]
+    work_dirs = {pool.sandboxes[0].work_dir for pool in pools}
+    assert len(work_dirs) == 2
+
+    pools[0].close()
+    assert not pools[0].pool_dir.exists()
+    assert pools[1].pool_dir.exists()
+
+
+def test_ready_venv_is_reused_by_next_pool(tmp_path: Path) -> None:
+    pool = SandboxPool(size=1, root_dir=tmp_path, preinstalled_packages=[])
+    with pool.acquire() as sandbox:
+        venv_exe = sandbox.venv_context.env_exe
+    pool.close()
+
+    next_pool = SandboxPool(size=1, root_dir=tmp_path, preinstalled_packages=[])
+    with patch.object(Sandbox, "_create_venv") as create_venv:
+        with next_pool.acquire() as sandbox:
+            assert sandbox.venv_context.env_exe == venv_exe
+    create_venv.assert_not_called()
+
+
+def test_failed_warm_up_is_raised_on_acquire(tmp_path: Path) -> None:
+    pool = SandboxPool(
+        size=1, root_dir=tmp_path, preinstalled_packages=["surely-not-a-package-xyz"]
+    )
+    pool.warm_up().join()
+
+    with pytest.raises(RuntimeError, match="surely-not-a-package-xyz"):
+        with pool.acquire():
+            pass
+
+
+def test_failed_venv_is_not_reused(tmp_path: Path) -> None:
+    packages = ["surely-not-a-package-xyz"]
+    pool = SandboxPool(size=1, root_dir=tmp_path, preinstalled_packages=packages)
+    with pytest.raises(RuntimeError):
+        with pool.acquire():
+            pass
+
+    next_pool = SandboxPool(size=1, root_dir=tmp_path, preinstalled_packages=packages)
+    assert next_pool.sandboxes[0].venv_dir == pool.sandboxes[0].venv_dir
+    with patch.object(Sandbox, "_create_venv") as create_venv:
+        with next_pool.acquire():
+            pass
+    create_venv.assert_called_once()
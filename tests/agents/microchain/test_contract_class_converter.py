@@ -1,8 +1,33 @@
+import json
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
 import web3.constants
+from microchain import Agent, FunctionResult
+from prediction_market_agent_tooling.markets.omen.omen_contracts import (
+    WrappedxDaiContract,
+)
+from prediction_market_agent_tooling.tools.contract import ContractOnGnosisChain
+from web3 import Web3
 
 from prediction_market_agent.agents.microchain_agent.blockchain.contract_class_converter import (
     ContractClassConverter,
+    fetch_smart_contract_from_blockscout,
+)
+from prediction_market_agent.agents.microchain_agent.blockchain.models import (
+    AbiItemStateMutabilityEnum,
+)
+from prediction_market_agent.agents.microchain_agent.parallel_engine import (
+    ParallelReadOnlyEngine,
+    is_read_only,
 )
+from prediction_market_agent.tools.multicall import (
+    MulticallBatch,
+    MulticallMicroBatcher,
+)
+from prediction_market_agent.utils import APIKeys
+from tests.agents.microchain.conftest import PatcherManager
 
 
 def test_decimals(wxdai_contract_mocked_rag: ContractClassConverter) -> None:
@@ -33,3 +58,99 @@ def test_balance_of(wxdai_contract_mocked_rag: ContractClassConverter) -> None:
 def test_sdai(sdai_contract_mocked_rag: ContractClassConverter) -> None:
     classes = sdai_contract_mocked_rag.create_classes_from_smart_contract()
     assert classes
+
+
+def test_blockscout_data_is_cached() -> None:
+    # Not a real contract, so that it isn't in the cache already.
+    contract_address = Web3.to_checksum_address("0x" + "12" * 20)
+    with patch(
+        "prediction_market_agent.agents.microchain_agent.blockchain.contract_class_converter.requests.get"
+    ) as get:
+        get.return_value.json.return_value = {"abi": []}
+        data = [
+            fetch_smart_contract_from_blockscout(contract_address) for _ in range(2)
+        ]
+
+    assert data == [{"abi": []}] * 2
+    get.assert_called_once()
+
+
+def build_wxdai_converter_without_blockscout() -> ContractClassConverter:
+    wxdai = WrappedxDaiContract()
+    converter = ContractClassConverter(
+        contract_address=wxdai.address, contract_name=wxdai.__class__.__name__
+    )
+    converter._blockscout_data = {"abi": json.loads(wxdai.abi), "source_code": ""}
+    return converter
+
+
+def build_engine(
+    function_types_to_classes: dict[AbiItemStateMutabilityEnum | None, list[type]]
+) -> ParallelReadOnlyEngine:
+    engine = ParallelReadOnlyEngine()
+    for clz in function_types_to_classes[AbiItemStateMutabilityEnum.VIEW]:
+        engine.register(clz())
+    for clz in function_types_to_classes[AbiItemStateMutabilityEnum.PAYABLE]:
+        engine.register(clz(keys=APIKeys()))
+    engine.bind(Agent(llm=None, engine=engine))
+    return engine
+
+
+def test_only_view_functions_are_read_only(patcher_manager: PatcherManager) -> None:
+    converter = build_wxdai_converter_without_blockscout()
+    function_types_to_classes = converter.create_classes_from_smart_contract()
+    for state_mutability, classes in function_types_to_classes.items():
+        for clz in classes:
+            assert is_read_only(clz) == (
+                state_mutability == AbiItemStateMutabilityEnum.VIEW
+            )
+
+    engine = build_engine(function_types_to_classes)
+    result, output = engine.execute(
+        f"[{converter.build_class_name('decimals')}(), {converter.build_class_name('deposit')}()]"
+    )
+    assert result == FunctionResult.ERROR
+    assert "isn't read-only" in output
+
+
+def test_view_calls_are_batched_into_multicall(
+    patcher_manager: PatcherManager,
+) -> None:
+    converter = build_wxdai_converter_without_blockscout()
+    batcher = MulticallMicroBatcher(window=timedelta(milliseconds=500), web3=Web3())
+    multicall_chunks: list[int] = []
+    multicall_done = threading.Event()
+
+    def execute_chunk(batch: MulticallBatch, calls: list) -> None:  # type: ignore[type-arg]
+        multicall_chunks.append(len(calls))
+        for c in calls:
+            c.future.set_result(18)
+        multicall_done.set()
+
+    def direct_call(*args: object, **kwargs: object) -> int:
+        # Nothing else is in flight for the first call, so it's sent directly,
+        # hold it until the concurrent ones went out.
+        assert multicall_done.wait(timeout=10)
+        return 18
+
+    with patch(
+        "prediction_market_agent.agents.microchain_agent.blockchain.contract_class_converter.get_multicall_micro_batcher",
+        return_value=batcher,
+    ):
+        function_types_to_classes = converter.create_classes_from_smart_contract()
+
+    engine = build_engine(function_types_to_classes)
+    decimals = converter.build_class_name("decimals")
+    balance_of = converter.build_class_name("balanceOf")
+    assert decimals in engine.help
+
+    with patch.object(
+        MulticallBatch, "_execute_chunk", autospec=True, side_effect=execute_chunk
+    ), patch.object(ContractOnGnosisChain, "call", side_effect=direct_call):
+        result, output = engine.execute(
+            f"[{decimals}(), {decimals}(), {balance_of}('{web3.constants.ADDRESS_ZERO}')]"
+        )
+
+    assert result == FunctionResult.SUCCESS, output
+    assert all(line.endswith(" -> 18") for line in output.splitlines())
+    assert multicall_chunks == [2]
@@ -0,0 +1,118 @@
+import typing as t
+from functools import partial
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+from microchain import LLM, Agent, Engine, Function
+from prediction_market_agent_tooling.markets.markets import MarketType
+
+from prediction_market_agent.agents.microchain_agent import deploy
+from prediction_market_agent.agents.microchain_agent.deploy import (
+    DeployableMicrochainAgent,
+)
+from prediction_market_agent.db.agent_checkpoint_table_handler import (
+    AgentCheckpointTableHandler,
+)
+from prediction_market_agent.db.long_term_memory_table_handler import (
+    LongTermMemoryTableHandler,
+)
+from prediction_market_agent.db.prompt_table_handler import PromptTableHandler
+
+
+class Sum(Function):
+    @property
+    def description(self) -> str:
+        return "Use this function to compute the sum of two numbers"
+
+    @property
+    def example_args(self) -> list[t.Any]:
+        return [2, 2]
+
+    def __call__(self, a: int, b: int) -> int:
+        return a + b
+
+
+class FlakyLLM(LLM):
+    """
+    Replies with a call of `Sum`, but raises on the `fail_on_call`-th reply.
+    """
+
+    def __init__(self, fail_on_call: int | None) -> None:
+        super().__init__(generator=None)
+        self.fail_on_call = fail_on_call
+        self.n_calls = 0
+
+    def __call__(self, prompt: t.Any, stop: t.Any = None) -> str:
+        self.n_calls += 1
+        if self.n_calls == self.fail_on_call:
+            raise RuntimeError("The LLM is down.")
+        return "Sum(1, 2)"
+
+
+class DeployableTestAgent(DeployableMicrochainAgent):
+    n_iterations = 4
+    description = "Agent for testing of the deployment."
+
+
+def run_agent(llm: FlakyLLM, db_url: str) -> Agent:
+    agents = []
+
+    def build_agent(unformatted_system_prompt: str, **kwargs: t.Any) -> Agent:
+        engine = Engine()
+        engine.register(Sum())
+        engine.help_called = True
+        agent = Agent(llm=llm, engine=engine)
+        agent.system_prompt = "Foo"
+        agents.append(agent)
+        return agent
+
+    with patch.object(deploy, "build_agent", build_agent), patch.object(
+        deploy, "build_memory_embeddings", Mock()
+    ), patch.object(
+        deploy,
+        "LongTermMemoryTableHandler",
+        partial(LongTermMemoryTableHandler, sqlalchemy_db_url=db_url),
+    ), patch.object(
+        deploy,
+        "PromptTableHandler",
+        partial(PromptTableHandler, sqlalchemy_db_url=db_url),
+    ), patch.object(
+        deploy,
+        "AgentCheckpointTableHandler",
+        partial(AgentCheckpointTableHandler, sqlalchemy_db_url=db_url),
+    ):
+        DeployableTestAgent(enable_langfuse=False).run(MarketType.OMEN)
+    (agent,) = agents
+    return agent
+
+
+def test_failed_run_is_resumed(tmp_path: Path) -> None:
+    db_url = f"sqlite:///{tmp_path / 'test.db'}"
+    checkpoint_handler = AgentCheckpointTableHandler(
+        agent_id=DeployableTestAgent.task_description, sqlalchemy_db_url=db_url
+    )
+
+    with pytest.raises(RuntimeError, match="The LLM is down."):
+        run_agent(FlakyLLM(fail_on_call=3), db_url)
+
+    # The two completed iterations are kept, and the session isn't finished.
+    checkpoint = checkpoint_handler.get_unfinished_checkpoint()
+    assert checkpoint is not None
+    assert checkpoint.iteration == 2
+    history = checkpoint_handler.get_history(checkpoint)
+    assert history is not None and len(history) == 5
+
+    llm = FlakyLLM(fail_on_call=None)
+    agent = run_agent(llm, db_url)
+
+    # Only the remaining iterations are run.
+    assert llm.n_calls == 2
+    assert agent.history[:5] == history
+    assert len(agent.history) == 9
+    assert checkpoint_handler.get_unfinished_checkpoint() is None
+    long_term_memory = LongTermMemoryTableHandler(
+        task_description=DeployableTestAgent.task_description,
+        sqlalchemy_db_url=db_url,
+    )
+    assert len(long_term_memory.search()) == 9
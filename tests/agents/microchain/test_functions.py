@@ -1,11 +1,15 @@
+import json
 from typing import Generator
+from unittest.mock import Mock, patch
 
 import numpy as np
 import pytest
-from microchain import Engine
+from microchain import Agent, Engine
 from microchain.functions import Reasoning, Stop
 from prediction_market_agent_tooling.markets.agent_market import AgentMarket
 from prediction_market_agent_tooling.markets.markets import MarketType
+from prediction_market_agent_tooling.markets.omen.omen import OmenAgentMarket
+from web3 import Web3
 
 from prediction_market_agent.agents.microchain_agent.market_functions import (
     MARKET_FUNCTIONS,
@@ -13,25 +17,33 @@ from prediction_market_agent.agents.microchain_agent.market_functions import (
     BuyYes,
     GetBalance,
     GetKellyBet,
+    GetMarketProbabilities,
     GetMarketProbability,
     GetMarkets,
     PredictProbabilityForQuestion,
     SellNo,
     SellYes,
 )
+from prediction_market_agent.agents.microchain_agent.memory import ChatHistory
 from prediction_market_agent.agents.microchain_agent.memory_functions import (
     RememberPastActions,
 )
 from prediction_market_agent.agents.microchain_agent.utils import (
     get_balance,
     get_binary_markets,
+    get_function_useage_from_histories,
     get_no_outcome,
+    get_traded_token_amount_from_tx,
     get_yes_outcome,
 )
 from prediction_market_agent.db.long_term_memory_table_handler import (
     LongTermMemoryTableHandler,
 )
+from prediction_market_agent.db.memory_summary_table_handler import (
+    MemorySummaryTableHandler,
+)
 from prediction_market_agent.utils import DEFAULT_OPENAI_MODEL, APIKeys
+from tests.tools.test_multicall import mock_multicall_batch
 from tests.utils import RUN_PAID_TESTS
 
 
@@ -84,6 +96,69 @@ def test_engine_help(market_type: MarketType) -> None:
     print(engine.help)
 
 
+def test_get_function_useage_from_histories() -> None:
+    engine = Engine()
+    engine.register(Reasoning())
+    engine.register(Stop())
+    agent = Agent(llm=None, engine=engine)
+    sessions = {
+        "first": ChatHistory.from_list_of_dicts(
+            [
+                {"role": "system", "content": "Reasoning(reasoning='foo')"},
+                {"role": "assistant", "content": "Reasoning(reasoning='bar')"},
+                {"role": "user", "content": "The reasoning has been recorded"},
+                {"role": "assistant", "content": "Stop()"},
+            ]
+        ),
+        "second": ChatHistory.from_list_of_dicts(
+            [{"role": "assistant", "content": "UnknownFunction()"}]
+        ),
+    }
+    usage = get_function_useage_from_histories(chat_histories=sessions, agent=agent)
+    assert usage.to_dict() == {
+        "first": {"Reasoning": 2, "Stop": 1},
+        "second": {"Reasoning": 0, "Stop": 0},
+    }
+
+
+def test_get_traded_token_amount_from_tx_without_event() -> None:
+    market = Mock(spec=OmenAgentMarket, id="0x1")
+    events = market.get_contract.return_value.get_web3_contract.return_value.events
+    events.FPMMBuy.return_value.process_receipt.return_value = []
+
+    # The trade is done already, so it's not an error.
+    assert (
+        get_traded_token_amount_from_tx(
+            market=market, tx_hash="0x1", outcome="Yes", is_buy=True
+        )
+        is None
+    )
+
+
+@pytest.mark.parametrize("trade_function_class", [BuyYes, SellYes], ids=["buy", "sell"])
+def test_trade_with_unknown_token_amount(
+    trade_function_class: type[BuyYes] | type[SellYes],
+) -> None:
+    market = Mock(id="0x1")
+    market.get_token_balance.return_value.amount = 2.5
+    module = "prediction_market_agent.agents.microchain_agent.market_functions"
+    with patch(f"{module}.get_balance") as get_balance_, patch(
+        f"{module}.withdraw_wxdai_to_xdai_to_keep_balance"
+    ), patch(f"{module}.is_trade_receipt_supported", return_value=True), patch(
+        f"{module}.get_traded_token_amount_from_tx", return_value=None
+    ), patch.object(
+        OmenAgentMarket, "get_binary_market", return_value=market
+    ):
+        get_balance_.return_value.amount = 10
+        trade_function = trade_function_class(market_type=MarketType.OMEN, keys=Mock())
+        reply = trade_function("0x1", 1.0)
+
+    assert reply == (
+        "The trade of Yes outcome tokens of market with id: 0x1 went through, "
+        "but the traded token amount is unknown. You now hold 2.5 Yes outcome tokens."
+    )
+
+
 @pytest.mark.parametrize("market_type", [MarketType.OMEN])
 def test_get_probability(market_type: MarketType) -> None:
     market_id = "0x0020d13c89140b47e10db54cbd53852b90bc1391"
@@ -95,6 +170,52 @@ def test_get_probability(market_type: MarketType) -> None:
     assert market.is_resolved()  # Probability wont change after resolution
 
 
+@pytest.mark.parametrize("market_type", [MarketType.OMEN])
+def test_get_probabilities(market_type: MarketType) -> None:
+    resolved_market_id = "0x0020d13c89140b47e10db54cbd53852b90bc1391"
+    open_market_id = get_binary_markets(market_type=market_type)[0].id
+    missing_market_id = "0x0000000000000000000000000000000000000000"
+    get_market_probabilities = GetMarketProbabilities(
+        market_type=market_type, keys=APIKeys()
+    )
+    rows = get_market_probabilities(
+        json.dumps([resolved_market_id, open_market_id, missing_market_id])
+    ).splitlines()
+    assert len(rows) == 4  # Header and a row per market, in the given order
+    assert rows[1].startswith(f"{resolved_market_id} | 0.0000 |")
+    assert rows[2].startswith(open_market_id)
+    assert rows[3] == f"{missing_market_id} | not found"
+
+
+def test_get_probabilities_liquidity_in_xdai() -> None:
+    market_id = "0x" + "12" * 20
+    omen_market = Mock(
+        id=market_id,
+        current_p_yes=0.25,
+        close_time=None,
+        market_maker_contract_address_checksummed=Web3.to_checksum_address(market_id),
+    )
+    # The market maker's pool shares' supply, 2 xDai.
+    batch = mock_multicall_batch(
+        [(True, Web3().codec.encode(["uint256"], [2 * 10**18]))]
+    )
+
+    with patch(
+        "prediction_market_agent.agents.microchain_agent.utils.OmenSubgraphHandler"
+    ) as subgraph_handler, patch(
+        "prediction_market_agent.agents.microchain_agent.utils.MulticallBatch",
+        return_value=batch,
+    ):
+        subgraph_handler.return_value.get_omen_binary_markets.return_value = [
+            omen_market
+        ]
+        rows = GetMarketProbabilities(market_type=MarketType.OMEN, keys=APIKeys())(
+            json.dumps([market_id])
+        ).splitlines()
+
+    assert rows[1] == f"{market_id} | 0.2500 | 2.00 | -"
+
+
 @pytest.mark.skipif(not RUN_PAID_TESTS, reason="This test costs money to run.")
 @pytest.mark.parametrize("market_type", [MarketType.OMEN])
 def test_buy_sell_tokens(market_type: MarketType) -> None:
@@ -187,6 +308,16 @@ def test_remember_past_learnings(long_term_memory: LongTermMemoryTableHandler) -
     remember_past_learnings = RememberPastActions(
         long_term_memory=long_term_memory,
         model=DEFAULT_OPENAI_MODEL,
+        memory_summary=MemorySummaryTableHandler(
+            task_description=long_term_memory.task_description,
+            sqlalchemy_db_url="sqlite://",
+        ),
+    )
+    print(remember_past_learnings())
+
+    # Only the new memory is summarized, and merged with the previous summary.
+    long_term_memory.save_history(
+        history=[{"role": "user", "content": "I went to the park and saw a fox."}]
     )
     print(remember_past_learnings())
 
@@ -0,0 +1,97 @@
+from prediction_market_agent_tooling.tools.utils import should_not_happen
+
+from prediction_market_agent.agents.microchain_agent.history_compaction import (
+    SUMMARY_MESSAGE_HEADER,
+    HistoryCompactor,
+    Messages,
+)
+
+
+def count_words(messages: Messages) -> int:
+    return sum(len(str(m["content"]).split()) for m in messages)
+
+
+class DummyHistoryCompactor(HistoryCompactor):
+    def __init__(self, max_tokens: int) -> None:
+        super().__init__(
+            count_tokens=count_words,
+            max_tokens=max_tokens,
+            generator=lambda messages: should_not_happen(),
+            min_recent_messages=2,
+        )
+        self.summarized_messages: list[Messages] = []
+
+    def summarize(self, previous_summary: str | None, messages: Messages) -> str:
+        self.summarized_messages.append(messages)
+        return f"summary of {sum(len(m) for m in self.summarized_messages)}"
+
+
+def build_history(n_iterations: int) -> Messages:
+    history: Messages = [
+        dict(role="system", content="system prompt"),
+        dict(role="user", content="goal prompt"),
+    ]
+    for i in range(n_iterations):
+        history.append(dict(role="assistant", content=f"Call({i})"))
+        history.append(dict(role="user", content=f"result {i}"))
+    return history
+
+
+def test_history_within_budget_is_unchanged() -> None:
+    compactor = DummyHistoryCompactor(max_tokens=100)
+    history = build_history(n_iterations=3)
+    assert compactor(history) == history
+    assert compactor.summarized_messages == []
+
+
+def test_history_compaction() -> None:
+    compactor = DummyHistoryCompactor(max_tokens=25)
+    history = build_history(n_iterations=8)
+    compacted = compactor(history)
+
+    # Pinned prompts are kept verbatim, followed by the summary and the most
+    # recent messages, starting at a function call.
+    assert compacted[:2] == history[:2]
+    assert compacted[2]["content"].startswith(SUMMARY_MESSAGE_HEADER)
+    assert compacted[3:] == history[-len(compacted[3:]) :]
+    assert compacted[3]["role"] == "assistant"
+    assert count_words(compacted) <= 25
+    n_summarizations = len(compactor.summarized_messages)
+    assert n_summarizations >= 1
+
+    # Next iterations only summarize the newly aged out messages.
+    history += build_history(n_iterations=10)[-4:]
+    compacted = compactor(history)
+    assert len(compactor.summarized_messages) == n_summarizations + 1
+    assert count_words(compacted) <= 25
+
+    # Together, the summarized messages and the window make up the history.
+    summarized = sum(compactor.summarized_messages, [])
+    assert history[:2] + summarized + compacted[3:] == history
+
+
+def test_history_compaction_resets_with_history() -> None:
+    compactor = DummyHistoryCompactor(max_tokens=25)
+    compactor(build_history(n_iterations=8))
+    assert compactor.summary is not None
+
+    history = build_history(n_iterations=1)
+    assert compactor(history) == history
+    assert compactor.summary is None
+
+
+def test_summary_is_written_by_generator() -> None:
+    prompts: list[Messages] = []
+
+    def generator(messages: Messages) -> str:
+        prompts.append(messages)
+        return "summary"
+
+    compactor = HistoryCompactor(
+        count_tokens=count_words, max_tokens=25, generator=generator
+    )
+    compactor(build_history(n_iterations=8))
+
+    assert compactor.summary == "summary"
+    (prompt,) = prompts[0]
+    assert "Call(0)" in prompt["content"]
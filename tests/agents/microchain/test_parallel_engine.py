@@ -0,0 +1,76 @@
+import typing as t
+
+from microchain import Agent, Function, FunctionResult
+
+from prediction_market_agent.agents.microchain_agent.parallel_engine import (
+    ParallelReadOnlyEngine,
+)
+
+
+class Square(Function):
+    is_read_only = True
+
+    @property
+    def description(self) -> str:
+        return "Use this function to compute the square of a number"
+
+    @property
+    def example_args(self) -> list[t.Any]:
+        return [2]
+
+    def __call__(self, a: int) -> int:
+        return a * a
+
+
+class Store(Function):
+    @property
+    def description(self) -> str:
+        return "Use this function to store a number"
+
+    @property
+    def example_args(self) -> list[t.Any]:
+        return [2]
+
+    def __call__(self, a: int) -> str:
+        return "stored"
+
+
+def build_engine() -> ParallelReadOnlyEngine:
+    engine = ParallelReadOnlyEngine()
+    engine.register(Square())
+    engine.register(Store())
+    engine.bind(Agent(llm=None, engine=engine))
+    assert "Square" in engine.help
+    return engine
+
+
+def test_parallel_engine_single_call() -> None:
+    engine = build_engine()
+    assert engine.execute("Square(3)") == (FunctionResult.SUCCESS, "9")
+    assert engine.execute("Store(3)") == (FunctionResult.SUCCESS, "stored")
+
+
+def test_parallel_engine_batch() -> None:
+    engine = build_engine()
+    # The closing bracket is missing, as microchain cuts the reply after the last ')'.
+    result, output = engine.execute("[Square(2), Square(3), Square(a=4)")
+    assert result == FunctionResult.SUCCESS
+    assert output.splitlines() == [
+        "Square(2) -> 4",
+        "Square(3) -> 9",
+        "Square(a=4) -> 16",
+    ]
+
+
+def test_parallel_engine_batch_with_mutating_call() -> None:
+    engine = build_engine()
+    result, output = engine.execute("[Square(2), Store(3)]")
+    assert result == FunctionResult.ERROR
+    assert "Store" in output
+
+
+def test_parallel_engine_batch_with_failing_call() -> None:
+    engine = build_engine()
+    result, output = engine.execute("[Square(2), Square(1, 2)]")
+    assert result == FunctionResult.SUCCESS
+    assert output.splitlines()[0] == "Square(2) -> 4"
@@ -0,0 +1,102 @@
+from microchain import Agent, Function, FunctionResult
+from microchain.functions import Reasoning
+
+from prediction_market_agent.agents.microchain_agent.tool_selection import (
+    FunctionSelector,
+    ListOtherFunctions,
+    ParallelReadOnlySelectiveHelpEngine,
+    SelectiveHelpEngine,
+)
+from tests.utils import KeywordEmbeddings
+
+
+def build_animal_function(animal: str) -> Function:
+    class AnimalFunction(Function):
+        @property
+        def name(self) -> str:
+            return f"Feed{animal.capitalize()}"
+
+        @property
+        def description(self) -> str:
+            return f"Use this function to feed the {animal}"
+
+        @property
+        def example_args(self) -> list[str]:
+            return []
+
+        def __call__(self) -> str:
+            return f"The {animal} is fed"
+
+    return AnimalFunction()
+
+
+def build_engine(engine: SelectiveHelpEngine) -> SelectiveHelpEngine:
+    for function in [
+        Reasoning(),
+        ListOtherFunctions(),
+        build_animal_function("dog"),
+        build_animal_function("cat"),
+        build_animal_function("bird"),
+    ]:
+        engine.register(function)
+    engine.bind(Agent(llm=None, engine=engine))
+    return engine
+
+
+def test_function_selector() -> None:
+    engine = build_engine(
+        SelectiveHelpEngine(
+            function_selector=FunctionSelector(embeddings=KeywordEmbeddings(), k=1)
+        )
+    )
+    engine.help_query = "Take care of the cat."
+    engine_help = engine.help
+    assert engine.functions_in_help == ["Reasoning", "ListOtherFunctions", "FeedCat"]
+    assert "FeedDog" not in engine_help
+
+    # The rest of the functions can be listed and called.
+    result, output = engine.execute("ListOtherFunctions()")
+    assert result == FunctionResult.SUCCESS
+    assert "FeedDog" in output and "FeedBird" in output and "FeedCat" not in output
+    assert engine.execute("FeedDog()") == (FunctionResult.SUCCESS, "The dog is fed")
+
+    engine.help_query = "Take care of the bird."
+    assert "FeedBird" in engine.help
+    assert engine.functions_in_help == ["Reasoning", "ListOtherFunctions", "FeedBird"]
+
+
+def test_help_is_embedded_once() -> None:
+    embeddings = KeywordEmbeddings()
+    engine = build_engine(
+        SelectiveHelpEngine(
+            function_selector=FunctionSelector(embeddings=embeddings, k=1)
+        )
+    )
+    engine.help_query = "Take care of the cat."
+    engine_help = engine.help
+    n_embedded = (embeddings.n_embedded_documents, embeddings.n_embedded_queries)
+
+    assert engine.help == engine_help
+    assert (
+        embeddings.n_embedded_documents,
+        embeddings.n_embedded_queries,
+    ) == n_embedded
+
+    # Only the new query is embedded.
+    engine.help_query = "Take care of the dog."
+    assert "FeedDog" in engine.help
+    assert embeddings.n_embedded_documents == n_embedded[0]
+    assert embeddings.n_embedded_queries == n_embedded[1] + 1
+
+
+def test_function_selector_with_parallel_engine() -> None:
+    engine = build_engine(
+        ParallelReadOnlySelectiveHelpEngine(
+            function_selector=FunctionSelector(embeddings=KeywordEmbeddings(), k=5)
+        )
+    )
+    # All the functions fit into the help.
+    assert "FeedDog" in engine.help
+    result, output = engine.execute("ListOtherFunctions()")
+    assert result == FunctionResult.SUCCESS
+    assert output == "All the functions are already described in your system prompt."
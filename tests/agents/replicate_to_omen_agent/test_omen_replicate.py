@@ -0,0 +1,84 @@
+import typing as t
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from prediction_market_agent_tooling.gtypes import xdai_type
+from prediction_market_agent_tooling.markets.markets import MarketType
+from prediction_market_agent_tooling.tools.utils import utcnow
+
+from prediction_market_agent.agents.replicate_to_omen_agent.omen_replicate import (
+    get_replication_verdict,
+    omen_replicate_from_tx,
+)
+from tests.utils import sqlite_db_cache
+
+MODULE = "prediction_market_agent.agents.replicate_to_omen_agent.omen_replicate"
+
+
+def mock_market(question: str) -> Mock:
+    market = Mock()
+    market.question = question
+    market.description = None
+    market.close_time = utcnow() + timedelta(days=10)
+    market.volume = 1.0
+    return market
+
+
+def run_sequentially(
+    items: list[t.Any], func: t.Callable[[t.Any], t.Any], max_workers: int
+) -> list[t.Any]:
+    # The mocks wouldn't apply in the worker processes of `par_map`.
+    return [func(item) for item in items]
+
+
+def test_gating_stops_after_n_to_replicate(tmp_path: Path) -> None:
+    markets = [mock_market(f"Will {i} happen?") for i in range(15)]
+    # Two of the first chunk of candidates are rejected.
+    invalid_questions = {markets[1].question, markets[3].question}
+    is_invalid = Mock(side_effect=lambda question: question in invalid_questions)
+
+    with sqlite_db_cache(tmp_path / "cache.db"), patch(
+        f"{MODULE}.OmenMarketSnapshotTableHandler"
+    ), patch(f"{MODULE}.get_binary_markets", return_value=markets), patch(
+        f"{MODULE}.CachedOmenSubgraphHandler"
+    ) as subgraph_handler, patch(
+        f"{MODULE}.par_map", side_effect=run_sequentially
+    ), patch(
+        f"{MODULE}.is_invalid", is_invalid
+    ), patch(
+        f"{MODULE}.is_predictable_binary", return_value=True
+    ), patch(
+        f"{MODULE}.infer_category", return_value="sports"
+    ):
+        subgraph_handler.return_value.get_omen_binary_markets_simple.return_value = [
+            Mock(category="sports")
+        ]
+        created_addresses = omen_replicate_from_tx(
+            api_keys=Mock(),
+            market_type=MarketType.MANIFOLD,
+            n_to_replicate=4,
+            initial_funds=xdai_type(1),
+            test=True,
+        )
+
+    assert len(created_addresses) == 4
+    # The first chunk passed only 3, so the second chunk was gated too, but not the third.
+    assert [c.args[0] for c in is_invalid.call_args_list] == [
+        m.question for m in markets[:10]
+    ]
+
+
+def test_rejected_verdict_is_cached(tmp_path: Path) -> None:
+    is_invalid = Mock(return_value=True)
+
+    with sqlite_db_cache(tmp_path / "cache.db"), patch(
+        f"{MODULE}.is_invalid", is_invalid
+    ):
+        verdicts = [
+            get_replication_verdict("Will it happen?", description=None)
+            for _ in range(2)
+        ]
+
+    assert [v.passed for v in verdicts] == [False, False]
+    is_invalid.assert_called_once_with("Will it happen?")
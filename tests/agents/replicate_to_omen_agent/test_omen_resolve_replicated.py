@@ -0,0 +1,136 @@
+import typing as t
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from prediction_market_agent_tooling.gtypes import HexBytes
+from prediction_market_agent_tooling.markets.data_models import Resolution
+
+from prediction_market_agent.agents.replicate_to_omen_agent.omen_resolve_replicated import (
+    find_resolution_of_replicated_market,
+    find_resolutions_of_replicated_markets,
+    get_responses_by_question_id,
+)
+from tests.utils import sqlite_db_cache
+
+MODULE = (
+    "prediction_market_agent.agents.replicate_to_omen_agent.omen_resolve_replicated"
+)
+
+
+def mock_response(question_id: HexBytes) -> Mock:
+    response = Mock()
+    response.question.questionId = question_id
+    return response
+
+
+def test_get_responses_by_question_id() -> None:
+    question_a, question_b, question_c = (
+        HexBytes("0x0a"),
+        HexBytes("0x0b"),
+        HexBytes("0x0c"),
+    )
+    responses = [
+        mock_response(question_a),
+        mock_response(question_b),
+        mock_response(question_a),
+    ]
+    subgraph_handler = Mock()
+    subgraph_handler.get_responses.return_value = responses
+
+    with patch(
+        f"{MODULE}.OmenSubgraphHandler",
+        return_value=subgraph_handler,
+    ):
+        responses_by_question_id = get_responses_by_question_id(
+            [question_a, question_b, question_c]
+        )
+
+    subgraph_handler.get_responses.assert_called_once_with(
+        limit=None, question_id_in=[question_a, question_b, question_c]
+    )
+    assert responses_by_question_id[question_a] == [responses[0], responses[2]]
+    assert responses_by_question_id[question_b] == [responses[1]]
+    assert responses_by_question_id[question_c] == []
+
+
+def test_get_responses_by_question_id_in_batches() -> None:
+    question_ids = [HexBytes(bytes([i])) for i in range(5)]
+    subgraph_handler = Mock()
+    subgraph_handler.get_responses.side_effect = lambda limit, question_id_in: [
+        mock_response(question_id) for question_id in question_id_in
+    ]
+
+    with patch(f"{MODULE}.OmenSubgraphHandler", return_value=subgraph_handler):
+        responses_by_question_id = get_responses_by_question_id(
+            question_ids, batch_size=2
+        )
+
+    assert [
+        c.kwargs["question_id_in"]
+        for c in subgraph_handler.get_responses.call_args_list
+    ] == [question_ids[0:2], question_ids[2:4], question_ids[4:]]
+    assert all(len(responses_by_question_id[q]) == 1 for q in question_ids)
+
+
+def test_get_responses_by_question_id_without_questions() -> None:
+    with patch(
+        f"{MODULE}.OmenSubgraphHandler",
+    ) as subgraph_handler:
+        assert get_responses_by_question_id([]) == {}
+    subgraph_handler.assert_not_called()
+
+
+def mock_market(question_id: HexBytes) -> Mock:
+    market = Mock()
+    market.question.id = question_id
+    market.question_title = f"Question {question_id.hex()}?"
+    return market
+
+
+def run_sequentially(
+    items: list[t.Any], func: t.Callable[[t.Any], t.Any], max_workers: int
+) -> t.Iterator[t.Any]:
+    # The mocks wouldn't apply in the worker processes of `par_generator`.
+    return map(func, items)
+
+
+def test_failed_resolution_lookup_is_left_out(tmp_path: Path) -> None:
+    failing_market = mock_market(HexBytes("0x0a"))
+    resolved_market = mock_market(HexBytes("0x0b"))
+
+    def find_resolution_on_other_markets(market: Mock) -> Resolution:
+        if market is failing_market:
+            raise ValueError("Manifold is down.")
+        return Resolution.YES
+
+    with sqlite_db_cache(tmp_path / "cache.db"), patch(
+        f"{MODULE}.par_generator", side_effect=run_sequentially
+    ), patch(f"{MODULE}.is_invalid", return_value=False), patch(
+        f"{MODULE}.find_resolution_on_other_markets",
+        side_effect=find_resolution_on_other_markets,
+    ):
+        markets_with_resolutions = find_resolutions_of_replicated_markets(
+            [failing_market, resolved_market]
+        )
+
+    # Not returned as a market without a resolution, which would be answered as invalid.
+    assert markets_with_resolutions == [(resolved_market, Resolution.YES)]
+
+
+def test_only_found_resolutions_are_cached(tmp_path: Path) -> None:
+    market = mock_market(HexBytes("0x0a"))
+    find_resolution_on_other_markets = Mock(side_effect=[None, Resolution.NO])
+
+    with sqlite_db_cache(tmp_path / "cache.db"), patch(
+        f"{MODULE}.is_invalid", return_value=False
+    ), patch(
+        f"{MODULE}.find_resolution_on_other_markets",
+        find_resolution_on_other_markets,
+    ):
+        assert find_resolution_of_replicated_market(market) == (market, None)
+        # The missing resolution wasn't cached, so it's looked up again.
+        assert find_resolution_of_replicated_market(market) == (market, Resolution.NO)
+        # But the found one is.
+        assert find_resolution_of_replicated_market(market) == (market, Resolution.NO)
+
+    assert find_resolution_on_other_markets.call_count == 2
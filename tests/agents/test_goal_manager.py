@@ -1,6 +1,11 @@
 import pytest
 
-from prediction_market_agent.agents.goal_manager import EvaluatedGoal, Goal, GoalManager
+from prediction_market_agent.agents.goal_manager import (
+    EvaluatedGoal,
+    Goal,
+    GoalManager,
+    build_evaluation_trace,
+)
 from prediction_market_agent.agents.microchain_agent.memory import (
     ChatHistory,
     ChatMessage,
@@ -157,6 +162,59 @@ def test_get_chat_history_after_goal_prompt() -> None:
     ) == ChatHistory(chat_messages=[assistant_message])
 
 
+def test_get_chat_history_after_goal_prompt_by_index() -> None:
+    goal = Goal(goal="Foo", motivation="Bar", completion_criteria="Baz")
+    assistant_message = ChatMessage(role="assistant", content="The answer is 42.")
+    chat_history = ChatHistory(
+        chat_messages=[
+            ChatMessage(role="system", content="You are a helpful assistant."),
+            ChatMessage(role="user", content=goal.to_prompt()),
+            assistant_message,
+        ]
+    )
+    for goal_prompt_index in [1, 0, 5]:
+        # Wrong index falls back to the search.
+        assert GoalManager.get_chat_history_after_goal_prompt(
+            goal=goal, chat_history=chat_history, goal_prompt_index=goal_prompt_index
+        ) == ChatHistory(chat_messages=[assistant_message])
+
+
+def test_build_evaluation_trace() -> None:
+    def count_words(text: str) -> int:
+        return len(text.split())
+
+    chat_history = ChatHistory.from_list_of_dicts(
+        [
+            {"role": "assistant", "content": "GetMarkets()"},
+            {"role": "user", "content": " ".join(["market"] * 1000)},
+            {"role": "assistant", "content": "Reasoning(reasoning='Buy it.')"},
+            {"role": "user", "content": "The reasoning has been recorded"},
+            {"role": "assistant", "content": "BuyYes(market_id='0x1', amount=1)"},
+            {"role": "user", "content": "Bought 1 tokens."},
+        ]
+    )
+    trace = build_evaluation_trace(
+        chat_history=chat_history, count_tokens=count_words, max_tokens=10_000
+    )
+    assert trace.count("Call: ") == 3
+    assert count_words(trace) > 1000
+
+    # The large raw output is shortened first.
+    trace = build_evaluation_trace(
+        chat_history=chat_history, count_tokens=count_words, max_tokens=100
+    )
+    assert "characters omitted" in trace
+    assert "Reasoning(reasoning='Buy it.')" in trace
+    assert count_words(trace) <= 100
+
+    # Then the oldest steps are omitted.
+    trace = build_evaluation_trace(
+        chat_history=chat_history, count_tokens=count_words, max_tokens=10
+    )
+    assert "GetMarkets()" not in trace
+    assert "BuyYes(market_id='0x1', amount=1)" in trace
+
+
 def test_get_chat_history_after_goal_prompt_error() -> None:
     goal = Goal(goal="Foo", motivation="Bar", completion_criteria="Baz")
     chat_history = ChatHistory(
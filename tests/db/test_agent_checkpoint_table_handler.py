@@ -0,0 +1,115 @@
+from datetime import timedelta
+from typing import Generator
+
+import pytest
+from prediction_market_agent_tooling.tools.utils import utcnow
+
+from prediction_market_agent.db.agent_checkpoint_table_handler import (
+    AgentCheckpointTableHandler,
+)
+from prediction_market_agent.db.models import AgentCheckpointModel
+
+SQLITE_DB_URL = "sqlite://"
+TEST_AGENT_ID = "test_agent_id"
+
+
+@pytest.fixture(scope="function")
+def memory_checkpoint_handler() -> Generator[AgentCheckpointTableHandler, None, None]:
+    """Creates a in-memory SQLite DB for testing"""
+    checkpoint_handler = AgentCheckpointTableHandler(
+        sqlalchemy_db_url=SQLITE_DB_URL, agent_id=TEST_AGENT_ID
+    )
+    yield checkpoint_handler
+
+
+def build_checkpoint(
+    iteration: int,
+    is_finished: bool = False,
+    id: int | None = None,
+    n_history_messages: int = 0,
+) -> AgentCheckpointModel:
+    return AgentCheckpointModel(
+        id=id,
+        agent_id=TEST_AGENT_ID,
+        n_history_messages=n_history_messages,
+        initial_system_prompt="foo",
+        system_prompt="bar",
+        iteration=iteration,
+        n_saved_history_messages=0,
+        prompt_tokens=0,
+        completion_tokens=0,
+        is_finished=is_finished,
+        datetime_=utcnow(),
+    )
+
+
+def test_save_checkpoint(
+    memory_checkpoint_handler: AgentCheckpointTableHandler,
+) -> None:
+    assert memory_checkpoint_handler.get_latest_checkpoint() is None
+
+    checkpoint = memory_checkpoint_handler.save_checkpoint(build_checkpoint(1))
+    assert checkpoint.id is not None
+
+    # Saving with the same id overwrites the session's checkpoint.
+    memory_checkpoint_handler.save_checkpoint(build_checkpoint(2, id=checkpoint.id))
+    assert len(memory_checkpoint_handler.sql_handler.get_all()) == 1
+    unfinished = memory_checkpoint_handler.get_unfinished_checkpoint()
+    assert unfinished is not None
+    assert unfinished.iteration == 2
+
+    memory_checkpoint_handler.save_checkpoint(
+        build_checkpoint(3, is_finished=True, id=checkpoint.id)
+    )
+    assert memory_checkpoint_handler.get_unfinished_checkpoint() is None
+
+    # A new session gets its own checkpoint.
+    memory_checkpoint_handler.save_checkpoint(build_checkpoint(1))
+    assert len(memory_checkpoint_handler.sql_handler.get_all()) == 2
+    unfinished = memory_checkpoint_handler.get_unfinished_checkpoint()
+    assert unfinished is not None
+    assert unfinished.iteration == 1
+
+
+def test_checkpoint_history_is_appended(
+    memory_checkpoint_handler: AgentCheckpointTableHandler,
+) -> None:
+    history = [dict(role="system", content="foo"), dict(role="user", content="bar")]
+    checkpoint = memory_checkpoint_handler.save_checkpoint(
+        build_checkpoint(1, n_history_messages=2), new_messages=history
+    )
+    assert memory_checkpoint_handler.get_history(checkpoint) == history
+
+    history.append(dict(role="assistant", content="baz"))
+    checkpoint = memory_checkpoint_handler.save_checkpoint(
+        build_checkpoint(2, id=checkpoint.id, n_history_messages=3),
+        new_messages=history[2:],
+        n_previous_messages=2,
+    )
+    assert memory_checkpoint_handler.get_history(checkpoint) == history
+    # Only the new message was added.
+    assert len(memory_checkpoint_handler.messages_sql_handler.get_all()) == 3
+
+
+def test_incomplete_checkpoint_history(
+    memory_checkpoint_handler: AgentCheckpointTableHandler,
+) -> None:
+    # E.g. killed before the messages were saved.
+    checkpoint = memory_checkpoint_handler.save_checkpoint(
+        build_checkpoint(1, n_history_messages=2)
+    )
+    assert memory_checkpoint_handler.get_history(checkpoint) is None
+
+
+def test_old_unfinished_checkpoint_is_ignored(
+    memory_checkpoint_handler: AgentCheckpointTableHandler,
+) -> None:
+    checkpoint = build_checkpoint(1)
+    checkpoint.datetime_ = utcnow() - timedelta(days=2)
+    memory_checkpoint_handler.save_checkpoint(checkpoint)
+
+    assert memory_checkpoint_handler.get_unfinished_checkpoint() is not None
+    assert (
+        memory_checkpoint_handler.get_unfinished_checkpoint(max_age=timedelta(hours=1))
+        is None
+    )
@@ -1,6 +1,8 @@
+from datetime import timedelta
 from typing import Generator
 
 import pytest
+from prediction_market_agent_tooling.tools.utils import utc_datetime
 
 from prediction_market_agent.agents.goal_manager import EvaluatedGoal
 from prediction_market_agent.db.evaluated_goal_table_handler import (
@@ -112,3 +114,43 @@ def test_save_load_evaluated_goal_multiple_agents(
     assert len(loaded_models) == 1
     loaded_evaluated_goal = EvaluatedGoal.from_model(model=loaded_models[0])
     assert loaded_evaluated_goal == evaluated_goal0
+
+
+def test_get_latest_unique_evaluated_goals(
+    table_handler: EvaluatedGoalTableHandler,
+) -> None:
+    def get_goal(goal: str, is_complete: bool = False) -> EvaluatedGoal:
+        return EvaluatedGoal(
+            goal=goal,
+            motivation="motivation",
+            completion_criteria="completion_criteria",
+            is_complete=is_complete,
+            reasoning="reasoning",
+            output=None,
+        )
+
+    # From the oldest to the latest.
+    evaluated_goals = [
+        get_goal("foo"),
+        get_goal("bar"),
+        get_goal("foo", is_complete=True),
+        get_goal("baz"),
+        get_goal("baz"),
+    ]
+    start = utc_datetime(2024, 1, 1)
+    for i, evaluated_goal in enumerate(evaluated_goals):
+        model = evaluated_goal.to_model(agent_id=TEST_AGENT_ID)
+        model.datetime_ = start + timedelta(minutes=i)
+        table_handler.save_evaluated_goal(model=model)
+    table_handler.save_evaluated_goal(
+        model=get_goal("qux").to_model(agent_id=TEST_AGENT_ID + "1")
+    )
+
+    loaded_models = table_handler.get_latest_unique_evaluated_goals(limit=10)
+    assert [EvaluatedGoal.from_model(model) for model in loaded_models] == [
+        get_goal("baz"),
+        get_goal("foo", is_complete=True),
+        get_goal("bar"),
+    ]
+    assert len(table_handler.get_latest_unique_evaluated_goals(limit=2)) == 2
+    assert table_handler.count_latest_goal_evaluations(goal=loaded_models[0]) == 2
@@ -1,4 +1,5 @@
 import json
+from pathlib import Path
 from typing import Generator
 
 import pytest
@@ -7,6 +8,7 @@ from prediction_market_agent_tooling.tools.utils import utcnow
 from prediction_market_agent.db.long_term_memory_table_handler import (
     LongTermMemoryTableHandler,
 )
+from tests.utils import KeywordEmbeddings
 
 SQLITE_DB_URL = "sqlite://"
 TASK_DESCRIPTION = "test_task_description"
@@ -46,3 +48,109 @@ def test_save_load_long_term_memory_item(
 
     # Retrieve all
     assert len(memory_long_term_memory_handler.search()) == 2
+
+
+def test_search_after_id(
+    memory_long_term_memory_handler: LongTermMemoryTableHandler,
+) -> None:
+    memory_long_term_memory_handler.save_history([{"a1": "b"}, {"a2": "c"}])
+    first_id = min(m.id or 0 for m in memory_long_term_memory_handler.search())
+
+    results = memory_long_term_memory_handler.search(after_id=first_id)
+    assert len(results) == 1
+    assert json.loads(str(results[0].metadata_)) == {"a2": "c"}
+
+
+def test_search_relevant() -> None:
+    long_term_memory = LongTermMemoryTableHandler(
+        task_description=TASK_DESCRIPTION, sqlalchemy_db_url=SQLITE_DB_URL
+    )
+    embeddings = KeywordEmbeddings()
+    long_term_memory.embeddings = embeddings
+    long_term_memory.save_history(
+        [
+            {"role": "user", "content": "I saw a dog."},
+            {"role": "user", "content": "I saw a cat and a dog."},
+            {"role": "user", "content": "I saw a bird."},
+        ]
+    )
+    # They are embedded once searched, not when saved.
+    assert embeddings.n_embedded_documents == 0
+
+    results = long_term_memory.search_relevant(query="bird", k=1)
+    assert [json.loads(str(m.metadata_))["content"] for m in results] == [
+        "I saw a bird."
+    ]
+
+    results = long_term_memory.search_relevant(query="dog", k=2)
+    assert [json.loads(str(m.metadata_))["content"] for m in results] == [
+        "I saw a dog.",
+        "I saw a cat and a dog.",
+    ]
+    # And only once.
+    assert embeddings.n_embedded_documents == 3
+
+
+def test_search_relevant_max_candidates() -> None:
+    long_term_memory = LongTermMemoryTableHandler(
+        task_description=TASK_DESCRIPTION,
+        sqlalchemy_db_url=SQLITE_DB_URL,
+        embeddings=KeywordEmbeddings(),
+    )
+    long_term_memory.save_history([{"role": "user", "content": "I saw a bird."}])
+    long_term_memory.save_history([{"role": "user", "content": "I saw a dog."}])
+
+    # The older memory isn't a candidate, even though it's more relevant.
+    results = long_term_memory.search_relevant(query="bird", k=1, max_candidates=1)
+    assert [json.loads(str(m.metadata_))["content"] for m in results] == [
+        "I saw a dog."
+    ]
+
+
+def test_memories_embedded_concurrently(tmp_path: Path) -> None:
+    db_url = f"sqlite:///{tmp_path / 'memories.db'}"
+    long_term_memories = [
+        LongTermMemoryTableHandler(
+            task_description=TASK_DESCRIPTION,
+            sqlalchemy_db_url=db_url,
+            embeddings=KeywordEmbeddings(),
+        )
+        for _ in range(2)
+    ]
+    long_term_memories[0].save_history(
+        [
+            {"role": "user", "content": "I saw a dog."},
+            {"role": "user", "content": "I saw a cat."},
+        ]
+    )
+    memories = long_term_memories[0].search()
+    long_term_memories[0]._embed_memories(memories[:1])
+
+    # E.g. the other process didn't see the first embedding yet.
+    long_term_memories[1]._embed_memories(memories)
+
+    embeddings = long_term_memories[1].embeddings_sql_handler.get_all()
+    assert sorted(e.memory_id for e in embeddings) == sorted(m.id for m in memories)
+
+
+def test_delete_all_memories_with_embeddings(tmp_path: Path) -> None:
+    db_url = f"sqlite:///{tmp_path / 'test.db'}"
+    long_term_memories = [
+        LongTermMemoryTableHandler(
+            task_description=task_description,
+            sqlalchemy_db_url=db_url,
+            embeddings=KeywordEmbeddings(),
+        )
+        for task_description in [TASK_DESCRIPTION, "other_task_description"]
+    ]
+    for long_term_memory in long_term_memories:
+        long_term_memory.save_history([{"role": "user", "content": "I saw a bird."}])
+        long_term_memory.search_relevant(query="bird", k=1)
+
+    long_term_memories[0].delete_all_memories()
+
+    assert long_term_memories[0].search() == []
+    # Only the other task's memory and its embedding are left.
+    (memory,) = long_term_memories[1].search()
+    (embedding,) = long_term_memories[1].embeddings_sql_handler.get_all()
+    assert embedding.memory_id == memory.id
@@ -0,0 +1,141 @@
+from datetime import timedelta
+from typing import Generator
+from unittest.mock import Mock, patch
+
+import pytest
+from prediction_market_agent_tooling.markets.omen.omen_subgraph_handler import (
+    SAFE_COLLATERAL_TOKEN_MARKETS,
+)
+from prediction_market_agent_tooling.tools.utils import DatetimeUTC
+
+from prediction_market_agent.db.models import OmenMarketSnapshotModel
+from prediction_market_agent.db.omen_market_snapshot_table_handler import (
+    OmenMarketSnapshotTableHandler,
+)
+
+SQLITE_DB_URL = "sqlite://"
+UNSAFE_COLLATERAL_TOKEN = "0x0000000000000000000000000000000000000001"
+
+
+@pytest.fixture(scope="function")
+def table_handler() -> Generator[OmenMarketSnapshotTableHandler, None, None]:
+    """Creates a in-memory SQLite DB for testing"""
+    subgraph_handler = Mock()
+    subgraph_handler.get_omen_binary_markets.return_value = []
+    table_handler = OmenMarketSnapshotTableHandler(
+        sqlalchemy_db_url=SQLITE_DB_URL,
+        subgraph_handler=subgraph_handler,
+    )
+    yield table_handler
+
+
+def build_model(
+    id: str,
+    creation_timestamp: int,
+    collateral_token: str = SAFE_COLLATERAL_TOKEN_MARKETS[0],
+    resolution_timestamp: int | None = None,
+    liquidity_parameter: float = 0.0,
+    is_pending_arbitration: bool = False,
+    synced_at: int = 5000,
+) -> OmenMarketSnapshotModel:
+    return OmenMarketSnapshotModel(
+        id=id,
+        title=f"Question {id}?",
+        creator="0xcreator",
+        collateral_token=collateral_token.lower(),
+        creation_timestamp=creation_timestamp,
+        opening_timestamp=creation_timestamp + 100,
+        answer_finalized_timestamp=None,
+        resolution_timestamp=resolution_timestamp,
+        has_answer=False,
+        has_invalid_answer=False,
+        liquidity_parameter=liquidity_parameter,
+        is_pending_arbitration=is_pending_arbitration,
+        market="{}",
+        synced_at=synced_at,
+    )
+
+
+def test_sync_empty_snapshot(table_handler: OmenMarketSnapshotTableHandler) -> None:
+    initial_created_after = DatetimeUTC.to_datetime_utc(1000)
+    table_handler.sync(refresh=False, initial_created_after=initial_created_after)
+    table_handler.subgraph_handler.get_omen_binary_markets.assert_called_once_with(  # type: ignore[attr-defined]
+        limit=None,
+        created_after=initial_created_after,
+        collateral_token_address_in=None,
+    )
+
+
+def test_sync_pulls_only_new_markets(
+    table_handler: OmenMarketSnapshotTableHandler,
+) -> None:
+    table_handler.sql_handler.save_or_update_multiple(
+        [build_model("0x1", 1000), build_model("0x2", 2000)]
+    )
+    table_handler.sync(refresh=False)
+    table_handler.subgraph_handler.get_omen_binary_markets.assert_called_once_with(  # type: ignore[attr-defined]
+        limit=None,
+        created_after=DatetimeUTC.to_datetime_utc(1999),
+        collateral_token_address_in=None,
+    )
+
+
+def test_sync_refreshes_markets_updated_since_last_sync(
+    table_handler: OmenMarketSnapshotTableHandler,
+) -> None:
+    table_handler.sql_handler.save_or_update_multiple(
+        [
+            build_model("0x1", 1000, synced_at=5000),
+            build_model("0x2", 2000, synced_at=4000),
+        ]
+    )
+    with patch.object(table_handler, "refresh_updated_markets") as refresh:
+        table_handler.sync()
+    assert refresh.call_args.kwargs["updated_after"] == DatetimeUTC.to_datetime_utc(
+        5000
+    ) - timedelta(hours=1)
+
+
+def test_refresh_only_updated_markets(
+    table_handler: OmenMarketSnapshotTableHandler,
+) -> None:
+    table_handler.sql_handler.save_or_update_multiple(
+        [
+            build_model("0x1", 1000),
+            build_model("0x2", 2000),
+            build_model("0x3", 3000),
+            build_model("0x4", 4000, is_pending_arbitration=True),
+        ]
+    )
+    ids_by_filter = {
+        "lastActiveHour_gte": {"0x1", "0x9"},  # 0x9 isn't in the snapshot.
+        "question_": {"0x1"},
+        "resolutionTimestamp_gte": set(),
+        "isPendingArbitration": {"0x2"},
+    }
+    with patch.object(
+        table_handler,
+        "get_market_ids",
+        side_effect=lambda where: ids_by_filter[next(iter(where))],
+    ):
+        table_handler.refresh_updated_markets(DatetimeUTC.to_datetime_utc(5000))
+
+    # The updated market, and the one not pending arbitration anymore.
+    (call,) = table_handler.subgraph_handler.get_omen_binary_markets.call_args_list  # type: ignore[attr-defined]
+    assert call.kwargs["id_in"] == ["0x1", "0x4"]
+    # The one pending arbitration is left out, as the subgraph does.
+    assert "Question 0x2?" not in table_handler.get_question_titles()
+
+
+def test_get_question_titles(table_handler: OmenMarketSnapshotTableHandler) -> None:
+    table_handler.sql_handler.save_or_update_multiple(
+        [
+            build_model("0x1", 1000),
+            build_model("0x2", 2000, collateral_token=UNSAFE_COLLATERAL_TOKEN),
+        ]
+    )
+    assert table_handler.get_question_titles() == {"Question 0x1?"}
+    assert table_handler.get_question_titles(collateral_token_address_in=None) == {
+        "Question 0x1?",
+        "Question 0x2?",
+    }
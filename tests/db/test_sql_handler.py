@@ -1,12 +1,13 @@
 import datetime
 import typing as t
+from pathlib import Path
 from typing import Generator
 
 import pytest
 from prediction_market_agent_tooling.tools.utils import utcnow
 from sqlmodel import Session, col
 
-from prediction_market_agent.db.models import Prompt
+from prediction_market_agent.db.models import AgentCheckpointMessageModel, Prompt
 from prediction_market_agent.db.sql_handler import SQLHandler
 
 
@@ -79,3 +80,33 @@ def test_get_with_filter(
     )
     assert len(results) == 1
     assert results[0].session_identifier == session_identifier
+
+
+def test_save_or_update_multiple(tmp_path: Path) -> None:
+    db_url = f"sqlite:///{tmp_path / 'test.db'}"
+    # E.g. of two processes, saving the same rows.
+    sql_handlers = [
+        SQLHandler(model=AgentCheckpointMessageModel, sqlalchemy_db_url=db_url)
+        for _ in range(2)
+    ]
+    sql_handlers[0].save_or_update_multiple(
+        [
+            AgentCheckpointMessageModel(checkpoint_id=1, index=0, message="a"),
+            AgentCheckpointMessageModel(checkpoint_id=1, index=1, message="b"),
+        ]
+    )
+    sql_handlers[1].save_or_update_multiple(
+        [
+            AgentCheckpointMessageModel(checkpoint_id=1, index=1, message="c"),
+            AgentCheckpointMessageModel(checkpoint_id=1, index=2, message="d"),
+            AgentCheckpointMessageModel(checkpoint_id=1, index=2, message="e"),
+        ]
+    )
+
+    messages: t.Sequence[AgentCheckpointMessageModel] = sql_handlers[
+        0
+    ].get_with_filter_and_order(
+        order_by_column_name=AgentCheckpointMessageModel.index.key,  # type: ignore[attr-defined]
+        order_desc=False,
+    )
+    assert [m.message for m in messages] == ["a", "c", "e"]
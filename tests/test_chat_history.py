@@ -1,3 +1,5 @@
+import json
+from datetime import datetime
 from typing import Generator
 
 import pytest
@@ -12,6 +14,7 @@ from prediction_market_agent.agents.microchain_agent.memory import (
 from prediction_market_agent.db.long_term_memory_table_handler import (
     LongTermMemoryTableHandler,
 )
+from prediction_market_agent.db.models import LongTermMemories
 
 
 @pytest.fixture(scope="session")
@@ -48,6 +51,7 @@ def chat_history() -> DatedChatHistory:
 def test_chat_history_clustering(chat_history: DatedChatHistory) -> None:
     assert chat_history.num_messages == 5
 
+    assert chat_history.get_session_ranges() == [(0, 3), (3, 5)]
     clusters = chat_history.cluster_by_session()
     assert len(clusters) == 2
     assert clusters[0].num_messages == 3
@@ -61,6 +65,16 @@ def test_chat_history_clustering(chat_history: DatedChatHistory) -> None:
     assert chat_history.num_messages == 5
 
 
+def test_chat_history_clustering_without_system_message(
+    chat_history: DatedChatHistory,
+) -> None:
+    assert DatedChatHistory(chat_messages=[]).cluster_by_session() == []
+    with pytest.raises(ValueError):
+        DatedChatHistory(
+            chat_messages=chat_history.chat_messages[1:]
+        ).cluster_by_session()
+
+
 def test_save_to_and_load_from_memory(
     long_term_memory: LongTermMemoryTableHandler, chat_history: DatedChatHistory
 ) -> None:
@@ -86,3 +100,17 @@ def test_stringified_chat_history() -> None:
     assert str(chat_history) == (
         "system: You are a helpful assistant.\nuser: What is the weather like today?"
     )
+
+
+def test_trusted_load_from_long_term_memory() -> None:
+    memory = LongTermMemories(
+        task_description="test",
+        metadata_=json.dumps({"role": "user", "content": "foo"}),
+        # Naive, as returned from SQLite.
+        datetime_=datetime(2024, 1, 1, 12, 30),
+    )
+    message = DatedChatMessage.from_long_term_memory(memory)
+    assert message == DatedChatMessage(
+        role="user", content="foo", datetime_=utc_datetime(2024, 1, 1, 12, 30)
+    )
+    assert message.datetime_.tzinfo is not None
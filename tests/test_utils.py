@@ -1,7 +1,10 @@
 import pytest
 from crewai import Task
 
-from prediction_market_agent.agents.utils import get_maximum_possible_bet_amount
+from prediction_market_agent.agents.utils import (
+    get_maximum_possible_bet_amount,
+    split_into_chunks,
+)
 from prediction_market_agent.utils import disable_crewai_telemetry
 
 
@@ -26,3 +29,18 @@ def test_get_maximum_possible_bet_amount(
     min_: float, max_: float, trading_balance: float, expected: float
 ) -> None:
     assert get_maximum_possible_bet_amount(min_, max_, trading_balance) == expected
+
+
+@pytest.mark.parametrize(
+    "texts, max_chars, expected",
+    [
+        ([], 5, [[]]),
+        (["ab", "cd", "ef"], 5, [["ab", "cd"], ["ef"]]),
+        (["abcdefg", "ab"], 5, [["abcdefg"], ["ab"]]),
+        (["ab", "abcdefg", "ab"], 5, [["ab"], ["abcdefg"], ["ab"]]),
+    ],
+)
+def test_split_into_chunks(
+    texts: list[str], max_chars: int, expected: list[list[str]]
+) -> None:
+    assert split_into_chunks(texts, max_chars=max_chars) == expected
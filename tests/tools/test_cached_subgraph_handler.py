@@ -0,0 +1,143 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+
+from prediction_market_agent.tools.cached_subgraph_handler import SingleFlightTTLCache
+
+
+class CountingQuery:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, market_id: str, titles: set[str] | None = None) -> list[str]:
+        self.calls += 1
+        time.sleep(self.delay)
+        return [market_id]
+
+
+def test_cache_hit() -> None:
+    cache = SingleFlightTTLCache()
+    query = CountingQuery()
+    cached_query = cache.wrap("query", query, ttl=timedelta(minutes=1))
+
+    assert cached_query("0x1", titles={"a", "b"}) == ["0x1"]
+    assert cached_query("0x1", titles={"b", "a"}) == ["0x1"]
+    assert cached_query("0x2") == ["0x2"]
+
+    assert query.calls == 2
+    stats = cache.get_stats()["query"]
+    assert (stats.hits, stats.misses, stats.coalesced) == (1, 2, 0)
+
+
+def test_cache_expires() -> None:
+    cache = SingleFlightTTLCache()
+    query = CountingQuery()
+    cached_query = cache.wrap("query", query, ttl=timedelta(seconds=0))
+
+    cached_query("0x1")
+    cached_query("0x1")
+
+    assert query.calls == 2
+
+
+def test_cached_result_is_not_modified_by_caller() -> None:
+    cache = SingleFlightTTLCache()
+    cached_query = cache.wrap("query", CountingQuery(), ttl=timedelta(minutes=1))
+
+    cached_query("0x1").append("0x2")
+
+    assert cached_query("0x1") == ["0x1"]
+
+
+def test_concurrent_calls_are_coalesced() -> None:
+    cache = SingleFlightTTLCache()
+    query = CountingQuery(delay=0.2)
+    cached_query = cache.wrap("query", query, ttl=timedelta(minutes=1))
+
+    results: list[list[str]] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cached_query("0x1")))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert query.calls == 1
+    assert results == [["0x1"]] * 5
+    stats = cache.get_stats()["query"]
+    assert stats.misses + stats.coalesced + stats.hits == 5
+
+
+def test_errors_are_not_cached() -> None:
+    cache = SingleFlightTTLCache()
+    calls = 0
+
+    def failing_query() -> None:
+        nonlocal calls
+        calls += 1
+        raise ValueError("Subgraph is down.")
+
+    cached_query = cache.wrap("query", failing_query, ttl=timedelta(minutes=1))
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cached_query()
+
+    assert calls == 2
+    assert cache.get_stats()["query"].errors == 2
+
+
+def test_max_entries() -> None:
+    cache = SingleFlightTTLCache(max_entries=2)
+    query = CountingQuery()
+    cached_query = cache.wrap("query", query, ttl=timedelta(minutes=1))
+
+    for market_id in ["0x1", "0x2", "0x3", "0x1"]:
+        cached_query(market_id)
+
+    # The oldest entry was evicted, so it was queried again.
+    assert query.calls == 4
+
+
+def test_unbounded_queries_are_not_cached() -> None:
+    cache = SingleFlightTTLCache()
+    calls = 0
+
+    def query(limit: int | None) -> list[int]:
+        nonlocal calls
+        calls += 1
+        return []
+
+    cached_query = cache.wrap("query", query, ttl=timedelta(minutes=1))
+    for _ in range(2):
+        cached_query(limit=None)
+    cached_query(limit=10)
+    cached_query(limit=10)
+
+    assert calls == 3
+    stats = cache.get_stats()["query"]
+    assert (stats.hits, stats.misses, stats.bypassed) == (1, 1, 2)
+
+
+def test_expired_entry_is_evicted_on_read() -> None:
+    cache = SingleFlightTTLCache()
+    results = iter([["0x1"], ValueError("Subgraph is down.")])
+
+    def query() -> list[str]:
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    cached_query = cache.wrap("query", query, ttl=timedelta(seconds=0.1))
+    cached_query()
+    time.sleep(0.1)
+    # Nothing is written after a failed query, so the eviction happened on the read.
+    with pytest.raises(ValueError):
+        cached_query()
+
+    assert not cache._cache
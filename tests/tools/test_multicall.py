@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+import web3.constants
+from prediction_market_agent_tooling.markets.omen.omen_contracts import (
+    OmenOracleContract,
+    WrappedxDaiContract,
+)
+from prediction_market_agent_tooling.tools.balances import (
+    get_balances as get_balances_single_calls,
+)
+from web3 import Web3
+from web3.exceptions import ContractLogicError, ContractPanicError
+
+from prediction_market_agent.tools.multicall import (
+    MulticallBatch,
+    MulticallMicroBatcher,
+    get_balances,
+)
+
+ADDRESS_ZERO = Web3.to_checksum_address(web3.constants.ADDRESS_ZERO)
+
+
+def test_multicall_batch() -> None:
+    wxdai = WrappedxDaiContract()
+    with MulticallBatch() as batch:
+        decimals = batch.call(wxdai, "decimals")
+        balance = batch.call(wxdai, "balanceOf", [ADDRESS_ZERO])
+    assert decimals.result() == wxdai.call("decimals")
+    assert balance.result() == wxdai.balanceOf(ADDRESS_ZERO)
+
+
+def test_multicall_batch_failed_call() -> None:
+    not_a_contract = WrappedxDaiContract(address=ADDRESS_ZERO)
+    with MulticallBatch() as batch:
+        failed = batch.call(not_a_contract, "decimals")
+        decimals = batch.call(WrappedxDaiContract(), "decimals")
+    with pytest.raises(Exception):
+        failed.result()
+    # Other calls in the batch aren't affected.
+    assert decimals.result() == 18
+
+
+def test_get_balances() -> None:
+    # The zero address receives balance too often, so compare with a margin.
+    balances = get_balances(ADDRESS_ZERO)
+    expected = get_balances_single_calls(ADDRESS_ZERO)
+    assert balances.wxdai == pytest.approx(expected.wxdai, rel=0.01)
+    assert balances.xdai == pytest.approx(expected.xdai, rel=0.01)
+
+
+def test_micro_batcher() -> None:
+    batcher = MulticallMicroBatcher()
+    wxdai = WrappedxDaiContract()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(lambda _: batcher.call(wxdai, "decimals"), range(4))
+        )
+    assert results == [18] * 4
+
+
+def mock_multicall_batch(results: list[tuple[bool, bytes]]) -> MulticallBatch:
+    batch = MulticallBatch(web3=Web3())
+    batch.multicall = Mock()
+    batch.multicall.functions.aggregate3.return_value.call.return_value = results
+    return batch
+
+
+def test_multicall_batch_checksums_addresses() -> None:
+    address = "0x" + "ab" * 20
+    batch = mock_multicall_batch([(True, Web3().codec.encode(["address"], [address]))])
+
+    # The oracle's `realitio` returns an address.
+    realitio = batch.call(OmenOracleContract(), "realitio")
+    batch.execute()
+
+    assert realitio.result() == Web3.to_checksum_address(address)
+
+
+def test_multicall_batch_revert_reason() -> None:
+    codec = Web3().codec
+    batch = mock_multicall_batch(
+        [
+            (False, bytes.fromhex("08c379a0") + codec.encode(["string"], ["No."])),
+            (False, bytes.fromhex("4e487b71") + codec.encode(["uint256"], [0x12])),
+            (False, b""),
+        ]
+    )
+    wxdai = WrappedxDaiContract()
+    futures = [batch.call(wxdai, "decimals") for _ in range(3)]
+    batch.execute()
+
+    with pytest.raises(ContractLogicError, match="execution reverted: No."):
+        futures[0].result()
+    with pytest.raises(ContractPanicError, match="Division by zero"):
+        futures[1].result()
+    with pytest.raises(ContractLogicError, match="execution reverted"):
+        futures[2].result()
+
+
+def test_micro_batcher_calls_directly_without_concurrency() -> None:
+    batcher = MulticallMicroBatcher(web3=Web3())
+    contract = Mock()
+    contract.call.return_value = 18
+
+    assert batcher.call(contract, "decimals") == 18
+    contract.call.assert_called_once_with("decimals", None, web3=batcher.web3)
@@ -0,0 +1,216 @@
+from typing import Generator
+from unittest.mock import Mock, patch
+
+import pytest
+from prediction_market_agent_tooling.gtypes import HexBytes, Nonce
+from web3 import Web3
+
+from prediction_market_agent.tools.tx_pipeline import NonceManager, TransactionPipeline
+
+ADDRESS = Web3.to_checksum_address("0x0000000000000000000000000000000000000001")
+
+
+def mock_web3(pending_nonce: int = 5) -> Mock:
+    web3 = Mock()
+    web3.eth.get_transaction_count.return_value = pending_nonce
+    web3.eth.account.sign_transaction.side_effect = lambda tx, private_key: Mock(
+        rawTransaction=HexBytes(bytes([tx["nonce"]])),
+        hash=HexBytes(bytes([tx["nonce"]]) * 32),
+    )
+    web3.eth.send_raw_transaction.side_effect = lambda raw: HexBytes(raw * 32)
+    web3.eth.get_transaction_receipt.return_value = {"status": 1}
+    return web3
+
+
+def mock_api_keys() -> Mock:
+    api_keys = Mock()
+    api_keys.SAFE_ADDRESS = None
+    api_keys.bet_from_address = ADDRESS
+    return api_keys
+
+
+@pytest.fixture
+def build_transaction() -> Generator[Mock, None, None]:
+    with patch(
+        "prediction_market_agent.tools.tx_pipeline.build_transaction",
+        side_effect=lambda **kwargs: dict(kwargs["tx_params"]),
+    ) as build_transaction:
+        yield build_transaction
+
+
+def test_nonce_manager() -> None:
+    web3 = mock_web3(pending_nonce=5)
+    nonce_manager = NonceManager(web3=web3, address=ADDRESS)
+
+    assert [nonce_manager.allocate() for _ in range(3)] == [5, 6, 7]
+    nonce_manager.release(Nonce(7))
+    assert nonce_manager.allocate() == 7
+    # The node is asked only once.
+    web3.eth.get_transaction_count.assert_called_once_with(ADDRESS, "pending")
+
+
+def test_nonce_manager_release_with_gap() -> None:
+    web3 = mock_web3(pending_nonce=5)
+    nonce_manager = NonceManager(web3=web3, address=ADDRESS)
+    nonce_manager.allocate()
+    nonce_manager.allocate()
+
+    nonce_manager.release(Nonce(5))
+    web3.eth.get_transaction_count.return_value = 6
+    assert nonce_manager.allocate() == 6
+
+
+def test_pipeline_sends_without_waiting(build_transaction: Mock) -> None:
+    web3 = mock_web3(pending_nonce=5)
+    pipeline = TransactionPipeline(mock_api_keys(), web3=web3, poll_interval=0)
+
+    for label in ["a", "b", "c"]:
+        pipeline.submit(Mock(), "resolve", label=label)
+
+    assert [
+        c.kwargs["tx_params"]["nonce"] for c in build_transaction.call_args_list
+    ] == [
+        5,
+        6,
+        7,
+    ]
+    web3.eth.get_transaction_receipt.assert_not_called()
+
+    # All three are mined.
+    web3.eth.get_transaction_count.return_value = 8
+    results = pipeline.wait()
+    assert [(r.label, r.success) for r in results] == [
+        ("a", True),
+        ("b", True),
+        ("c", True),
+    ]
+
+
+def test_pipeline_reports_failures(build_transaction: Mock) -> None:
+    web3 = mock_web3(pending_nonce=5)
+    web3.eth.get_transaction_receipt.side_effect = [{"status": 1}, {"status": 0}]
+    pipeline = TransactionPipeline(mock_api_keys(), web3=web3, poll_interval=0)
+
+    build_transaction.side_effect = [
+        {"nonce": 5},
+        ValueError("execution reverted"),
+        {"nonce": 6},
+    ]
+    for label in ["a", "b", "c"]:
+        pipeline.submit(Mock(), "resolve", label=label)
+
+    web3.eth.get_transaction_count.return_value = 7
+    results = {r.label: r for r in pipeline.wait()}
+    assert results["a"].success
+    # The nonce of the transaction that failed to be sent was reused.
+    assert not results["b"].success and results["b"].tx_hash is None
+    assert results["c"].error == "Transaction reverted."
+
+
+def test_pipeline_retries_on_nonce_too_low(build_transaction: Mock) -> None:
+    web3 = mock_web3(pending_nonce=5)
+    pipeline = TransactionPipeline(mock_api_keys(), web3=web3, poll_interval=0)
+
+    send_raw_transaction = web3.eth.send_raw_transaction.side_effect
+    web3.eth.send_raw_transaction.side_effect = [
+        ValueError("nonce too low"),
+        send_raw_transaction(HexBytes(b"\x09")),
+    ]
+    # Something else has used the nonces from 5 to 8 meanwhile.
+    web3.eth.get_transaction_count.side_effect = [5, 9, 10]
+    pipeline.submit(Mock(), "resolve", label="a")
+
+    assert build_transaction.call_args_list[-1].kwargs["tx_params"]["nonce"] == 9
+    assert [r.success for r in pipeline.wait()] == [True]
+
+
+def test_pipeline_rebroadcasts_stuck_transaction(build_transaction: Mock) -> None:
+    web3 = mock_web3(pending_nonce=5)
+    pipeline = TransactionPipeline(
+        mock_api_keys(), web3=web3, poll_interval=0, receipt_timeout=0, wait_timeout=60
+    )
+    pipeline.submit(Mock(), "resolve", label="a")
+
+    # Not mined at first, so it's sent again.
+    web3.eth.get_transaction_count.side_effect = [5, 6]
+    assert [r.success for r in pipeline.wait()] == [True]
+    assert web3.eth.send_raw_transaction.call_count == 2
+
+
+def test_pipeline_fails_when_blocked_by_foreign_nonce(build_transaction: Mock) -> None:
+    web3 = mock_web3(pending_nonce=5)
+    pipeline = TransactionPipeline(
+        mock_api_keys(), web3=web3, poll_interval=0, receipt_timeout=0, wait_timeout=60
+    )
+    pipeline.submit(Mock(), "resolve", label="a")
+    pipeline.submit(Mock(), "resolve", label="b")
+
+    # Nonce 4 wasn't sent by the pipeline and never gets mined.
+    web3.eth.get_transaction_count.return_value = 4
+    results = pipeline.wait()
+
+    assert [r.error for r in results] == ["Not mined, blocked by nonce 4."] * 2
+    # Nothing of ours to broadcast again.
+    assert web3.eth.send_raw_transaction.call_count == 2
+
+
+def test_pipeline_wait_has_deadline(build_transaction: Mock) -> None:
+    web3 = mock_web3(pending_nonce=5)
+    pipeline = TransactionPipeline(
+        mock_api_keys(), web3=web3, poll_interval=0, wait_timeout=0
+    )
+    pipeline.submit(Mock(), "resolve", label="a")
+
+    # Never mined.
+    assert [r.error for r in pipeline.wait()] == ["Not mined in 0 seconds."]
+
+
+def test_pipeline_keeps_nonce_on_send_timeout(build_transaction: Mock) -> None:
+    web3 = mock_web3(pending_nonce=5)
+    pipeline = TransactionPipeline(mock_api_keys(), web3=web3, poll_interval=0)
+
+    send_raw_transaction = web3.eth.send_raw_transaction.side_effect
+    web3.eth.send_raw_transaction.side_effect = [
+        TimeoutError("Read timed out."),
+        send_raw_transaction(HexBytes(b"\x06")),
+    ]
+    pipeline.submit(Mock(), "resolve", label="a")
+    pipeline.submit(Mock(), "resolve", label="b")
+
+    # The node might have accepted the first one, so its nonce isn't reused.
+    assert [
+        c.kwargs["tx_params"]["nonce"] for c in build_transaction.call_args_list
+    ] == [
+        5,
+        6,
+    ]
+    # And it was, so it's mined.
+    web3.eth.get_transaction_count.return_value = 7
+    results = pipeline.wait()
+    assert [(r.label, r.success) for r in results] == [("a", True), ("b", True)]
+    assert results[0].tx_hash == HexBytes(b"\x05" * 32)
+
+
+def test_pipeline_dry_run(build_transaction: Mock) -> None:
+    web3 = mock_web3()
+    pipeline = TransactionPipeline(mock_api_keys(), web3=web3, dry_run=True)
+
+    pipeline.submit(Mock(), "resolve", label="a")
+
+    assert [r.success for r in pipeline.wait()] == [True]
+    web3.eth.send_raw_transaction.assert_not_called()
+
+
+def test_pipeline_keeps_nonce_zero() -> None:
+    web3 = mock_web3(pending_nonce=0)
+    web3.eth.contract.return_value.functions.__getitem__ = Mock(
+        return_value=lambda *args: Mock(build_transaction=lambda tx_params: tx_params)
+    )
+    pipeline = TransactionPipeline(mock_api_keys(), web3=web3, poll_interval=0)
+
+    pipeline.submit(Mock(), "resolve", label="a")
+
+    (tx,), _ = web3.eth.account.sign_transaction.call_args
+    assert tx["nonce"] == 0
+    # Only the nonce manager asked for the nonce.
+    web3.eth.get_transaction_count.assert_called_once_with(ADDRESS, "pending")
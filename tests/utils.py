@@ -1,3 +1,52 @@
 import os
+import typing as t
+from contextlib import contextmanager
+from pathlib import Path
+from unittest.mock import PropertyMock, patch
+
+from langchain_core.embeddings import Embeddings
+from prediction_market_agent_tooling.config import APIKeys
+from pydantic import SecretStr
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
 
 RUN_PAID_TESTS = os.environ.get("RUN_PAID_TESTS", "0") == "1"
+
+
+class KeywordEmbeddings(Embeddings):
+    """Embeds texts as counts of the keywords, for deterministic testing."""
+
+    keywords = ["dog", "cat", "bird"]
+
+    def __init__(self) -> None:
+        self.n_embedded_documents = 0
+        self.n_embedded_queries = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.n_embedded_documents += len(texts)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        self.n_embedded_queries += 1
+        return self._embed(text)
+
+    def _embed(self, text: str) -> list[float]:
+        return [float(text.count(keyword)) + 0.1 for keyword in self.keywords]
+
+
+@compiles(JSONB, "sqlite")
+def compile_jsonb_for_sqlite(type_: JSONB, compiler: t.Any, **kwargs: t.Any) -> str:
+    # PMAT's `db_cache` stores the results as JSONB, which SQLite knows as JSON.
+    return "JSON"
+
+
+@contextmanager
+def sqlite_db_cache(db_path: Path) -> t.Generator[None, None, None]:
+    """Points PMAT's `db_cache` to a SQLite DB, for testing the cached functions."""
+    with patch.object(
+        APIKeys,
+        "sqlalchemy_db_url",
+        new_callable=PropertyMock,
+        return_value=SecretStr(f"sqlite:///{db_path}"),
+    ):
+        yield